@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+'''
+benchmarks for the viz hot paths on synthetic inputs
+
+genomes come from a seeded numpy generator (temp_backtranslate's
+random_sequence picks one base per python call, far too slow for 10 Mb)
+and structures are synthetic PDB files of residues along a random walk,
+so every run sees the same input at each size. each function is timed at
+the sizes it can reasonably handle, from 1 kb up to 10 Mb, taking the
+best of a few runs, and its peak python heap (tracemalloc, which numpy
+reports to) is measured in one more run. multiprocTextfuncs' workers run
+in other processes, so only its parent side memory is seen.
+
+results go to a JSON baseline, and later runs are compared with it:
+anything slower or hungrier than the baseline by more than the tolerance
+is flagged, and the exit status is 1. baselines only mean something on
+the machine they were recorded on.
+
+    python bench_viz.py --save                 # record bench_baseline.json
+    python bench_viz.py --quick                # compare, sizes up to 100 kb
+    python bench_viz.py -only ngram_counts lev_distance --max-size 1000000
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'src' / 'main' / 'python'))
+import viz
+
+BASELINE = 'bench_baseline.json'
+SEED = 2024
+SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUICK_SIZE = 100_000
+# runs per measurement, and the time after which no more are started
+REPEAT = 3
+REPEAT_SECONDS = 2.0
+# slower or bigger than the baseline by this fraction is a regression
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+# timings below this are mostly noise and never flagged
+MIN_SECONDS = 0.005
+
+
+def random_genome(length: int, seed: int = SEED, gc: float = 0.5) -> str:
+    # seeded random ACGT string with the given GC fraction
+    rng = np.random.default_rng(seed)
+    p = [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+    return np.array(list(b'ACGT'), dtype=np.uint8)[rng.choice(4, size=length, p=p)].tobytes().decode('ascii')
+
+def mutate(sequence: str, rate: float = 0.05, seed: int = SEED) -> str:
+    # substitute about rate of the bases, for pairs of related sequences
+    rng = np.random.default_rng(seed + 1)
+    data = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8).copy()
+    hits = rng.random(len(data)) < rate
+    data[hits] = np.array(list(b'ACGT'), dtype=np.uint8)[rng.integers(0, 4, hits.sum())]
+    return data.tobytes().decode('ascii')
+
+def random_pdb(residues: int, seed: int = SEED) -> str:
+    '''
+    PDB text of one chain of glycines, N CA C O per residue, along a
+    random walk with 3.8 A between CA atoms
+    '''
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(size=(residues, 3))
+    steps *= 3.8 / np.linalg.norm(steps, axis=1, keepdims=True)
+    centres = np.cumsum(steps, axis=0)
+    offsets = {'N': (-1.2, 0.5, 0.0), 'CA': (0.0, 0.0, 0.0), 'C': (1.2, 0.6, 0.0), 'O': (1.4, 1.8, 0.3)}
+    lines = []
+    serial = 1
+    for residue, centre in enumerate(centres, 1):
+        for atom, offset in offsets.items():
+            x, y, z = centre + offset
+            lines.append(f'ATOM  {serial:5d}  {atom:<3s} GLY A{residue % 10000:4d}    '
+                         f'{x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00           {atom[0]}')
+            serial += 1
+    return '\n'.join(lines + ['END', ''])
+
+def write_fasta(directory, name: str, sequence: str) -> str:
+    path = os.path.join(directory, f'{name}.fasta')
+    with open(path, 'w') as handle:
+        handle.write(f'>{name}\n')
+        for i in range(0, len(sequence), 80):
+            handle.write(sequence[i:i + 80] + '\n')
+    return path
+
+
+# each case turns a size and a scratch directory into a call to time
+def _lev_distance(size, directory):
+    genome = random_genome(size)
+    other = mutate(genome)
+    return lambda: viz.lev_distance(genome, other)
+
+def _make_ngrams(size, directory):
+    genome = random_genome(size)
+    return lambda: viz.make_ngrams(3, genome)
+
+def _ngram_counts(size, directory):
+    genome = random_genome(size)
+    return lambda: viz.ngram_counts(3, genome)
+
+def _heatMatrix(size, directory):
+    # as nucSimPlot does, at most HEATMAP_NGRAM_LIMIT windows
+    ngrams = viz.make_ngrams(10, random_genome(size))[:viz.HEATMAP_NGRAM_LIMIT]
+    return lambda: viz.heatMatrix(ngrams, viz.lev_distance)
+
+def _calcDist(size, directory):
+    genome = random_genome(size)
+    path = write_fasta(directory, f'genome{size}', genome)
+    query = mutate(genome[size // 2:size // 2 + 20], rate=0.1)
+    return lambda: viz.calcDist(viz.lev_distance, query, path, k=20)
+
+def _create_distance_matrix(size, directory):
+    # size is residues here, four atoms each
+    path = os.path.join(directory, f'walk{size}.pdb')
+    with open(path, 'w') as handle:
+        handle.write(random_pdb(size))
+    return lambda: viz.create_distance_matrix(path, quiet=True)
+
+def _multiprocTextfuncs(size, directory):
+    genome = random_genome(size)
+    other = mutate(genome)
+    return lambda: viz.multiprocTextfuncs(genome, other)
+
+CASES = {
+    'lev_distance': (_lev_distance, (1_000, 10_000, 100_000)),
+    'make_ngrams': (_make_ngrams, (1_000, 10_000, 100_000, 1_000_000)),
+    'ngram_counts': (_ngram_counts, SIZES),
+    'heatMatrix': (_heatMatrix, (100, 1_000, 10_000)),
+    'calcDist': (_calcDist, (1_000, 10_000, 100_000, 1_000_000)),
+    'create_distance_matrix': (_create_distance_matrix, (100, 300, 1_000)),
+    # most textdistance metrics are pure python and quadratic
+    'multiprocTextfuncs': (_multiprocTextfuncs, (100, 300)),
+}
+
+
+def measure(call: Callable, repeat: int = REPEAT) -> Dict:
+    '''
+    best wall time of up to repeat runs, then the peak traced memory of one
+    more run. output printed by the call is swallowed
+    '''
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        while len(times) < repeat and sum(times) < REPEAT_SECONDS:
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'runs': len(times), 'peak_bytes': peak}
+
+def run(names: List[str] = None, max_size: int = None, repeat: int = REPEAT,
+        report: Callable = None) -> Dict:
+    # {case: {size: measurement}}, sizes as strings so the dict is JSON as is
+    results = {}
+    # results must be computed every time, not read back from viz's cache
+    enabled, viz.cache.enabled = viz.cache.enabled, False
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for name in names or CASES:
+                setup, sizes = CASES[name]
+                for size in sizes:
+                    if max_size and size > max_size:
+                        continue
+                    result = measure(setup(size, directory), repeat)
+                    results.setdefault(name, {})[str(size)] = result
+                    if report:
+                        report(name, size, result)
+    finally:
+        viz.cache.enabled = enabled
+    return results
+
+def compare(results: Dict, baseline: Dict, time_tolerance: float = TIME_TOLERANCE,
+            memory_tolerance: float = MEMORY_TOLERANCE) -> List[str]:
+    # a line for every measurement that regressed against the baseline
+    regressions = []
+    recorded = baseline.get('results', baseline)
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            before = recorded.get(name, {}).get(size)
+            if before is None:
+                continue
+            limit = before['seconds'] * (1 + time_tolerance)
+            if result['seconds'] > max(limit, MIN_SECONDS):
+                regressions.append(f'{name} {size}: {result["seconds"]:.4f}s, '
+                                   f'baseline {before["seconds"]:.4f}s')
+            if result['peak_bytes'] > before['peak_bytes'] * (1 + memory_tolerance):
+                regressions.append(f'{name} {size}: peak {result["peak_bytes"]} bytes, '
+                                   f'baseline {before["peak_bytes"]}')
+    return regressions
+
+def environment() -> Dict:
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'system': platform.system(),
+            'cpus': os.cpu_count(), 'recorded': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+def print_result(name, size, result):
+    print(f'{name:<24s}{size:>10d}{result["seconds"]:>12.4f}s{result["peak_bytes"] / 2**20:>10.1f} MiB',
+          flush=True)
+
+def main(args):
+    max_size = QUICK_SIZE if args.quick else args.max_size
+    results = run(args.only, max_size, args.repeat, report=print_result)
+    if args.save:
+        with open(args.baseline, 'w') as handle:
+            json.dump({'environment': environment(), 'results': results}, handle, indent=1)
+        print(f'baseline written to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, record one with --save')
+        return 0
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for line in regressions:
+        print(f'REGRESSION {line}')
+    print(f'{len(regressions)} regressions against {args.baseline}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark viz hot paths on synthetic genomes and structures')
+    parser.add_argument('-only', '--only', nargs='+', choices=list(CASES), default=None,
+        help='benchmark only these functions')
+    parser.add_argument('--max-size', default=None, type=int,
+        help='skip input sizes above this many bases (residues for structures)')
+    parser.add_argument('--quick', action='store_true',
+        help=f'sizes up to {QUICK_SIZE} only')
+    parser.add_argument('--repeat', default=REPEAT, type=int,
+        help='timed runs per measurement, the best is kept')
+    parser.add_argument('--baseline', default=BASELINE,
+        help='baseline JSON file to compare with or write')
+    parser.add_argument('--save', action='store_true',
+        help='write the results as the new baseline instead of comparing')
+    parser.add_argument('--time-tolerance', default=TIME_TOLERANCE, type=float,
+        help='flag runs slower than the baseline by more than this fraction')
+    parser.add_argument('--memory-tolerance', default=MEMORY_TOLERANCE, type=float,
+        help='flag peak memory above the baseline by more than this fraction')
+    sys.exit(main(parser.parse_args()))
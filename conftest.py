@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# parser/ is a scratch directory rather than a package, its one python
+# module (temp_backtranslate) is imported by name from there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'parser'))
+
+
+@pytest.fixture(autouse=True, scope='session')
+def result_cache(tmp_path_factory):
+    # cached viz results from a test run stay out of data/cache
+    import viz
+    viz.cache.directory = tmp_path_factory.mktemp('cache')
+    yield viz.cache
@@ -1,6 +1,9 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 # see fastfind paper here:
 # https://bmcbioinformatics.biomedcentral.com/track/pdf/10.1186/1471-2105-7-1?site=bmcbioinformatics.biomedcentral.com
+from itertools import product
+import random
+
 # 1. define codon table
 codon_table = {
     'A': ('GCT', 'GCC', 'GCA', 'GCG'),
@@ -48,7 +51,7 @@ ambiguous_bases = {
 
 # 3. naively determine ambiguous codons from ambiguous bases
 ambiguous_codon_table = {}
-for amino_acid, codons in codon_table.iteritems():
+for amino_acid, codons in codon_table.items():
     ambiguous_codon = ''
     for i in range(3): # len(codon)
         bases = frozenset([codon[i] for codon in codons])
@@ -81,7 +84,8 @@ def backtranslate_permutations(protein, codon_table=codon_table):
 
 def backtranslate(protein, codon_table=codon_table):
     '''Returns the back-translated nucleotide sequences for a protein and codon 
-    table combination.
+    table combination. Every sequence is built, so only use this for short
+    peptides, BackTranslation gives the same sequences lazily.
 
     >>> protein = 'FVC'
     >>> len(backtranslate(protein))
@@ -100,8 +104,93 @@ def backtranslate(protein, codon_table=codon_table):
                 sequences.append(sequence)
     return sequences
 
+class BackTranslation:
+    '''All back-translations of a protein, without ever building them.
+
+    Sequences are numbered in the order backtranslate returns them, which is
+    a mixed radix number whose first digit (the codon of the first amino
+    acid) varies fastest. So the count is exact, any sequence can be fetched
+    by index, iteration streams them one at a time, and a random index or a
+    codon-by-codon draw gives a uniform sample. Memory is linear in the
+    length of the protein whatever the count.
+
+    >>> sequences = BackTranslation('FVC')
+    >>> sequences.count
+    16
+    >>> list(sequences) == backtranslate('FVC')
+    True
+    >>> sequences[5], sequences.index('TTCGTATGT')
+    ('TTCGTATGT', 5)
+    >>> BackTranslation('ACDEFGHIKLMNPQRSTVWY*' * 5).count
+    1099843496270807846940825397075877767132741632
+    >>> BackTranslation('FVC').ambiguous().choices
+    [('TTY',), ('GTN',), ('TGY',)]
+    '''
+    def __init__(self, protein, codon_table=codon_table):
+        self.protein = protein
+        self.codon_table = codon_table
+        self.choices = [tuple(codon_table[amino_acid]) for amino_acid in protein]
+        self.count = backtranslate_permutations(protein, codon_table)
+
+    def __len__(self):
+        # len() is limited to sys.maxsize, count is not
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('back-translation index out of range')
+        codons = []
+        for choice in self.choices:
+            i, digit = divmod(i, len(choice))
+            codons.append(choice[digit])
+        return ''.join(codons)
+
+    def index(self, sequence):
+        '''The index of a back-translated sequence, the inverse of [i].'''
+        if len(sequence) != 3 * len(self.choices):
+            raise ValueError(f'{sequence!r} is not a back-translation of {self.protein!r}')
+        i, radix = 0, 1
+        for position, choice in enumerate(self.choices):
+            codon = sequence[3 * position:3 * position + 3]
+            if codon not in choice:
+                raise ValueError(f'{codon!r} does not code for {self.protein[position]!r}')
+            i += choice.index(codon) * radix
+            radix *= len(choice)
+        return i
+
+    def __iter__(self):
+        # product varies its last argument fastest, so feed it reversed
+        for codons in product(*reversed(self.choices)):
+            yield ''.join(reversed(codons))
+
+    def sample(self, k=1, codon_usage=None, rng=random):
+        '''k random back-translations.
+
+        Without codon_usage every sequence is equally likely. codon_usage
+        maps codons to frequencies (any scale, as from a codon usage table)
+        and each codon is drawn in proportion to its frequency among the
+        codons for its amino acid. Codons missing from codon_usage are
+        never drawn.
+        '''
+        if codon_usage is None:
+            return [''.join(rng.choice(choice) for choice in self.choices) for _ in range(k)]
+        weights = {}
+        for choice in set(self.choices):
+            weights[choice] = [codon_usage.get(codon, 0) for codon in choice]
+            if not any(weights[choice]):
+                raise ValueError(f'codon_usage has no weight for any of {choice}')
+        return [''.join(rng.choices(choice, weights[choice])[0] for choice in self.choices)
+                for _ in range(k)]
+
+    def ambiguous(self):
+        '''The same protein over ambiguous codons, one IUPAC codon per amino
+        acid except L, R, S and *, so the count collapses to at most 2**len.'''
+        return BackTranslation(self.protein, ambiguous_codon_table)
+
 # 5. reverse ambiguous_bases to get a kind of codon table 
-ambiguous_bases_reversed = dict((value, sorted(list(key))) for (key, value) in ambiguous_bases.iteritems())
+ambiguous_bases_reversed = dict((value, sorted(list(key))) for (key, value) in ambiguous_bases.items())
 
 # 6. Reuse the backtranslation functions with ambiguous nucleotides instead
 def disambiguate(ambiguous_dna):
@@ -115,11 +204,6 @@ def disambiguate(ambiguous_dna):
     '''
     return backtranslate(ambiguous_dna, ambiguous_bases_reversed)
 
-if __name__ == '__main__':
-    import doctest
-    doctest.testmod()
-
-
 def clean_sequence( sequence ):
     """Given a sequence string, return a crap-free, standardized DNA version."""
     s = sequence.replace( '\r', '' ).split( '\n' )  # separate each line
@@ -141,13 +225,11 @@ def report_bad_chars( sequence ):
 # After the jump, functions for translation, calculating amino acid and nucleotide frequencies, and making random DNA sequences.
 
 # To make a random DNA sequence:
-import random
- 
 def random_sequence( length ):
     """Return a random string of AGCT of size length."""
     return ''.join([ random.choice( 'AGCT' ) for i in range(int( length ))])
 
-And to get the frequency of each nucleotide:
+# And to get the frequency of each nucleotide:
 def nuc_frequencies( sequence ):
     """Return a dictionary of base:frequency pairs."""
     return { b: sequence.count(b)/len(sequence) for b in 'AGCT'}
@@ -197,4 +279,9 @@ def codon_frequencies( seq ):
         try: table[seq[i:i+3]] += 1
         except: pass
     return table
-    
\ No newline at end of file
+    
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,164 @@
+'''
+array backed ABI chromatogram traces
+
+the ABIF directory is read straight from the file and the four analysed
+channels (DATA9-12) land in one (4, samples) int16 array, along with the
+base calls, their peak positions (PLOC2) and quality values (PCON2).
+Bio.SeqIO's abi parser turns every sample into a python int and never
+keeps the peak positions, which is what made plotting long runs slow.
+
+for plotting, a trace is decimated to about the number of pixels it will
+be drawn on, either min/max per pixel column (keeps every spike, cheapest)
+or largest triangle three buckets (smoother, fewer points). a region
+narrower than the pixel budget is returned at full resolution, so zooming
+in always shows the real samples.
+'''
+import struct
+from typing import Tuple
+
+import numpy as np
+
+CHANNEL_TAGS = (('DATA', 9), ('DATA', 10), ('DATA', 11), ('DATA', 12))
+ENTRY = struct.Struct('>4sihhiiii')
+# the usual colours for each base
+BASE_COLOURS = {'A': 'green', 'C': 'blue', 'G': 'black', 'T': 'red'}
+DECIMATE_METHODS = ('minmax', 'lttb')
+
+
+def read_directory(data: bytes) -> dict:
+    # {(tag name, tag number): (element type, element count, raw bytes)}
+    if data[:4] != b'ABIF':
+        raise ValueError('not an ABIF file')
+    root = ENTRY.unpack_from(data, 6)
+    entries = {}
+    for i in range(root[4]):
+        name, number, etype, esize, count, size, offset, _ = ENTRY.unpack_from(data, root[6] + i * ENTRY.size)
+        # data of four bytes or less is stored in the offset field itself
+        if size <= 4:
+            raw = struct.pack('>i', offset)[:size]
+        else:
+            raw = data[offset:offset + size]
+        entries[name.decode('ascii', 'replace'), number] = (etype, count, raw)
+    return entries
+
+
+class Trace:
+    '''
+    >>> trace = read('sample.ab1')
+    >>> trace.channels.shape, trace.calls[:10], trace.quality[:10]
+    >>> x, ys = trace.decimate(width=1200)
+    >>> x, ys = trace.decimate(4000, 4200, width=1200)  # full resolution
+    '''
+    def __init__(self, name, channels, order, calls, peaks, quality):
+        self.name = name
+        self.channels = channels
+        self.order = order
+        self.calls = calls
+        self.peaks = peaks
+        self.quality = quality
+
+    def __len__(self):
+        return self.channels.shape[1]
+
+    def region(self, start: int = None, end: int = None) -> np.ndarray:
+        # samples start:end of all four channels, a view and never a copy
+        return self.channels[:, start:end]
+
+    def bases_in(self, start: int = None, end: int = None) -> Tuple[np.ndarray, str, np.ndarray]:
+        # peak positions, calls and qualities of the bases whose peaks fall in start:end
+        start, end, _ = slice(start, end).indices(len(self))
+        first, last = np.searchsorted(self.peaks, [start, end])
+        return self.peaks[first:last], self.calls[first:last], self.quality[first:last]
+
+    def decimate(self, start: int = None, end: int = None, width: int = 2000,
+                 method: str = 'minmax') -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        sample positions and (4, points) channel values for start:end, cut
+        down to roughly width points per channel
+        '''
+        start, end, _ = slice(start, end).indices(len(self))
+        region = self.region(start, end)
+        if method == 'minmax':
+            return minmax(region, width, start)
+        if method == 'lttb':
+            picks = [lttb(channel, width) for channel in region]
+            x = np.unique(np.concatenate(picks))
+            return x + start, region[:, x]
+        raise ValueError(f'unknown decimation {method!r}, use one of {DECIMATE_METHODS}')
+
+
+def _text(entries, tag, default=''):
+    entry = entries.get(tag)
+    return entry[2].decode('ascii', 'replace') if entry else default
+
+def read(path) -> Trace:
+    with open(path, 'rb') as handle:
+        data = handle.read()
+    entries = read_directory(data)
+    missing = [f'{name}{number}' for name, number in CHANNEL_TAGS if (name, number) not in entries]
+    if missing:
+        raise ValueError(f'{path} has no {", ".join(missing)} trace data')
+    channels = np.stack([np.frombuffer(entries[tag][2], dtype='>i2') for tag in CHANNEL_TAGS])
+    channels = channels.astype(np.int16)
+    peaks = entries.get(('PLOC', 2))
+    quality = entries.get(('PCON', 2))
+    calls = _text(entries, ('PBAS', 2))
+    name = _text(entries, ('SMPL', 1))[1:] or str(path)
+    return Trace(
+        name=name,
+        channels=channels,
+        order=_text(entries, ('FWO_', 1), 'GATC'),
+        calls=calls,
+        peaks=np.frombuffer(peaks[2], dtype='>i2').astype(np.int64) if peaks else np.zeros(0, np.int64),
+        quality=np.frombuffer(quality[2], dtype=np.uint8).copy() if quality else np.zeros(len(calls), np.uint8),
+    )
+
+
+def minmax(values: np.ndarray, width: int, offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    keep the lowest and highest sample of each of width buckets, in the
+    order they occur, so a line through them covers the same pixels as
+    one through every sample. values is (channels, samples)
+    '''
+    samples = values.shape[-1]
+    if samples <= 2 * width:
+        return np.arange(samples) + offset, values
+    edges = np.linspace(0, samples, width + 1).astype(np.int64)[:-1]
+    lows = np.minimum.reduceat(values, edges, axis=-1)
+    highs = np.maximum.reduceat(values, edges, axis=-1)
+    # where in its bucket each extreme first occurs, so a falling edge keeps high then low
+    bucket = np.repeat(np.arange(width), np.diff(np.append(edges, samples)))
+    position = np.arange(samples)
+    first_low = np.minimum.reduceat(np.where(values == lows[..., bucket], position, samples), edges, axis=-1)
+    first_high = np.minimum.reduceat(np.where(values == highs[..., bucket], position, samples), edges, axis=-1)
+    falling = first_high < first_low
+    # x positions are the bucket edges, both extremes at the same column
+    x = np.repeat(edges, 2) + offset
+    ys = np.empty(values.shape[:-1] + (2 * width,), dtype=values.dtype)
+    ys[..., 0::2] = np.where(falling, highs, lows)
+    ys[..., 1::2] = np.where(falling, lows, highs)
+    return x, ys
+
+def lttb(y: np.ndarray, points: int) -> np.ndarray:
+    '''
+    indices of the samples largest triangle three buckets keeps: the first,
+    the last, and per bucket the one making the biggest triangle with the
+    previous pick and the mean of the next bucket
+    '''
+    samples = len(y)
+    if points >= samples or points < 3:
+        return np.arange(samples)
+    y = y.astype(np.float64)
+    # points - 2 buckets between the fixed ends, none empty since points < samples
+    edges = np.linspace(1, samples - 1, points - 1).astype(np.int64)
+    edges = np.append(edges, samples)
+    picks = np.empty(points, dtype=np.int64)
+    picks[0], picks[-1] = 0, samples - 1
+    for i in range(points - 2):
+        lo, hi, after = edges[i], edges[i + 1], edges[i + 2]
+        mean_x, mean_y = (hi + after - 1) / 2, y[hi:after].mean()
+        a = picks[i]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - mean_x) * (y[lo:hi] - y[a]) - (a - xs) * (mean_y - y[a]))
+        picks[i + 1] = lo + int(np.argmax(area))
+    return picks
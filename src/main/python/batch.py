@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+'''
+headless batch statistics for many sequence files
+
+files (a directory, glob patterns or plain paths) are spread over a process
+pool and every record produces one row: length, GC content, the top k-mers,
+peptide composition of the +1 frame translation (through --table, or of
+the record itself for peptide files, which have no GC content), and
+optionally TF-IDF cosine similarity to a set of reference records. rows are written as JSON
+Lines or tab separated columns as soon as each file finishes, so a run over
+thousands of files keeps nothing but the current rows in memory.
+nothing here imports matplotlib, and scipy only when --reference is given.
+
+    python batch.py genomes/ 'plates/*.ab1' -o stats.jsonl -k 3 --reference refs.fasta
+'''
+import argparse
+from glob import glob
+import json
+import multiprocessing as mp
+import os
+from pathlib import Path
+import sys
+from typing import Dict, Iterator, List
+
+from Bio import SeqIO
+
+import geneticcode
+import kmers
+import seqindex
+
+FORMATS = ('jsonl', 'tsv')
+TSV_COLUMNS = ['file', 'record', 'length', 'gc', 'top_kmers',
+               *[f'aa_{amino}' for amino in kmers.PEPTIDE_ALPHABET],
+               'best_reference', 'best_similarity', 'error']
+
+_reference = None
+
+
+def find_inputs(inputs: List[str]) -> List[str]:
+    '''
+    directories are searched (not recursively) for known sequence suffixes.
+    a file named by more than one input is listed once, where it first appears
+    '''
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = sorted(str(path) for path in Path(item).iterdir())
+        elif os.path.exists(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob(item, recursive=True))
+        for path in candidates:
+            if Path(path).suffix.lower() in seqindex.FORMATS and os.path.isfile(path):
+                found.setdefault(Path(path).resolve(), path)
+    return list(found.values())
+
+def iter_records(path: str) -> Iterator:
+    fmt = seqindex.detect_format(path)
+    if fmt == 'abi':
+        yield SeqIO.read(path, 'abi')
+    else:
+        yield from SeqIO.parse(path, fmt)
+
+def _init_worker(reference, k):
+    global _reference
+    _reference = None
+    if reference:
+        import tfidfindex
+        _reference = tfidfindex.KmerTfidfIndex(k)
+        _reference.add((record.id, str(record.seq)) for record in iter_records(reference))
+
+def record_stats(record, k: int, top: int, table: int = 1, peptide: bool = False) -> Dict:
+    # table is an NCBI genetic code id, peptide records are counted as they are
+    sequence = str(record.seq).upper()
+    length = len(sequence)
+    if peptide:
+        gc, aminos = None, sequence
+    else:
+        gc = round((sequence.count('G') + sequence.count('C')) / length, 6) if length else 0.0
+        trimmed = sequence[:len(sequence) - len(sequence) % 3]
+        aminos = str(record.seq[:len(trimmed)].translate(table=table)) if trimmed else ''
+    row = {
+        'record': record.id,
+        'length': length,
+        'gc': gc,
+        'kmers': dict(kmers.top_k(sequence, k, top)) if length >= k else {},
+        'peptide': kmers.counts(aminos, 1) if aminos else {},
+    }
+    if _reference is not None and len(_reference):
+        row['similarity'] = dict(_reference.query(sequence, top=len(_reference)))
+    return row
+
+def process_file(job) -> List[Dict]:
+    path, k, top, table = job
+    peptide = seqindex.is_peptide(path)
+    try:
+        rows = [{'file': path, **record_stats(record, k, top, table, peptide)}
+                for record in iter_records(path)]
+    except Exception as e:
+        return [{'file': path, 'error': f'{type(e).__name__}: {e}'}]
+    return rows or [{'file': path, 'error': 'no records found'}]
+
+def tsv_row(row: Dict) -> List[str]:
+    flat = {key: row.get(key, '') for key in ('file', 'record', 'length', 'gc', 'error')}
+    flat['gc'] = '' if flat['gc'] is None else flat['gc']
+    flat['top_kmers'] = ','.join(f'{kmer}={count}' for kmer, count in row.get('kmers', {}).items())
+    for amino in kmers.PEPTIDE_ALPHABET:
+        flat[f'aa_{amino}'] = row.get('peptide', {}).get(amino, 0) if 'error' not in row else ''
+    similarity = row.get('similarity')
+    if similarity:
+        best = max(similarity, key=similarity.get)
+        flat['best_reference'], flat['best_similarity'] = best, round(similarity[best], 6)
+    return [str(flat.get(column, '')) for column in TSV_COLUMNS]
+
+def run(inputs: List[str], out, fmt: str = 'jsonl', k: int = 3, top: int = 20,
+        reference: str = None, processes: int = None, table=1) -> int:
+    '''
+    write one row per record of every input file to the open text stream
+    out, in completion order. returns the number of rows written
+    '''
+    files = find_inputs(inputs)
+    if fmt == 'tsv':
+        out.write('\t'.join(TSV_COLUMNS) + '\n')
+    table = geneticcode.get(table).id
+    jobs = [(path, k, top, table) for path in files]
+    written = 0
+    with mp.Pool(processes, initializer=_init_worker, initargs=(reference, k)) as pool:
+        for rows in pool.imap_unordered(process_file, jobs):
+            for row in rows:
+                if fmt == 'tsv':
+                    out.write('\t'.join(tsv_row(row)) + '\n')
+                else:
+                    out.write(json.dumps(row) + '\n')
+                written += 1
+            out.flush()
+    return written
+
+def add_arguments(parser):
+    parser.add_argument('inputs', nargs='+',
+        help='directories, glob patterns or files (fasta, genbank, abi)')
+    parser.add_argument('-o', '--output', default='-',
+        help='output file, - for stdout')
+    parser.add_argument('--format', default='jsonl', choices=FORMATS,
+        help='JSON Lines rows, or tab separated columns')
+    parser.add_argument('-k', '--kmer', default=3, type=int,
+        help='k-mer length for the k-mer distribution and similarity')
+    parser.add_argument('--top', default=20, type=int,
+        help='how many of the most common k-mers to report')
+    parser.add_argument('--reference', default=None,
+        help='fasta/genbank file of reference records to score similarity against')
+    parser.add_argument('--table', default=1, type=geneticcode.get,
+        help='NCBI genetic code id or name for the peptide composition, e.g. 11 or Bacterial')
+    parser.add_argument('-p', '--processes', default=None, type=int,
+        help='worker processes, defaults to the number of cores')
+    return parser
+
+def main(args):
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        written = run(args.inputs, out, args.format, args.kmer, args.top,
+                      args.reference, args.processes, args.table)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f'{written} records processed', file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = add_arguments(argparse.ArgumentParser(
+        description='Batch k-mer, peptide and similarity statistics, no plotting'))
+    main(parser.parse_args())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+'''
+six frame codon usage
+
+sequences are encoded once into codon codes at every offset (see
+encoding.py), frame f of the forward strand is every third code from f and
+the reverse frames come from the reverse complement, so the counts for all
+six frames are six bincounts. with cds=True only the CDS features of
+GenBank records are counted, each in its own reading frame. counts are
+plain (frames, 64) integer arrays, so records, files and worker processes
+are merged by adding them, and whole files are streamed one record at a
+time.
+
+    python codonusage.py assembly.fasta other.gbk --cds -p 4 > usage.tsv
+'''
+import argparse
+import multiprocessing as mp
+import sys
+from typing import Dict, Iterable, List
+
+from Bio import SeqIO
+import numpy as np
+
+import encoding
+import geneticcode
+import seqindex
+
+FRAMES = ('+1', '+2', '+3', '-1', '-2', '-3')
+CODONS = [a + b + c for a in encoding.BASES for b in encoding.BASES for c in encoding.BASES]
+
+
+def frame_counts(sequence) -> np.ndarray:
+    # (6, 64) codon counts, rows in FRAMES order, codons containing N etc skipped
+    codes = encoding.encode_dna(sequence)
+    counts = np.zeros((6, 64), dtype=np.int64)
+    for strand, strand_codes in enumerate((codes, encoding.reverse_complement(codes))):
+        codons = encoding.codon_codes(strand_codes)
+        for frame in range(3):
+            counts[3 * strand + frame] = np.bincount(
+                codons[frame::3], minlength=encoding.INVALID_CODON + 1)[:64]
+    return counts
+
+def cds_counts(record) -> np.ndarray:
+    # (1, 64) codon counts over the CDS features of a record, in their own frame
+    counts = np.zeros((1, 64), dtype=np.int64)
+    for feature in record.features:
+        if feature.type != 'CDS':
+            continue
+        start = int(feature.qualifiers.get('codon_start', ['1'])[0]) - 1
+        codons = encoding.codon_codes(encoding.encode_dna(feature.extract(record.seq)))
+        counts[0] += np.bincount(codons[start::3], minlength=encoding.INVALID_CODON + 1)[:64]
+    return counts
+
+def synonymous_codons(table=1) -> Dict[str, List[int]]:
+    # amino acid (and '*' for stops) to the codon codes that encode it
+    return {amino: [encoding.codon_index(codon) for codon in codons]
+            for amino, codons in geneticcode.get(table).reverse.items()}
+
+
+class CodonUsage:
+    '''
+    >>> usage = CodonUsage.of_file('genome.gbk', cds=True)
+    >>> usage.counts, usage.frequencies(), usage.rscu()
+    >>> (usage + other).table()
+    '''
+    def __init__(self, counts: np.ndarray = None, cds: bool = False, records: int = 0):
+        self.cds = cds
+        self.counts = np.zeros((1 if cds else 6, 64), dtype=np.int64) if counts is None else counts
+        self.records = records
+
+    @property
+    def labels(self):
+        return ('CDS',) if self.cds else FRAMES
+
+    def add(self, record):
+        # a SeqRecord, or any sequence when counting all six frames
+        if self.cds:
+            self.counts += cds_counts(record)
+        else:
+            self.counts += frame_counts(record)
+        self.records += 1
+        return self
+
+    def __add__(self, other: 'CodonUsage') -> 'CodonUsage':
+        if self.cds != other.cds:
+            raise ValueError('cannot merge CDS and six frame codon usage')
+        return CodonUsage(self.counts + other.counts, self.cds, self.records + other.records)
+
+    @classmethod
+    def of_file(cls, path, cds: bool = False) -> 'CodonUsage':
+        usage = cls(cds=cds)
+        if cds:
+            for record in SeqIO.parse(path, seqindex.detect_format(path)):
+                usage.add(record)
+        else:
+            # the index yields one record's sequence at a time
+            for _, sequence in seqindex.open_index(path):
+                usage.add(sequence)
+        return usage
+
+    def frequencies(self) -> np.ndarray:
+        # each row divided by its total, so every frame sums to 1
+        totals = self.counts.sum(axis=1, keepdims=True)
+        return self.counts / np.where(totals, totals, 1)
+
+    def rscu(self, table=1) -> np.ndarray:
+        '''
+        relative synonymous codon usage: count over the mean count of the
+        codons for the same amino acid, 1 means no bias. 0 where an amino
+        acid was never seen
+        '''
+        rscu = np.zeros(self.counts.shape, dtype=np.float64)
+        for codes in synonymous_codons(table).values():
+            group = self.counts[:, codes]
+            mean = group.mean(axis=1, keepdims=True)
+            rscu[:, codes] = group / np.where(mean, mean, 1)
+        return rscu
+
+    def table(self, table=1) -> List[Dict]:
+        # one row per frame and codon, ready for json or a tsv writer
+        frequencies, rscu = self.frequencies(), self.rscu(table)
+        amino = {code: amino for amino, codes in synonymous_codons(table).items() for code in codes}
+        return [{'frame': label, 'codon': codon, 'amino_acid': amino.get(code, ''),
+                 'count': int(self.counts[row, code]),
+                 'frequency': float(frequencies[row, code]), 'rscu': float(rscu[row, code])}
+                for row, label in enumerate(self.labels) for code, codon in enumerate(CODONS)]
+
+
+def _file_usage(job) -> CodonUsage:
+    path, cds = job
+    return CodonUsage.of_file(path, cds)
+
+def usage_of_files(paths: Iterable[str], cds: bool = False, processes: int = None) -> CodonUsage:
+    # one file per task, merged in the parent as results arrive
+    total = CodonUsage(cds=cds)
+    jobs = [(path, cds) for path in paths]
+    if processes == 1 or len(jobs) < 2:
+        for job in jobs:
+            total += _file_usage(job)
+        return total
+    with mp.Pool(processes) as pool:
+        for usage in pool.imap_unordered(_file_usage, jobs):
+            total += usage
+    return total
+
+def main(args):
+    import batch
+    usage = usage_of_files(batch.find_inputs(args.inputs), args.cds, args.processes)
+    columns = ['frame', 'codon', 'amino_acid', 'count', 'frequency', 'rscu']
+    sys.stdout.write('\t'.join(columns) + '\n')
+    for row in usage.table(args.table):
+        sys.stdout.write('\t'.join(str(row[column]) for column in columns) + '\n')
+    print(f'{usage.records} records counted', file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Six frame or CDS codon usage, counts, frequency and RSCU')
+    parser.add_argument('inputs', nargs='+', help='directories, glob patterns or fasta/genbank files')
+    parser.add_argument('--cds', action='store_true', help='count CDS features of genbank records only')
+    parser.add_argument('--table', default=1, type=geneticcode.get,
+        help='NCBI genetic code id or name for RSCU')
+    parser.add_argument('-p', '--processes', default=None, type=int,
+        help='worker processes, defaults to the number of cores')
+    main(parser.parse_args())
@@ -0,0 +1,55 @@
+'''
+numpy encodings of nucleotide sequences
+
+A, C, G, T (or U) map to 0, 1, 2, 3 in either case, anything else maps to
+INVALID. codons are 6 bit codes 16*b1 + 4*b2 + b3, so ACGT order gives the
+usual AAA=0 .. TTT=63 numbering, and any codon touching an invalid base
+gets the code INVALID_CODON.
+'''
+import numpy as np
+
+INVALID = 4
+INVALID_CODON = 64
+BASES = 'ACGT'
+
+NUC_CODE = np.full(256, INVALID, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    NUC_CODE[ord(_base)] = NUC_CODE[ord(_base.lower())] = _code
+NUC_CODE[ord('U')] = NUC_CODE[ord('u')] = 3
+
+
+def as_bytes(sequence) -> bytes:
+    # str, Bio.Seq.Seq or Bio.SeqRecord.SeqRecord to ascii bytes
+    if hasattr(sequence, 'seq'):
+        sequence = sequence.seq
+    if isinstance(sequence, (bytes, bytearray)):
+        return bytes(sequence)
+    return str(sequence).encode('ascii')
+
+def encode_dna(sequence) -> np.ndarray:
+    return NUC_CODE[np.frombuffer(as_bytes(sequence), dtype=np.uint8)]
+
+def reverse_complement(codes: np.ndarray) -> np.ndarray:
+    rc = codes[::-1].copy()
+    valid = rc != INVALID
+    rc[valid] = 3 - rc[valid]
+    return rc
+
+def codon_codes(codes: np.ndarray) -> np.ndarray:
+    '''
+    code of the codon starting at every offset, len(codes) - 2 entries
+    covering all three frames, offset i is in frame i % 3
+    '''
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.uint8)
+    first, second, third = codes[:-2], codes[1:-1], codes[2:]
+    codons = (first << 4) | (second << 2) | third
+    invalid = (first == INVALID) | (second == INVALID) | (third == INVALID)
+    codons[invalid] = INVALID_CODON
+    return codons
+
+def codon_index(codon: str) -> int:
+    codes = encode_dna(codon)
+    if len(codes) != 3 or (codes == INVALID).any():
+        return INVALID_CODON
+    return int(codes[0]) << 4 | int(codes[1]) << 2 | int(codes[2])
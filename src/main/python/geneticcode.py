@@ -0,0 +1,91 @@
+'''
+registry of every NCBI genetic code, built once per process
+
+each code carries a 65 entry numpy lookup from codon code (see
+encoding.py) to amino acid byte, with X for codons holding anything but
+A, C, G or T, plus the codon -> amino acid dict and the reverse amino
+acid -> codons table that back translation needs. codes are picked by
+NCBI id or by any of their names, never interactively, so the same call
+works in worker processes, the batch CLI and the GUI. workers only need
+to be sent the id, the registry is rebuilt from Bio.Data.CodonTable the
+first time each process asks for it.
+'''
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+from Bio.Data import CodonTable
+import numpy as np
+
+import encoding
+
+STOP = '*'
+UNKNOWN = 'X'
+
+
+class GeneticCode(NamedTuple):
+    id: int
+    names: Tuple[str, ...]
+    # codon code -> amino acid byte, entry 64 (INVALID_CODON) is X
+    forward: np.ndarray
+    # codon -> amino acid, stops excluded like Bio's forward_table
+    forward_table: Dict[str, str]
+    # amino acid -> codons, '*' maps to the stop codons
+    reverse: Dict[str, Tuple[str, ...]]
+    start_codons: Tuple[str, ...]
+    stop_codons: Tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        return self.names[0]
+
+
+def _build(table) -> GeneticCode:
+    forward = np.full(encoding.INVALID_CODON + 1, ord(UNKNOWN), dtype=np.uint8)
+    reverse = {}
+    for codon, amino in table.forward_table.items():
+        forward[encoding.codon_index(codon)] = ord(amino)
+        reverse.setdefault(amino, []).append(codon)
+    for codon in table.stop_codons:
+        # codes 27, 28 and 31 read some stops as amino acids too, like biopython
+        # those translate to the amino acid and stay in both reverse lists
+        if codon not in table.forward_table:
+            forward[encoding.codon_index(codon)] = ord(STOP)
+    reverse[STOP] = list(table.stop_codons)
+    forward.setflags(write=False)
+    return GeneticCode(
+        id=table.id,
+        names=tuple(name for name in table.names if name),
+        forward=forward,
+        forward_table=dict(table.forward_table),
+        reverse={amino: tuple(codons) for amino, codons in reverse.items()},
+        start_codons=tuple(table.start_codons),
+        stop_codons=tuple(table.stop_codons),
+    )
+
+@lru_cache(maxsize=None)
+def registry() -> Dict[int, GeneticCode]:
+    return {table_id: _build(table) for table_id, table in sorted(CodonTable.unambiguous_dna_by_id.items())}
+
+@lru_cache(maxsize=None)
+def _names() -> Dict[str, int]:
+    return {name.lower(): code.id for code in registry().values() for name in code.names}
+
+def get(table: Union[int, str] = 1) -> GeneticCode:
+    '''
+    a genetic code by NCBI id (1 or '1') or by name, any case
+    ('Standard', 'vertebrate mitochondrial', 'SGC1')
+    '''
+    if isinstance(table, GeneticCode):
+        return table
+    key = table.strip() if isinstance(table, str) else table
+    if isinstance(key, str) and key.isdigit():
+        key = int(key)
+    if isinstance(key, str):
+        key = _names().get(key.lower(), key)
+    try:
+        return registry()[key]
+    except (KeyError, TypeError):
+        raise ValueError(f'unknown genetic code {table!r}, use an id or name from geneticcode.choices()') from None
+
+def choices() -> List[Tuple[int, str]]:
+    return [(code.id, code.name) for code in registry().values()]
@@ -0,0 +1,138 @@
+'''
+degenerate (IUPAC) pattern matching on 4-bit nucleotide masks
+
+every base becomes a mask with one bit per nucleotide, A=1 C=2 G=4 T=8,
+and an IUPAC code is the OR of the bases it stands for (R=A|G, N=15, ...).
+a pattern position matches a sequence position when their masks share a
+bit, so a degenerate primer or probe is compared with the genome by
+bitwise AND instead of expanding it into every concrete sequence.
+
+patterns are lists of segments, each segment a tuple of equal length
+alternatives, which covers plain IUPAC strings (one segment) as well as
+codon level alternatives such as temp_backtranslate's ambiguous_codon_table
+('L': ('TTR', 'CTN')) that no single IUPAC string can express. candidates
+are filtered one segment at a time, like pepsearch, so the cost is one pass
+over the genome plus the surviving candidates.
+'''
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+import encoding
+
+BASE_BITS = {'A': 1, 'C': 2, 'G': 4, 'T': 8, 'U': 8}
+IUPAC_BASES = {
+    'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T', 'U': 'T',
+    'R': 'AG', 'Y': 'CT', 'S': 'CG', 'W': 'AT', 'K': 'GT', 'M': 'AC',
+    'B': 'CGT', 'D': 'AGT', 'H': 'ACT', 'V': 'ACG', 'N': 'ACGT',
+}
+
+MASK = np.zeros(256, dtype=np.uint8)
+for _code, _bases in IUPAC_BASES.items():
+    MASK[ord(_code)] = MASK[ord(_code.lower())] = sum(BASE_BITS[base] for base in _bases)
+# complement swaps the A and T bits and the C and G bits
+COMPLEMENT = np.array([((m & 1) << 3) | ((m & 2) << 1) | ((m & 4) >> 1) | ((m & 8) >> 3)
+                       for m in range(16)], dtype=np.uint8)
+
+Pattern = Union[str, Sequence[Sequence[str]]]
+
+
+def encode(sequence) -> np.ndarray:
+    # 4-bit mask per base, anything that is not an IUPAC code is 0 and matches nothing
+    return MASK[np.frombuffer(encoding.as_bytes(sequence), dtype=np.uint8)]
+
+def compile_pattern(pattern: Pattern) -> List[List[np.ndarray]]:
+    '''
+    a string becomes one segment, otherwise each item of pattern is a
+    segment of alternatives, e.g. [('ATG',), ('TTR', 'CTN')]
+    '''
+    if isinstance(pattern, str):
+        pattern = [(pattern,)]
+    segments = []
+    for alternatives in pattern:
+        if isinstance(alternatives, str):
+            alternatives = (alternatives,)
+        masks = [encode(alternative) for alternative in alternatives]
+        if len({len(mask) for mask in masks}) != 1:
+            raise ValueError(f'alternatives {alternatives} differ in length')
+        if any((mask == 0).any() for mask in masks):
+            raise ValueError(f'{alternatives} contains a non IUPAC character')
+        segments.append(masks)
+    return segments
+
+def reverse_complement(segments: List[List[np.ndarray]]) -> List[List[np.ndarray]]:
+    return [[COMPLEMENT[mask[::-1]] for mask in alternatives] for alternatives in segments[::-1]]
+
+def mismatches(genome: np.ndarray, segments: List[List[np.ndarray]],
+               max_mismatches: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    start offsets in the encoded genome where segments match with at most
+    max_mismatches mismatched bases, and the mismatch count at each. a
+    segment scores the best of its alternatives. without a limit every
+    offset is returned
+    '''
+    span = sum(len(alternatives[0]) for alternatives in segments)
+    if not segments or len(genome) < span:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.arange(len(genome) - span + 1)
+    # pattern lengths stay far below 2**15, so int16 counts halve the traffic
+    counts = np.zeros(len(starts), dtype=np.int16)
+    full = True
+    offset = 0
+
+    def missed(position, bits):
+        # slices while every offset is still a candidate, gathers after that
+        column = genome[position:position + len(counts)] if full else genome[starts + position]
+        return (column & bits) == 0
+
+    def prune(seen):
+        # nothing can pass the limit before that many bases have been seen
+        nonlocal starts, counts, full
+        if max_mismatches is None or seen <= max_mismatches:
+            return
+        keep = counts <= max_mismatches
+        starts, counts, full = starts[keep], counts[keep], False
+
+    for alternatives in segments:
+        if len(alternatives) == 1:
+            # a single alternative can be filtered base by base
+            for i, bits in enumerate(alternatives[0]):
+                counts += missed(offset + i, bits)
+                prune(offset + i + 1)
+        else:
+            best = None
+            for mask in alternatives:
+                score = np.zeros(len(counts), dtype=np.int16)
+                for i, bits in enumerate(mask):
+                    score += missed(offset + i, bits)
+                best = score if best is None else np.minimum(best, score)
+            counts += best
+            prune(offset + len(alternatives[0]))
+        offset += len(alternatives[0])
+    return starts, counts.astype(np.int64)
+
+def find(sequence, pattern: Pattern, max_mismatches: int = 0,
+         both_strands: bool = True) -> List[Tuple[int, int, int, int]]:
+    '''
+    every match of a degenerate pattern with up to max_mismatches
+    mismatched bases, as (start, end, strand, mismatches) tuples in forward
+    strand coordinates, 0 based and end exclusive. reverse strand matches
+    are found by reverse complementing the pattern, not the genome.
+    an N in the genome matches anything, like any shared base
+    '''
+    genome = sequence if isinstance(sequence, np.ndarray) else encode(sequence)
+    segments = compile_pattern(pattern)
+    span = sum(len(alternatives[0]) for alternatives in segments)
+    hits = []
+    strands = [(1, segments)]
+    if both_strands:
+        strands.append((-1, reverse_complement(segments)))
+    for strand, compiled in strands:
+        starts, counts = mismatches(genome, compiled, max_mismatches)
+        hits.extend((start, start + span, strand, count)
+                    for start, count in zip(starts.tolist(), counts.tolist()))
+    return sorted(hits)
+
+def codon_pattern(protein: str, codon_table) -> List[Tuple[str, ...]]:
+    # one segment per amino acid, e.g. codon_pattern('ML', ambiguous_codon_table)
+    return [tuple(codon_table[amino_acid]) for amino_acid in protein]
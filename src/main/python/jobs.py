@@ -0,0 +1,115 @@
+'''
+cancellable progress reporting for long running viz calls
+
+a Progress object is handed to a function as its `progress` argument and
+called as progress(done, total), the same way pairwise.condensed_matrix
+reports. it forwards to whatever is listening (a Qt signal in the GUI) and
+raises JobCancelled on the next call once cancel() has been called from
+another thread, so a computation stops at its next progress step rather
+than running to the end. code that never calls progress (a library
+drawing a figure, a scan without progress steps) is stopped by run_job:
+while a job runs, cancel() also raises JobCancelled in the job's thread at
+its next python instruction. one long C call, such as a big numpy sort,
+still runs to its end first. nothing here imports Qt, see main.py for the
+QThreadPool runner built on top of it.
+'''
+import ctypes
+import inspect
+import threading
+from typing import Callable
+
+# CPython's way to raise an exception in another thread, absent elsewhere
+_set_async_exc = getattr(getattr(ctypes, 'pythonapi', None), 'PyThreadState_SetAsyncExc', None)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Progress:
+    '''
+    >>> progress = Progress(lambda done, total: print(f'{done}/{total}'))
+    >>> progress(1, 4)
+    1/4
+    >>> progress.cancel()
+    >>> progress(2, 4)
+    Traceback (most recent call last):
+    ...
+    jobs.JobCancelled
+    '''
+    def __init__(self, report: Callable = None):
+        self.report = report
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        # the thread run_job is running in, and whether it was interrupted yet
+        self._thread = None
+        self._interrupted = False
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled.set()
+            if self._thread is not None and not self._interrupted and _set_async_exc:
+                _set_async_exc(ctypes.c_ulong(self._thread), ctypes.py_object(JobCancelled))
+                self._interrupted = True
+
+    def _bind(self):
+        with self._lock:
+            self._thread = threading.get_ident()
+
+    def _unbind(self):
+        # after this no interruption is pending or can arrive in this thread
+        with self._lock:
+            if self._interrupted and _set_async_exc:
+                _set_async_exc(ctypes.c_ulong(self._thread), None)
+            self._thread = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def __call__(self, done: int, total: int = 0):
+        self.check()
+        if self.report:
+            self.report(done, total)
+
+
+def accepts_progress(func: Callable) -> bool:
+    try:
+        return 'progress' in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+def call_with_progress(func: Callable, progress: Progress):
+    '''
+    call func(), passing progress along if it takes a `progress` argument.
+    a job cancelled while func had no chance to notice still raises
+    JobCancelled, so its result is never delivered
+    '''
+    if progress is None:
+        return func()
+    progress.check()
+    result = func(progress=progress) if accepts_progress(func) else func()
+    progress.check()
+    return result
+
+def run_job(func: Callable, progress: Progress):
+    '''
+    call_with_progress, with progress.cancel() interrupting func wherever
+    it is rather than at its next progress step. meant for a worker thread
+    that only runs jobs, never for the UI thread
+    '''
+    progress._bind()
+    try:
+        return call_with_progress(func, progress)
+    finally:
+        while True:
+            # the interruption may land just as the job ends, it only lands once
+            try:
+                progress._unbind()
+                break
+            except JobCancelled:
+                pass
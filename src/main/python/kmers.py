@@ -0,0 +1,138 @@
+'''
+packed k-mer counting
+
+a sequence is encoded once into a uint8 array of symbol codes, 2 bits per
+symbol for DNA, 5 for peptides, or just enough bits for whatever symbols
+the sequence holds. rolling integer k-mer codes are built with numpy
+shifts and counted with bincount (or unique when the code space is too
+big for a dense table), so no per k-mer python objects are created
+unless they are asked for.
+'''
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import encoding
+
+DNA_ALPHABET = 'ACGT'
+PEPTIDE_ALPHABET = 'ACDEFGHIKLMNPQRSTVWYBXZJUO*'
+# largest code space counted with a dense bincount table
+DENSE_LIMIT = 1 << 20
+
+
+class Encoded:
+    '''
+    symbol codes for one sequence plus the alphabet needed to decode them
+    '''
+    def __init__(self, codes: np.ndarray, alphabet: str):
+        self.codes = codes
+        self.alphabet = alphabet
+        self.bits = max(1, int(np.ceil(np.log2(max(len(alphabet), 2)))))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def max_k(self) -> int:
+        return 64 // self.bits
+
+    def decode(self, code: int, k: int) -> str:
+        mask = (1 << self.bits) - 1
+        symbols = [(code >> (self.bits * shift)) & mask for shift in range(k - 1, -1, -1)]
+        return ''.join(self.alphabet[symbol] for symbol in symbols)
+
+
+def _table(alphabet: str) -> np.ndarray:
+    table = np.full(256, 255, dtype=np.uint8)
+    for code, symbol in enumerate(alphabet):
+        table[ord(symbol)] = code
+    return table
+
+_DNA_TABLE = _table(DNA_ALPHABET)
+_PEPTIDE_TABLE = _table(PEPTIDE_ALPHABET)
+
+
+def encode(sequence, alphabet: str = None) -> Encoded:
+    '''
+    pick the smallest fixed alphabet (DNA, then peptide) that covers the
+    sequence, or build one from the symbols present. case is significant
+    '''
+    raw = np.frombuffer(encoding.as_bytes(sequence), dtype=np.uint8)
+    if alphabet is None:
+        present = np.unique(raw)
+        for fixed, table in ((DNA_ALPHABET, _DNA_TABLE), (PEPTIDE_ALPHABET, _PEPTIDE_TABLE)):
+            if (table[present] != 255).all():
+                return Encoded(table[raw], fixed)
+        alphabet = ''.join(map(chr, present))
+    table = _table(alphabet)
+    codes = table[raw]
+    if (codes == 255).any():
+        raise ValueError(f'sequence has symbols outside alphabet {alphabet!r}')
+    return Encoded(codes, alphabet)
+
+def kmer_codes(encoded: Encoded, k: int) -> np.ndarray:
+    # integer code of the k-mer starting at every offset
+    if k > encoded.max_k():
+        raise ValueError(f'{k}-mers of {encoded.bits} bit symbols do not fit in 64 bits')
+    count = max(0, len(encoded) - k + 1)
+    codes = np.zeros(count, dtype=np.uint64)
+    symbols = encoded.codes.astype(np.uint64)
+    bits = np.uint64(encoded.bits)
+    for offset in range(k):
+        codes <<= bits
+        codes |= symbols[offset:offset + count]
+    return codes
+
+def fixed_codes(sequence, k: int, alphabet: str = DNA_ALPHABET) -> np.ndarray:
+    '''
+    k-mer codes over a fixed alphabet, case insensitive, so codes from
+    different sequences are comparable. windows touching a symbol outside
+    the alphabet (N, gaps, ...) are dropped
+    '''
+    raw = np.frombuffer(encoding.as_bytes(sequence).upper(), dtype=np.uint8)
+    symbols = _table(alphabet)[raw]
+    invalid = symbols == 255
+    symbols[invalid] = 0
+    codes = kmer_codes(Encoded(symbols, alphabet), k)
+    if invalid.any():
+        bad = np.concatenate(([0], np.cumsum(invalid)))
+        codes = codes[(bad[k:] - bad[:-k]) == 0]
+    return codes
+
+def count_codes(encoded: Encoded, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    # (distinct k-mer codes, their counts), codes ascending
+    codes = kmer_codes(encoded, k)
+    if (1 << (encoded.bits * k)) <= DENSE_LIMIT:
+        counts = np.bincount(codes.astype(np.intp), minlength=1 << (encoded.bits * k))
+        present = np.flatnonzero(counts)
+        return present.astype(np.uint64), counts[present]
+    return np.unique(codes, return_counts=True)
+
+def counts(sequence, k: int) -> Dict[str, int]:
+    encoded = encode(sequence)
+    if k > encoded.max_k():
+        return dict(Counter(windows(sequence, k)))
+    codes, tally = count_codes(encoded, k)
+    return {encoded.decode(int(code), k): int(n) for code, n in zip(codes, tally)}
+
+def top_k(sequence, k: int, n: int = 20) -> List[Tuple[str, int]]:
+    '''
+    the n most common k-mers as (kmer, count) pairs, like Counter.most_common
+    ties are broken by k-mer code, i.e. alphabet order
+    '''
+    encoded = encode(sequence)
+    if k > encoded.max_k():
+        return Counter(windows(sequence, k)).most_common(n)
+    codes, tally = count_codes(encoded, k)
+    if 0 < n < len(tally):
+        # keep everything tied with the n-th count so the tie break is exact
+        cutoff = np.partition(tally, len(tally) - n)[len(tally) - n]
+        keep = tally >= cutoff
+        codes, tally = codes[keep], tally[keep]
+    order = np.lexsort((codes, -tally))[:n]
+    return [(encoded.decode(int(codes[i]), k), int(tally[i])) for i in order]
+
+def windows(sequence, k: int) -> List[str]:
+    # every k long substring, by slicing rather than joining tuples
+    text = str(sequence.seq if hasattr(sequence, 'seq') else sequence)
+    return [text[i:i + k] for i in range(max(0, len(text) - k + 1))]
@@ -0,0 +1,95 @@
+'''
+bit-parallel levenshtein distance (Myers 1999, Hyyro 2001)
+
+python ints are used as arbitrary width bit vectors, so one column of the
+dynamic programming matrix is updated with a handful of integer operations
+no matter how long the pattern is. memory is linear in the pattern length.
+'''
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+
+
+def pattern_masks(pattern: Sequence) -> Dict:
+    # one bit mask per symbol, bit i set where pattern[i] == symbol
+    peq = {}
+    for i, symbol in enumerate(pattern):
+        peq[symbol] = peq.get(symbol, 0) | (1 << i)
+    return peq
+
+
+def _score(peq: Dict, m: int, text: Sequence, cutoff: int = None) -> int:
+    # score-only myers/hyyro update, one column per symbol of text
+    if cutoff is not None and abs(m - len(text)) > cutoff:
+        return cutoff + 1
+    if m == 0:
+        return len(text)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    # the last row can fall by at most one per remaining column, so once
+    # score - remaining passes cutoff the final distance must as well
+    remaining = len(text)
+    for symbol in text:
+        eq = peq.get(symbol, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        remaining -= 1
+        if cutoff is not None and score - remaining > cutoff:
+            return cutoff + 1
+    if cutoff is not None and score > cutoff:
+        return cutoff + 1
+    return score
+
+
+def distance(str1: Sequence, str2: Sequence, cutoff: int = None) -> int:
+    '''
+    levenshtein distance between two sequences, score only, linear memory
+    the longer sequence is used as the bit vector so the python loop
+    runs over the shorter one. with a cutoff, any distance above it is
+    reported as cutoff + 1, which lets hopeless comparisons stop early
+    '''
+    if len(str1) < len(str2):
+        str1, str2 = str2, str1
+    return _score(pattern_masks(str1), len(str1), str2, cutoff)
+
+
+def distances(query: Sequence, targets: Iterable[Sequence], cutoff: int = None) -> np.ndarray:
+    '''
+    score one query against many targets in a single call
+    the query bit masks are built once and reused for every target
+    '''
+    peq = pattern_masks(query)
+    m = len(query)
+    return np.fromiter((_score(peq, m, target, cutoff) for target in targets), dtype=np.float64)
+
+
+def matrix(str1: Sequence, str2: Sequence) -> np.ndarray:
+    '''
+    full (len(str1)+1, len(str2)+1) dynamic programming matrix, for when the
+    alignment itself is needed and not just the score
+    each row is filled with vector operations, the insertion dependency along
+    the row is resolved with a running minimum
+    '''
+    xlen, ylen = len(str1) + 1, len(str2) + 1
+    distmatrix = np.zeros((xlen, ylen))
+    distmatrix[0] = np.arange(ylen)
+    offsets = np.arange(ylen)
+    row2 = np.array(list(str2), dtype=object) if ylen > 1 else np.empty(0, dtype=object)
+    for x in range(1, xlen):
+        prev = distmatrix[x - 1]
+        row = np.empty(ylen)
+        row[0] = x
+        row[1:] = np.minimum(prev[1:] + 1, prev[:-1] + (row2 != str1[x - 1]))
+        distmatrix[x] = np.minimum.accumulate(row - offsets) + offsets
+    return distmatrix
@@ -3,6 +3,7 @@ from datetime import datetime
 from enum import Enum
 from functools import partial
 import argparse
+import multiprocessing as mp
 import os
 from pathlib import Path
 import random
@@ -10,11 +11,15 @@ import sys
 import typing
 import uuid
 
+import jobs
+import profiling
+import seqview
 import viz
 
 from fbs_runtime.application_context.PySide2 import ApplicationContext as AppCtx
 from PySide2 import QtGui, QtWidgets
-from PySide2.QtCore import (Qt, QUrl, Signal, Slot, QTimer, QObject)
+from PySide2.QtCore import (Qt, QUrl, Signal, Slot, QTimer, QObject, QRunnable, QThreadPool,
+        QAbstractListModel, QModelIndex)
 from PySide2.QtGui import *
 from PySide2.QtMultimedia import QMediaContent, QMediaPlayer, QSound, QSoundEffect
 from PySide2.QtPrintSupport import *
@@ -23,23 +28,30 @@ from PySide2.QtWidgets import *
 
 DEV = False
 EXPIRY_DATE = '9999-12-31'
+# how long closing the window waits for a cancelled job to stop
+CLOSE_WAIT_MS = 3000
 HELP_STRING = 'INSERT INSTRUCTIONS HERE'
 
+# VIZFUNCS entries run on the UI thread and only ask for input, they
+# return the call to run in the background, or None when the user cancels
+def noInput(func, *args):
+    return partial(func, *args)
+
 def getNumber(func, file):
     quid = QInputDialog()
     input, ok = quid.getInt(quid, 'How many?', 'Enter number > 0', 1, 1, 100, 1)
     if ok:
-        return func(input, file)
+        return partial(func, input, file)
     else:
-        return 1
+        return None
 
 def getStringDist(func, file):
     quid = QInputDialog()
     input, ok = quid.getText(quid, 'Enter nuc/pep', 'type or paste your sequence here')
     if ok and input:
-        return viz.calcDist(func, input, file)
+        return partial(viz.calcDist, func, input, file)
     else:
-        return 'NOT OK'
+        return None
 
 def funcHolder(func1, func2, *args):
     return func1(func2, *args)
@@ -50,18 +62,172 @@ def makePlotWindow(pic):
         image.setPixmap(pic)
         return image
 
+# every entry reaches its data through viz.cache, so pressing a button again
+# on an unchanged file reuses the parsed record and the computed counts,
+# matrices and graphic records instead of redoing them
 VIZFUNCS = {
-    'nucdist': partial(viz.nucleotide_distribution, 3),
-    'pepdist': partial(viz.peptide_distribution, 1),
+    'nucdist': partial(noInput, viz.nucleotide_distribution, 3),
+    'pepdist': partial(noInput, viz.peptide_distribution, 1),
     'nucNdist': partial(getNumber, viz.nucleotide_distribution),
     'pepNdist': partial(getNumber, viz.peptide_distribution),
-    'linerec': partial(viz.plot_graphic_record, 'linear'),
-    'circrec': partial(viz.plot_graphic_record, 'circular'),
+    'linerec': partial(noInput, viz.plot_graphic_record, 'linear'),
+    'circrec': partial(noInput, viz.plot_graphic_record, 'circular'),
     'nucHeatMap': partial(getNumber, viz.nucSimPlot),
     'pepHeatMap': partial(getNumber, viz.pepSimPlot),
+    'stringDist': partial(getStringDist, viz.lev_distance),
+    }
+# entries whose result is rows for a table rather than a plot, by column names
+TABLEFUNCS = {
+    'stringDist': ('distance', 'position', 'window'),
     }
 
 
+class JobSignals(QObject):
+    # QRunnable is not a QObject, so a job's signals live here
+    progress = Signal(int, int, int)
+    finished = Signal(int, object)
+    error = Signal(int, str)
+    cancelled = Signal(int)
+
+
+class Job(QRunnable):
+    def __init__(self, jobId, name, func):
+        super(Job, self).__init__()
+        self.setAutoDelete(False)
+        self.jobId = jobId
+        self.name = name
+        self.func = func
+        self.signals = JobSignals()
+        self.progress = jobs.Progress(partial(self.signals.progress.emit, jobId))
+
+    def run(self):
+        try:
+            result = jobs.run_job(self.func, self.progress)
+        except jobs.JobCancelled:
+            self.signals.cancelled.emit(self.jobId)
+        except Exception as e:
+            self.signals.error.emit(self.jobId, f'{type(e).__name__}: {e}')
+        else:
+            self.signals.finished.emit(self.jobId, result)
+
+
+class JobRunner(QObject):
+    '''
+    runs viz calls off the UI thread, one at a time, queueing the rest.
+    pyplot keeps global state and is not thread safe, so the pool only
+    gets one thread. cancelling a running job interrupts it wherever it
+    is (see jobs.run_job), not only at progress steps. signals are emitted
+    on the UI thread
+    '''
+    progress = Signal(int, int, int)
+    finished = Signal(int, object)
+    error = Signal(int, str)
+    cancelled = Signal(int)
+    queueChanged = Signal(int)
+
+    def __init__(self, parent=None):
+        super(JobRunner, self).__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.jobs = {}
+        self.nextId = 0
+
+    def submit(self, name, func):
+        self.nextId += 1
+        job = Job(self.nextId, name, func)
+        job.signals.progress.connect(self.progress)
+        job.signals.finished.connect(self.finished)
+        job.signals.error.connect(self.error)
+        job.signals.cancelled.connect(self.cancelled)
+        for signal in (job.signals.finished, job.signals.error, job.signals.cancelled):
+            signal.connect(self._done)
+        self.jobs[job.jobId] = job
+        self.pool.start(job)
+        self.queueChanged.emit(len(self.jobs))
+        return job.jobId
+
+    def cancel(self, jobId):
+        job = self.jobs.get(jobId)
+        if job is None:
+            return
+        if self.pool.tryTake(job):
+            # still queued, it never started so nothing will report back
+            self.cancelled.emit(jobId)
+            self._done(jobId)
+        else:
+            job.progress.cancel()
+
+    def cancelRunning(self):
+        # jobs run in submission order, so the oldest one is running
+        if self.jobs:
+            self.cancel(next(iter(self.jobs)))
+
+    def cancelAll(self):
+        for jobId in reversed(list(self.jobs)):
+            self.cancel(jobId)
+
+    def name(self, jobId):
+        job = self.jobs.get(jobId)
+        return job.name if job else ''
+
+    def _done(self, jobId, *args):
+        if self.jobs.pop(jobId, None) is not None:
+            self.queueChanged.emit(len(self.jobs))
+
+
+class ProfileSignals(QObject):
+    # profiling listeners run on job threads, this carries records to the UI thread
+    record = Signal(object)
+
+
+class ProfilePanel(QTableWidget):
+    '''
+    DEV mode table of profiling records, newest first: every stage and a
+    summary row per finished button press or viz entry point
+    '''
+    COLUMNS = ('entry', 'stage', 'name', 'wall s', 'self s', 'cpu s', 'RSS MB', 'RSS +MB', 'peak +MB')
+    MAX_ROWS = 500
+
+    def __init__(self, parent=None):
+        super(ProfilePanel, self).__init__(0, len(self.COLUMNS), parent)
+        self.setHorizontalHeaderLabels(self.COLUMNS)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.verticalHeader().hide()
+        self.signals = ProfileSignals()
+        self.signals.record.connect(self.addRecord)
+        # closeEvent never reaches a panel inside a dock, so the listener is
+        # dropped when the panel is destroyed or the app quits, whichever is first
+        listener = self.signals.record.emit
+        profiling.add_listener(listener)
+        detach = lambda *args: profiling.remove_listener(listener)
+        self.destroyed.connect(detach)
+        QApplication.instance().aboutToQuit.connect(detach)
+
+    @Slot(object)
+    def addRecord(self, record):
+        megabytes = lambda value: '' if value is None else f'{value / 2**20:.1f}'
+        summary = record['type'] == 'entry'
+        if summary:
+            stages = record['stages']
+            name = ', '.join(f"{stage} {times['wall']:.3f}" for stage, times in stages.items())
+        else:
+            name = record['name']
+        cells = (record['entry'] or '', 'total' if summary else record['stage'], name,
+                 f"{record['wall']:.4f}", '' if summary else f"{record['self_wall']:.4f}",
+                 f"{record['cpu']:.4f}", megabytes(record['rss']), megabytes(record['rss_growth']),
+                 megabytes(record['peak_growth']))
+        self.insertRow(0)
+        for column, text in enumerate(cells):
+            item = QTableWidgetItem(text)
+            if summary:
+                font = item.font()
+                font.setBold(True)
+                item.setFont(font)
+            self.setItem(0, column, item)
+        if self.rowCount() > self.MAX_ROWS:
+            self.removeRow(self.rowCount() - 1)
+
+
 class QHLine(QFrame):
     def __init__(self):
         super(QHLine, self).__init__()
@@ -92,6 +258,7 @@ class VizButtons(QWidget):
         self.btn6 = QPushButton()
         self.btn7 = QPushButton()
         self.btn8 = QPushButton()
+        self.btn9 = QPushButton()
         self.btnGroup.addButton(self.btn1)
         self.btnGroup.addButton(self.btn2)
         self.btnGroup.addButton(self.btn3)
@@ -100,6 +267,7 @@ class VizButtons(QWidget):
         self.btnGroup.addButton(self.btn6)
         self.btnGroup.addButton(self.btn7)
         self.btnGroup.addButton(self.btn8)
+        self.btnGroup.addButton(self.btn9)
         for btn in self.btnGroup.buttons():
             btn.setIcon(QIcon(QPixmap(appctxt.get_resource('icon/64.png'))))
             btn.setFixedSize(96, 96)
@@ -145,24 +313,103 @@ class InputForm(QInputDialog):
         print(f'Sent: {self.edit.text()}')
 
 
+class SequenceModel(QAbstractListModel):
+    '''
+    one row per line of a memory mapped file, with the coordinate of the
+    first residue in a gutter. rows are only decoded when the view asks
+    for them, which is only ever the ones on screen
+    '''
+    def __init__(self, lines, parent=None):
+        super(SequenceModel, self).__init__(parent)
+        self.lines = lines
+        self.gutter = len(str(int(lines.coordinates.max()))) if len(lines) else 1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        coordinate = self.lines.coordinate(index.row())
+        return f"{coordinate or '':>{self.gutter}} | {self.lines.line(index.row())}"
+
+
+class FeatureModel(QAbstractListModel):
+    # one row per feature or fasta header, a fasta of a million records is still one model
+    def __init__(self, features, parent=None):
+        super(FeatureModel, self).__init__(parent)
+        self.features = features
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.features)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        feature = self.features[index.row()]
+        return f'{feature.key}  {feature.location}'
+
+
+class SequenceView(QSplitter):
+    # read only file viewer, features (or fasta headers) on the left jump to their sequence
+    def __init__(self, filePath):
+        super(SequenceView, self).__init__()
+        self.filePath = filePath
+        self.lines = seqview.LineIndex(filePath)
+        self.model = SequenceModel(self.lines, self)
+        self.view = QListView()
+        # uniform rows let the view place any row without measuring the others
+        self.view.setUniformItemSizes(True)
+        self.view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.view.setModel(self.model)
+        self.featureModel = FeatureModel(self.lines.features, self)
+        self.featureList = QListView()
+        self.featureList.setUniformItemSizes(True)
+        self.featureList.setModel(self.featureModel)
+        self.featureList.selectionModel().currentRowChanged.connect(
+            lambda current, previous: self.jumpTo(current.row()))
+        self.featureList.setVisible(bool(self.lines.features))
+        self.addWidget(self.featureList)
+        self.addWidget(self.view)
+        self.setStretchFactor(1, 3)
+
+    def jumpTo(self, row):
+        if row < 0: return
+        line = self.lines.sequence_line(self.lines.features[row])
+        index = self.model.index(line)
+        self.view.scrollTo(index, QAbstractItemView.PositionAtTop)
+        self.view.setCurrentIndex(index)
+
+    def closeFile(self):
+        # unmaps the file, the view must not be shown again after this
+        self.view.setModel(None)
+        self.featureList.setModel(None)
+        self.lines.close()
+
+
 class FileTabs(QTabWidget):
     def __init__(self, *args, **kwargs):
         super(FileTabs, self).__init__(*args, **kwargs)
-        tab = QTextEdit()
         demoFile = 'data/NC_005816.gb'
-        demoText = open(appctxt.get_resource(demoFile), 'r').read()
         demoName = demoFile.split('/')[-1]
-        tab.setDocumentTitle(demoName)
-        tab.setText(demoText)
-        tab.filePath = appctxt.get_resource(demoFile)
+        tab = SequenceView(appctxt.get_resource(demoFile))
         self.addTab(tab, demoName)
         self.addTab(QWidget(), 'add tab')
         self.setMovable(True)
         self.setTabsClosable(True)
+        self.tabCloseRequested.connect(self.closeTab)
+
+    def closeTab(self, index):
+        # a sequence tab holds its file mapped and open until closed here
+        widget = self.widget(index)
+        self.removeTab(index)
+        if isinstance(widget, SequenceView):
+            widget.closeFile()
+        widget.deleteLater()
 
 
 class PlotView(QGraphicsView):
-    def __init__(self, pic):
+    def __init__(self, pic, figure=None):
         super(PlotView, self).__init__()
         '''
         1 create a view
@@ -170,9 +417,17 @@ class PlotView(QGraphicsView):
         3 add scene to view
         4 create QGrapicsPixmap with plot
         5 add it to view with .addItem()
+        pic is a resource path or png bytes rendered in memory, figure is
+        kept so it can be rendered again at full resolution or exported
         '''
         self._scene = QGraphicsScene(self)
-        self.pic = QPixmap(appctxt.get_resource(pic))
+        self.figure = figure
+        self.fullResolution = figure is None
+        if isinstance(pic, bytes):
+            self.pic = QPixmap()
+            self.pic.loadFromData(pic, 'PNG')
+        else:
+            self.pic = QPixmap(appctxt.get_resource(pic))
         self.picItem = QGraphicsPixmapItem(self.pic)
         self._scene.addItem(self.picItem)
         self.setScene(self._scene)
@@ -180,6 +435,26 @@ class PlotView(QGraphicsView):
         self.setDragMode(QGraphicsView.ScrollHandDrag)
         # self.setFixedSize(500, 500)
 
+    def setPng(self, png):
+        self.pic = QPixmap()
+        self.pic.loadFromData(png, 'PNG')
+        self.picItem.setPixmap(self.pic)
+        self._scene.setSceneRect(self.picItem.boundingRect())
+        self.fullResolution = True
+
+
+class ResultTable(QTableWidget):
+    # rows a button returned instead of a plot, e.g. calcDist's closest windows
+    def __init__(self, rows, columns, parent=None):
+        super(ResultTable, self).__init__(len(rows), len(columns), parent)
+        self.setHorizontalHeaderLabels(columns)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.verticalHeader().hide()
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.setItem(row, column, QTableWidgetItem(str(value)))
+        self.resizeColumnsToContents()
+
 
 class PlotTabs(QTabWidget):
     def __init__(self, *args, **kwargs):
@@ -188,6 +463,13 @@ class PlotTabs(QTabWidget):
         self.addTab(QWidget(), 'add tab')
         self.setMovable(True)
         self.setTabsClosable(True)
+        self.tabCloseRequested.connect(self.closeTab)
+
+    def closeTab(self, index):
+        # dropping the tab drops its figure too
+        widget = self.widget(index)
+        self.removeTab(index)
+        widget.deleteLater()
 
     def makePlotWindow(self, pic):
             image = QLabel()
@@ -213,6 +495,25 @@ class Grid(QWidget):
             btn.setText(fname)
             btn.clicked.connect(partial(self.runButtonFunc, btn.text()))
         buttonLayout.addStretch()
+        self.jobs = JobRunner(self)
+        self.jobs.progress.connect(self.showProgress)
+        self.jobs.finished.connect(self.jobFinished)
+        self.onFinished = {}
+        self.jobs.error.connect(self.showError)
+        self.jobs.cancelled.connect(self.showCancelled)
+        self.jobs.queueChanged.connect(self.showQueue)
+        self.jobStatus = QLabel('')
+        self.progressBar = QProgressBar()
+        self.progressBar.setFixedWidth(96)
+        self.progressBar.setTextVisible(False)
+        self.progressBar.hide()
+        self.cancelButton = QPushButton('Cancel')
+        self.cancelButton.setFixedWidth(96)
+        self.cancelButton.setEnabled(False)
+        self.cancelButton.clicked.connect(self.jobs.cancelRunning)
+        buttonLayout.addWidget(self.jobStatus)
+        buttonLayout.addWidget(self.progressBar)
+        buttonLayout.addWidget(self.cancelButton)
         # look into pyqtGraph for plotting at runtime
         # self.demoplot = self.topPlotTabs.makePlotWindow('plot/demoplot.png')
         # self.nucplot = self.botPlotTabs.makePlotWindow('plot/nucplot.png')
@@ -242,26 +543,116 @@ class Grid(QWidget):
     def runButtonFunc(self, btnFunc):
         currentFile = self.fileTabs.currentWidget().filePath
         currentFile = appctxt.get_resource(currentFile)
-        filename, filetype = currentFile.split('.')
+        filename, filetype = os.path.splitext(currentFile)
         print(f'called func: {btnFunc}')
         print(f'filename: {filename}')
         print(f'filetype: {filetype}')
-        try:
-            result = VIZFUNCS[btnFunc](currentFile)
-            if type(result) == None: return
-            fname = f"{btnFunc}{datetime.now().strftime('%Y%m%d_%H%M%S')}_plot.png"
-            fpath = os.path.join(self.PLOTDIR, fname)
-            result.savefig(fpath, transparent=True, bbox_inches='tight')
-            result.clf()
-            print(f'{fname} created')
-            newPlot = appctxt.get_resource(fpath)
-            self.botPlotTabs.insertTab(0, PlotView(newPlot), fname.split('_')[0])
-            self.botPlotTabs.setCurrentIndex(0)
-        except AttributeError as e:
-            record = viz.get_seq(currentFile)
-            print(f'record: {record}')
-            print(f'func called: {VIZFUNCS[btnFunc]}')
-            print(e)
+        # dialogs have to run here on the UI thread, the plot itself does not
+        func = VIZFUNCS[btnFunc](currentFile)
+        if func is None: return
+        if btnFunc in TABLEFUNCS:
+            self.submit(btnFunc, partial(self.computeRows, btnFunc, func), partial(self.showTable, btnFunc))
+            return
+        self.submit(btnFunc, partial(self.renderPlot, btnFunc, func), partial(self.showPlot, btnFunc))
+
+    def submit(self, name, func, onFinished):
+        jobId = self.jobs.submit(name, func)
+        self.onFinished[jobId] = onFinished
+        print(f'job {jobId} queued: {name}')
+        return jobId
+
+    @Slot(int, object)
+    def jobFinished(self, jobId, result):
+        # a job whose view went away has no callback left
+        onFinished = self.onFinished.pop(jobId, None)
+        if onFinished is not None: onFinished(result)
+
+    def forgetJob(self, jobId, *args):
+        # the result has nowhere to go, drop the callback and stop the job
+        self.onFinished.pop(jobId, None)
+        self.jobs.cancel(jobId)
+
+    def renderPlot(self, name, func, progress=None):
+        # runs on the job thread, so pyplot is only ever touched there.
+        # only a downsampled preview is rendered, in memory, nothing is saved.
+        # the whole button press is one profiling entry, preview included
+        with profiling.entry(name):
+            try:
+                result = jobs.call_with_progress(func, progress)
+            except BaseException:
+                # a plot cut short leaves its half drawn figure on pyplot
+                if viz._plt is not None: viz._plt.close('all')
+                raise
+            if result is None: return None
+            figure = viz.as_figure(result)
+            return figure, viz.render_png(figure)
+
+    def computeRows(self, name, func, progress=None):
+        # runs on the job thread, for TABLEFUNCS entries there is nothing to draw
+        with profiling.entry(name):
+            return jobs.call_with_progress(func, progress)
+
+    def showTable(self, btnFunc, rows):
+        if rows is None: return
+        self.botPlotTabs.insertTab(0, ResultTable(rows, TABLEFUNCS[btnFunc]), btnFunc)
+        self.botPlotTabs.setCurrentIndex(0)
+
+    def showPlot(self, btnFunc, rendered):
+        if rendered is None: return
+        figure, png = rendered
+        view = PlotView(png, figure)
+        for label, slot in (('Full resolution', self.renderFull), ('Export...', self.exportPlot)):
+            action = QAction(label, view)
+            action.triggered.connect(partial(slot, view))
+            view.addAction(action)
+        view.setContextMenuPolicy(Qt.ActionsContextMenu)
+        self.botPlotTabs.insertTab(0, view, btnFunc)
+        self.botPlotTabs.setCurrentIndex(0)
+
+    def renderFull(self, view, checked=False):
+        if view.fullResolution: return
+        render = partial(viz.render_png, view.figure, viz.FULL_DPI)
+        jobId = self.submit('full resolution', render, view.setPng)
+        # closing the tab deletes the view, so setPng must not outlive it
+        view.destroyed.connect(partial(self.forgetJob, jobId))
+
+    def exportPlot(self, view=None, checked=False):
+        view = view or self.botPlotTabs.currentWidget()
+        if getattr(view, 'figure', None) is None: return
+        name = self.botPlotTabs.tabText(self.botPlotTabs.indexOf(view))
+        fname = f"{name}{datetime.now().strftime('%Y%m%d_%H%M%S')}_plot.png"
+        fpath, _ = QFileDialog.getSaveFileName(
+            self, 'Export plot', os.path.join(self.PLOTDIR, fname),
+            'Images (*.png *.svg *.pdf)')
+        if not fpath: return
+        self.submit('export', partial(viz.export_figure, view.figure, fpath),
+                    lambda fpath: print(f'{fpath} created'))
+
+    @Slot(int, int, int)
+    def showProgress(self, jobId, done, total):
+        # total 0 means the job cannot tell how far along it is
+        self.progressBar.setRange(0, total)
+        self.progressBar.setValue(done)
+
+    @Slot(int, str)
+    def showError(self, jobId, message):
+        self.onFinished.pop(jobId, None)
+        print(f'job {jobId} failed: {message}')
+        QMessageBox.warning(self, 'Plot failed', message)
+
+    @Slot(int)
+    def showCancelled(self, jobId):
+        self.onFinished.pop(jobId, None)
+        print(f'job {jobId} cancelled')
+
+    @Slot(int)
+    def showQueue(self, count):
+        busy = count > 0
+        self.progressBar.setVisible(busy)
+        self.cancelButton.setEnabled(busy)
+        self.jobStatus.setText(f'{count - 1} queued' if count > 1 else '')
+        # busy indicator until the next job reports progress
+        self.progressBar.setRange(0, 0)
 
 
 class MainWindow(QMainWindow):
@@ -285,6 +676,10 @@ class MainWindow(QMainWindow):
         help_action.setStatusTip('How to use this program')
         help_action.triggered.connect(showHelp)
         self.help_menu.addAction(help_action)
+        export_action = QAction('Export plot...', self)
+        export_action.setShortcut('Ctrl+E')
+        export_action.triggered.connect(lambda checked=False: mainWidget.exportPlot())
+        self.file_menu.addAction(export_action)
         exit_action = QAction('Exit', self)
         exit_action.setShortcut('Ctrl+Q')
         exit_action.triggered.connect(self.exit_app)
@@ -293,6 +688,13 @@ class MainWindow(QMainWindow):
         # self.setWindowState(Qt.WindowMaximized)
 
     def closeEvent(self, event):
+        grid = self.centralWidget()
+        grid.jobs.cancelAll()
+        if not grid.jobs.pool.waitForDone(CLOSE_WAIT_MS):
+            # stuck in one long C call, the pool would wait for it on exit,
+            # and there is nothing of a cancelled job left to save
+            print('a cancelled job did not stop, exiting without it')
+            os._exit(0)
         if DEV: event.accept()
 
         # TODO: add confirmation/cleanup dialogue here
@@ -316,9 +718,14 @@ class AppContext(AppCtx):
 
     def run(self):
         self.grid = Grid()
-        if DEV:
-            print('show DEV things here...')
         self.mainWindow = MainWindow(self.grid)
+        if DEV:
+            # live stage timings, also kept in data/profile.jsonl
+            profiling.configure(log=os.path.join(viz.DATADIR, 'profile.jsonl'))
+            profileDock = QDockWidget('Profile', self.mainWindow)
+            profileDock.setWidget(ProfilePanel(profileDock))
+            self.mainWindow.addDockWidget(Qt.BottomDockWidgetArea, profileDock)
+            self.mainWindow.view_menu.addAction(profileDock.toggleViewAction())
         self.mainWindow.resize(1280, 720)
         self.mainWindow.show()
         if not DEV and datetime.today().isoformat() > EXPIRY_DATE:
@@ -331,6 +738,12 @@ class AppContext(AppCtx):
 
 
 if __name__ == '__main__':
+    # figures are drawn on job threads and shown as pixmaps, never in a
+    # matplotlib window, so the Qt backend is not wanted
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    # worker pools (heatMatrix's) start from job threads, and forking a
+    # process that runs Qt and other threads can deadlock the child
+    mp.set_start_method('spawn')
     parser = argparse.ArgumentParser()
     parser.add_argument('--dev', '-d', help='''\
         reveals some more widgets and does not send session\
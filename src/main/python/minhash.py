@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+'''
+MinHash sketches of canonical k-mers, for Mash style genome distances
+
+every k-mer is packed into 2 bits per base and the smaller of its code and
+its reverse complement's is hashed (murmur3's 64 bit finaliser), so a
+genome and its reverse complement get the same sketch. a sketch keeps the
+`size` smallest distinct hashes. sketches are written beside the data as
+<file>.sketch.npz and reused until the file changes or other parameters
+are asked for. records are hashed a chunk of CHUNK bases at a time, as
+the k-mer codes and hashes take about 30 bytes per base.
+
+two sketches are compared up to the smaller of their largest hashes,
+where both hold every hash of their genome, and the Jaccard estimate is
+shared over union within that range. for a whole collection the shared
+counts come from one sparse product of the sketch by hash membership
+matrix, so thousands of genomes take seconds. Mash distance is
+-ln(2J / (1 + J)) / k, see Ondov et al. 2016.
+
+    python minhash.py genomes/ -k 21 -s 1000 -p 4 -o distances.tsv --plot mash.png
+'''
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+import sys
+from types import GeneratorType
+from typing import Iterable, List, NamedTuple
+
+import numpy as np
+from scipy import sparse
+
+import encoding
+import seqindex
+
+K = 21
+SIZE = 1000
+# Mash's default seed
+SEED = 42
+SKETCH_SUFFIX = '.sketch.npz'
+# bases hashed at once, about 30 MB of k-mer codes and hashes
+CHUNK = 1 << 20
+
+
+class Sketch(NamedTuple):
+    name: str
+    # ascending, distinct, at most size of them
+    hashes: np.ndarray
+    k: int
+    seed: int
+
+
+def canonical_codes(sequence, k: int = K) -> np.ndarray:
+    '''
+    2 bit code of every canonical k-mer, the smaller of the k-mer and its
+    reverse complement. windows touching N or other non ACGT bases are dropped
+    '''
+    if not 0 < k <= 32:
+        raise ValueError(f'k must be between 1 and 32, not {k}')
+    bases = encoding.encode_dna(sequence)
+    count = len(bases) - k + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    invalid = bases == encoding.INVALID
+    symbols = np.where(invalid, 0, bases).astype(np.uint64)
+    forward = np.zeros(count, dtype=np.uint64)
+    reverse = np.zeros(count, dtype=np.uint64)
+    for offset in range(k):
+        forward = (forward << np.uint64(2)) | symbols[offset:offset + count]
+        # the complement read backwards, so base i of the window is the lowest bits
+        reverse |= (np.uint64(3) - symbols[offset:offset + count]) << np.uint64(2 * offset)
+    codes = np.minimum(forward, reverse)
+    if invalid.any():
+        bad = np.concatenate(([0], np.cumsum(invalid)))
+        codes = codes[(bad[k:] - bad[:-k]) == 0]
+    return codes
+
+def hash_codes(codes: np.ndarray, seed: int = SEED) -> np.ndarray:
+    # murmur3 fmix64 of the seeded codes, uint64 arithmetic wraps as it should
+    h = codes ^ np.uint64(seed)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xff51afd7ed558ccd)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xc4ceb9fe1a85ec53)
+    h ^= h >> np.uint64(33)
+    return h
+
+def bottom(hashes: np.ndarray, size: int = SIZE) -> np.ndarray:
+    # the size smallest distinct hashes, ascending, without sorting all of them
+    take = 2 * size
+    while take < len(hashes):
+        cutoff = np.partition(hashes, take)[take]
+        smallest = np.unique(hashes[hashes <= cutoff])
+        if len(smallest) >= size:
+            return smallest[:size]
+        take *= 4
+    return np.unique(hashes)[:size]
+
+def _chunks(sequence, k: int):
+    # overlapping by k - 1 bases, so every k-mer is in exactly one chunk
+    step = max(CHUNK - k + 1, 1)
+    for start in range(0, max(len(sequence) - k + 1, 1), step):
+        yield sequence[start:start + step + k - 1]
+
+def sketch(name: str, sequences, k: int = K, size: int = SIZE, seed: int = SEED) -> Sketch:
+    # one sketch of a sequence, or of several (the records of one genome)
+    if not isinstance(sequences, (list, tuple, GeneratorType)):
+        sequences = [sequences]
+    hashes = np.empty(0, dtype=np.uint64)
+    for sequence in sequences:
+        for piece in _chunks(sequence, k):
+            # bottom of a union is the bottom of the union of bottoms
+            piece = bottom(hash_codes(canonical_codes(piece, k), seed), size)
+            hashes = bottom(np.concatenate((hashes, piece)), size)
+    return Sketch(name, hashes, k, seed)
+
+
+def sketch_path(path) -> Path:
+    return Path(str(path) + SKETCH_SUFFIX)
+
+def _load(path, params) -> List[Sketch]:
+    stored = sketch_path(path)
+    if not stored.exists() or stored.stat().st_mtime < Path(path).stat().st_mtime:
+        return None
+    with np.load(stored, allow_pickle=False) as data:
+        if data['params'].tolist() != list(params):
+            return None
+        names, offsets, hashes = data['names'].tolist(), data['offsets'], data['hashes']
+    k, _, seed, _ = params
+    return [Sketch(name, hashes[offsets[i]:offsets[i + 1]], k, seed) for i, name in enumerate(names)]
+
+def _save(path, params, sketches: List[Sketch]):
+    offsets = np.cumsum([0] + [len(s.hashes) for s in sketches])
+    try:
+        with open(sketch_path(path), 'wb') as handle:
+            np.savez(handle, params=np.array(params, dtype=np.int64),
+                     names=np.array([s.name for s in sketches], dtype=str), offsets=offsets,
+                     hashes=np.concatenate([s.hashes for s in sketches]) if sketches else np.empty(0, np.uint64))
+    except OSError:
+        # read only data directory, sketch again next time
+        pass
+
+def sketch_file(path, k: int = K, size: int = SIZE, seed: int = SEED,
+                individual: bool = False) -> List[Sketch]:
+    '''
+    sketches of a fasta or genbank file, one for the whole file named after
+    it, or with individual=True one per record named by record id. read
+    from beside the file when an up to date sketch with the same parameters
+    is there, written there otherwise
+    '''
+    params = (k, size, seed, int(individual))
+    sketches = _load(path, params)
+    if sketches is not None:
+        return sketches
+    records = seqindex.open_index(path)
+    if individual:
+        sketches = [sketch(record_id, sequence, k, size, seed) for record_id, sequence in records]
+    else:
+        sketches = [sketch(Path(path).name, (sequence for _, sequence in records), k, size, seed)]
+    _save(path, params, sketches)
+    return sketches
+
+def _sketch_job(job) -> List[Sketch]:
+    return sketch_file(*job)
+
+def sketch_files(paths: Iterable, k: int = K, size: int = SIZE, seed: int = SEED,
+                 individual: bool = False, processes: int = None) -> List[Sketch]:
+    # sketches of many files in input order, one file per task
+    jobs = [(path, k, size, seed, individual) for path in paths]
+    if processes == 1 or len(jobs) < 2:
+        results = map(_sketch_job, jobs)
+    else:
+        with mp.Pool(processes) as pool:
+            results = pool.map(_sketch_job, jobs)
+    return [s for sketches in results for s in sketches]
+
+
+def jaccard_matrix(sketches: List[Sketch]) -> np.ndarray:
+    '''
+    estimated Jaccard index of every pair of sketches, (n, n) float64.
+    the pair i, j is compared up to t = min(max(i), max(j)), where the
+    union within t is |i| + |j below t| - shared when i has the smaller max
+    '''
+    if len({(s.k, s.seed) for s in sketches}) > 1:
+        raise ValueError('sketches were made with different k or seeds')
+    n = len(sketches)
+    sizes = np.array([len(s.hashes) for s in sketches], dtype=np.int64)
+    if not n or not sizes.sum():
+        return np.zeros((n, n))
+    universe, columns = np.unique(np.concatenate([s.hashes for s in sketches]), return_inverse=True)
+    membership = sparse.csr_matrix(
+        (np.ones(len(columns), dtype=np.int32), (np.repeat(np.arange(n), sizes), columns)),
+        shape=(n, len(universe)))
+    shared = (membership @ membership.T).toarray()
+    maxima = np.array([s.hashes[-1] if len(s.hashes) else 0 for s in sketches], dtype=np.uint64)
+    # below[i, j], hashes of sketch j no larger than the largest of sketch i
+    below = np.empty((n, n), dtype=np.int64)
+    for j, s in enumerate(sketches):
+        below[:, j] = np.searchsorted(s.hashes, maxima, side='right')
+    i_smaller = maxima[:, None] <= maxima[None, :]
+    union = np.where(i_smaller, sizes[:, None] + below, sizes[None, :] + below.T) - shared
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, shared / union, 0.0)
+
+def mash_distance(jaccard, k: int = K):
+    # 1 (nothing shared) where the Jaccard estimate is 0
+    jaccard = np.asarray(jaccard, dtype=np.float64)
+    distance = np.ones_like(jaccard)
+    shared = jaccard > 0
+    distance[shared] = np.log((1 + jaccard[shared]) / (2 * jaccard[shared])) / k
+    return np.clip(distance, 0.0, 1.0)
+
+def distance_matrix(sketches: List[Sketch]) -> np.ndarray:
+    # Mash distance of every pair, zero on the diagonal
+    k = sketches[0].k if sketches else K
+    return mash_distance(jaccard_matrix(sketches), k)
+
+def write_matrix(handle, names: List[str], matrix: np.ndarray):
+    # tab separated, a header row of names and one row per sketch
+    handle.write('\t'.join([''] + names) + '\n')
+    for name, row in zip(names, matrix):
+        handle.write('\t'.join([name] + [f'{value:.6g}' for value in row]) + '\n')
+
+def main(args):
+    import batch
+    paths = [path for path in batch.find_inputs(args.inputs)
+             if seqindex.detect_format(path) in seqindex.INDEX_SUFFIX]
+    sketches = sketch_files(paths, args.k, args.size, args.seed, args.individual, args.processes)
+    names = [s.name for s in sketches]
+    matrix = jaccard_matrix(sketches) if args.jaccard else distance_matrix(sketches)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            write_matrix(handle, names, matrix)
+    else:
+        write_matrix(sys.stdout, names, matrix)
+    if args.plot:
+        import viz
+        viz.as_figure(viz.heatMap(matrix, names, names)).savefig(args.plot, bbox_inches='tight')
+    print(f'{len(sketches)} sketches from {len(paths)} files compared', file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='MinHash sketches and Mash distances between genomes')
+    parser.add_argument('inputs', nargs='+', help='directories, glob patterns or fasta/genbank files')
+    parser.add_argument('-k', default=K, type=int, help='k-mer length, at most 32')
+    parser.add_argument('-s', '--size', default=SIZE, type=int, help='hashes kept per sketch')
+    parser.add_argument('--seed', default=SEED, type=int, help='hash seed, sketches only compare with the same one')
+    parser.add_argument('-i', '--individual', action='store_true',
+        help='one sketch per record rather than per file')
+    parser.add_argument('--jaccard', action='store_true',
+        help='write Jaccard estimates rather than Mash distances')
+    parser.add_argument('-o', '--output', default=None, help='tsv file for the matrix, stdout by default')
+    parser.add_argument('--plot', default=None, help='also draw the matrix as a heatmap to this image file')
+    parser.add_argument('-p', '--processes', default=None, type=int,
+        help='worker processes, defaults to the number of cores')
+    main(parser.parse_args())
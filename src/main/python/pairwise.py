@@ -0,0 +1,124 @@
+'''
+all-pairs distance matrices in condensed form
+
+only the upper triangle (i < j) is computed, and it is stored in a flat
+float64 array in the same order as scipy.spatial.distance.pdist, so entry
+(i, j) lives at n*i - i*(i+1)//2 + (j - i - 1). row blocks are spread over
+a process pool, each worker receives the items once through the pool
+initializer rather than once per task.
+'''
+import multiprocessing as mp
+import os
+from typing import Callable, List, Sequence, Union
+
+import numpy as np
+import textdistance as TD
+
+import levenshtein
+
+# below this many pairs the pool start up costs more than it saves
+PARALLEL_MIN_PAIRS = 20000
+
+_items = None
+_distance = None
+
+
+def condensed_size(n: int) -> int:
+    return n * (n - 1) // 2
+
+def condensed_index(n: int, i: int, j: int) -> int:
+    if i > j:
+        i, j = j, i
+    return n * i - i * (i + 1) // 2 + (j - i - 1)
+
+def resolve_distance(distFunc: Union[str, Callable]) -> Callable:
+    '''
+    accept a callable or the name of any textdistance algorithm, as listed in
+    viz.textdistfuncs. names resolve to the algorithm's .distance method
+    so that every metric gives a distance rather than a similarity
+    '''
+    if callable(distFunc):
+        return distFunc
+    if distFunc == 'levenshtein':
+        return levenshtein.distance
+    return TD.__dict__[distFunc].distance
+
+def _init_worker(items, distFunc):
+    global _items, _distance
+    _items = items
+    _distance = resolve_distance(distFunc)
+
+def _row(items, distance, i) -> np.ndarray:
+    if distance is levenshtein.distance:
+        return levenshtein.distances(items[i], items[i + 1:])
+    return np.fromiter(
+        (distance(items[i], other) for other in items[i + 1:]),
+        dtype=np.float64, count=len(items) - i - 1)
+
+def _block(bounds) -> np.ndarray:
+    start, stop = bounds
+    rows = [_row(_items, _distance, i) for i in range(start, stop)]
+    return np.concatenate(rows) if rows else np.empty(0)
+
+def row_blocks(n: int, blocks: int) -> List:
+    '''
+    split rows 0..n-1 into contiguous blocks holding roughly equal numbers of
+    upper triangle pairs. early rows are long, so early blocks are short
+    '''
+    total = condensed_size(n)
+    if total == 0:
+        return []
+    pairs_before = np.cumsum([0] + [n - i - 1 for i in range(n)])
+    targets = np.linspace(0, total, blocks + 1)[1:-1]
+    cuts = np.searchsorted(pairs_before, targets)
+    edges = sorted(set([0, *cuts.tolist(), n]))
+    return list(zip(edges[:-1], edges[1:]))
+
+def condensed_matrix(items: Sequence, distFunc: Union[str, Callable] = 'levenshtein',
+                     processes: int = None, progress: Callable = None) -> np.ndarray:
+    '''
+    distance between every pair of items, upper triangle only, as a flat array
+    distFunc must be picklable (a module level function or a textdistance
+    name) when more than one process is used
+    '''
+    items = list(items)
+    n = len(items)
+    out = np.empty(condensed_size(n), dtype=np.float64)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes < 2 or len(out) < PARALLEL_MIN_PAIRS:
+        distance = resolve_distance(distFunc)
+        pos = 0
+        for i in range(n):
+            row = _row(items, distance, i)
+            out[pos:pos + len(row)] = row
+            pos += len(row)
+            if progress: progress(i + 1, n)
+        return out
+    blocks = row_blocks(n, processes * 4)
+    with mp.Pool(processes, initializer=_init_worker, initargs=(items, distFunc)) as pool:
+        pos = 0
+        for done, chunk in enumerate(pool.imap(_block, blocks), 1):
+            out[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+            if progress: progress(done, len(blocks))
+    return out
+
+def self_scores(items: Sequence, distFunc: Union[str, Callable] = 'levenshtein') -> np.ndarray:
+    # each item against itself, 0 for a distance but 1 (or more) for a similarity
+    distance = resolve_distance(distFunc)
+    return np.array([distance(item, item) for item in items], dtype=np.float64)
+
+def squareform(condensed: np.ndarray, n: int = None, diagonal=0.0) -> np.ndarray:
+    '''
+    expand a condensed matrix into the full symmetric square matrix,
+    diagonal is one value or one per item (see self_scores)
+    '''
+    if n is None:
+        n = int(round((1 + np.sqrt(1 + 8 * len(condensed))) / 2))
+    square = np.empty((n, n), dtype=condensed.dtype)
+    square[np.diag_indices(n)] = diagonal
+    upper = np.triu_indices(n, k=1)
+    square[upper] = condensed
+    square[(upper[1], upper[0])] = condensed
+    return square
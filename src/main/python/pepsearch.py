@@ -0,0 +1,54 @@
+'''
+locate a back-translated peptide in a nucleotide sequence
+
+the peptide is compiled into a position specific codon set table, one row
+of 65 booleans per amino acid saying which codon codes it accepts. the
+sequence is encoded once into codon codes at every offset, which covers
+all three frames at the same time, and candidates are filtered one peptide
+position at a time, so the work is one pass over the sequence plus the
+surviving candidates, whatever the number of back-translations.
+'''
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+import encoding
+
+
+def codon_set_table(codon_choices: Sequence[Sequence[str]]) -> np.ndarray:
+    # (peptide length, 65) table, True where a codon code is allowed
+    table = np.zeros((len(codon_choices), encoding.INVALID_CODON + 1), dtype=bool)
+    for position, codons in enumerate(codon_choices):
+        for codon in codons:
+            table[position, encoding.codon_index(codon)] = True
+        table[position, encoding.INVALID_CODON] = False
+    return table
+
+def _scan(codons: np.ndarray, table: np.ndarray) -> np.ndarray:
+    # start offsets where every peptide position finds an allowed codon
+    span = 3 * len(table)
+    last = len(codons) + 2 - span
+    if len(table) == 0 or last < 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.flatnonzero(table[0][codons[:last + 1]])
+    for position in range(1, len(table)):
+        candidates = candidates[table[position][codons[candidates + 3 * position]]]
+    return candidates
+
+def find_codon_pattern(nuc_sequence, codon_choices: Sequence[Sequence[str]]) -> List[Tuple]:
+    '''
+    every match of the codon pattern on both strands, in any frame
+    returns (start, end, strand, frame) tuples with 0 based, end exclusive,
+    forward strand coordinates. frame counts from the start of the strand
+    the match is on, so reverse strand frames count from the sequence end
+    '''
+    table = codon_set_table(codon_choices)
+    codes = encoding.encode_dna(nuc_sequence)
+    n, span = len(codes), 3 * len(table)
+    hits = []
+    for start in _scan(encoding.codon_codes(codes), table).tolist():
+        hits.append((start, start + span, 1, start % 3))
+    rc = encoding.reverse_complement(codes)
+    for start in _scan(encoding.codon_codes(rc), table).tolist():
+        hits.append((n - start - span, n - start, -1, start % 3))
+    return sorted(hits)
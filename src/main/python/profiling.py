@@ -0,0 +1,271 @@
+'''
+per stage timing and memory records for viz calls
+
+work is split into the stages parse (reading files into records), compute
+(n-grams, distances, matrices), render (building and drawing figures) and
+io (writing plots out). each stage records its wall time, CPU time, the
+process' resident set size (RSS) when it finished, how much that grew over
+the stage, and the stage's own peak RSS, so memory heavy stages stand out
+even when they free what they allocated before finishing. the peak comes
+from a background thread sampling RSS every SAMPLE_INTERVAL while any
+stage is running, so a spike shorter than that can be missed. the
+process' lifetime high-water mark (process_peak_rss) stops moving after
+the first big stage, so it is only context. stages nest, e.g. calcDist
+computes after get_seq parses, so every record also carries its self
+time, without the stages inside it.
+
+an entry point (a viz plot function, a CLI action or a GUI button) groups
+the stages run under it, on the same thread, and adds one summary record
+with the self time of each stage. records go to any listeners (the GUI's
+DEV profile panel) and, once configure(log=...) is called, to a JSON Lines
+log, one object per line. profile() wraps a call in cProfile and writes
+a .prof file that snakeviz, tuna or flameprof turn into a flame graph.
+
+    >>> with profiling.entry('nucdist'):
+    ...     with profiling.stage('parse', 'get_seq'):
+    ...         ...
+    >>> @profiling.timed('compute')
+    ... def heatMatrix(...): ...
+'''
+from collections import deque
+import contextlib
+import cProfile
+import functools
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+try:
+    import resource
+except ImportError:
+    # windows, peak RSS is left out
+    resource = None
+
+STAGES = ('parse', 'compute', 'render', 'io')
+# records kept in memory for whoever asks later
+HISTORY = 1000
+# seconds between RSS samples while a stage runs
+SAMPLE_INTERVAL = 0.01
+
+_local = threading.local()
+_lock = threading.Lock()
+_entry_ids = itertools.count(1)
+_listeners = []
+_log_path = None
+history = deque(maxlen=HISTORY)
+# frames still running on any thread, whose peaks the sampler raises
+_running = set()
+_sampling = threading.Condition()
+_sampler = None
+
+
+def current_rss() -> int:
+    # resident set of the process right now, in bytes, from psutil or /proc
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        # no /proc (macOS without psutil), RSS is left out
+        return None
+
+def peak_rss() -> int:
+    # high water mark of the process' resident set over its whole life, in bytes
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    peak = peak if sys.platform == 'darwin' else peak * 1024
+    # linux updates ru_maxrss lazily, it can trail the RSS read just now
+    return max(peak, current_rss() or 0)
+
+def _sample():
+    # raise the peak of every running frame to the RSS now, then sleep
+    while True:
+        with _sampling:
+            while not _running:
+                _sampling.wait()
+            frames = list(_running)
+        rss = current_rss()
+        if rss is None:
+            return
+        for frame in frames:
+            if rss > frame.peak:
+                frame.peak = rss
+        time.sleep(SAMPLE_INTERVAL)
+
+def _track(frame):
+    global _sampler
+    with _sampling:
+        _running.add(frame)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample, name='profiling-rss', daemon=True)
+            _sampler.start()
+        _sampling.notify()
+
+def _untrack(frame):
+    with _sampling:
+        _running.discard(frame)
+
+def configure(log=None):
+    '''
+    append every record to the JSON Lines file log, None stops logging
+    '''
+    global _log_path
+    if log is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(log)), exist_ok=True)
+    _log_path = log
+
+def add_listener(listener: Callable):
+    # listener(record) is called on the thread that ran the stage
+    _listeners.append(listener)
+
+def remove_listener(listener: Callable):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def _emit(record: Dict):
+    with _lock:
+        history.append(record)
+        if _log_path is not None:
+            with open(_log_path, 'a') as handle:
+                handle.write(json.dumps(record) + '\n')
+    for listener in list(_listeners):
+        listener(record)
+
+def _stack() -> List:
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+class _Frame:
+    __slots__ = ('stage', 'name', 'wall', 'cpu', 'rss', 'peak', 'child_wall', 'child_cpu', 'totals', 'id')
+
+    def __init__(self, stage, name):
+        self.stage = stage
+        self.name = name
+        self.child_wall = self.child_cpu = 0.0
+        # self time per stage, only filled in on entry frames
+        self.totals = None
+        self.id = None
+        self.rss = self.peak = current_rss()
+        if self.rss is not None:
+            _track(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+
+    def finish(self) -> Dict:
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        _untrack(self)
+        rss = current_rss()
+        unknown = rss is None or self.rss is None
+        peak = None if unknown else max(self.peak, rss)
+        return {'wall': wall, 'cpu': cpu, 'rss': rss,
+                'rss_growth': None if unknown else rss - self.rss,
+                'peak_rss': peak, 'peak_growth': None if unknown else peak - self.rss,
+                'process_peak_rss': peak_rss()}
+
+def _current_entry(stack):
+    for frame in stack:
+        if frame.stage == 'entry':
+            return frame
+    return None
+
+@contextlib.contextmanager
+def stage(stage: str, name: str = None):
+    '''
+    time the block as one of STAGES. CPU time is the whole process', so
+    other threads busy at the same time are counted too, and work done in
+    worker processes is not
+    '''
+    if stage not in STAGES:
+        raise ValueError(f'unknown stage {stage!r}, use one of {STAGES}')
+    stack = _stack()
+    frame = _Frame(stage, name or stage)
+    stack.append(frame)
+    try:
+        yield frame
+    finally:
+        stack.pop()
+        measured = frame.finish()
+        self_wall = measured['wall'] - frame.child_wall
+        self_cpu = measured['cpu'] - frame.child_cpu
+        if stack:
+            stack[-1].child_wall += measured['wall']
+            stack[-1].child_cpu += measured['cpu']
+        entry_frame = _current_entry(stack)
+        if entry_frame is not None:
+            totals = entry_frame.totals.setdefault(stage, {'wall': 0.0, 'cpu': 0.0})
+            totals['wall'] += self_wall
+            totals['cpu'] += self_cpu
+        _emit({'type': 'stage', 'entry': entry_frame.name if entry_frame else None,
+               'entry_id': entry_frame.id if entry_frame else None,
+               'stage': stage, 'name': frame.name, 'depth': len(stack), **measured,
+               'self_wall': self_wall, 'self_cpu': self_cpu, 'time': time.time()})
+
+@contextlib.contextmanager
+def entry(name: str):
+    '''
+    group the stages run inside the block under name, and emit a summary
+    of them at the end. inside another entry this does nothing, so a GUI
+    button and the viz function it calls make one entry, not two
+    '''
+    stack = _stack()
+    if _current_entry(stack) is not None:
+        yield None
+        return
+    frame = _Frame('entry', name)
+    frame.totals = {}
+    frame.id = next(_entry_ids)
+    stack.append(frame)
+    try:
+        yield frame
+    finally:
+        stack.remove(frame)
+        _emit({'type': 'entry', 'entry': name, 'entry_id': frame.id, **frame.finish(),
+               'stages': frame.totals, 'time': time.time()})
+
+def timed(stage_name: str, name: str = None) -> Callable:
+    # decorator, each call of the function is one stage_name stage
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def entry_point(func: Callable) -> Callable:
+    # decorator, each call of the function is an entry named after it
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with entry(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def profile(func: Callable, path: str, *args, **kwargs):
+    '''
+    run func(*args, **kwargs) under cProfile, write the stats to path
+    (a .prof file) and the 30 most expensive calls next to it as .txt
+    '''
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        with open(os.path.splitext(path)[0] + '.txt', 'w') as handle:
+            pstats.Stats(profiler, stream=handle).sort_stats('cumulative').print_stats(30)
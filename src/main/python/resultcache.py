@@ -0,0 +1,261 @@
+'''
+content addressed cache for parsed records and computed results
+
+keys are built from the function name, its arguments and the path, size
+and mtime of any input files, as seqindex does, so an edited file can never
+be served a stale result and a multi GB genome is never read just to make
+a key. lambdas and nested functions have no stable name to key them by, so
+calls passing one are not cached, nor are calls passing anything else
+without a deterministic description. keys also carry VERSION and a hash
+of the cached function's code, so results from an older release are
+never served after an upgrade. results live in an in-memory LRU,
+bounded by pickled size, in front of a pickle store on disk that is
+trimmed oldest-access-first once it passes its size budget. when a file
+changes, entries built from its old version are deleted straight away
+instead of waiting for eviction.
+
+batch workers share one cache directory, so an entry can vanish under
+another process at any time, that is a miss rather than an error.
+'''
+from collections import OrderedDict
+import functools
+import hashlib
+import inspect
+import os
+from pathlib import Path
+import pickle
+import tempfile
+from typing import Callable
+
+import numpy as np
+
+MISSING = object()
+# bump when a change outside a cached function (a helper it calls, say)
+# changes what it returns
+VERSION = 2
+# arguments that never change a result, left out of the key
+UNKEYED = ('progress',)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+class Uncacheable(Exception):
+    # an argument that cannot be told apart from a different one by its key
+    pass
+
+def _token(value) -> str:
+    # a short stable description of an argument, hashing anything big
+    if hasattr(value, 'seq'):
+        value = value.seq
+    if type(value).__name__ in ('Seq', 'MutableSeq'):
+        value = str(value)
+    if isinstance(value, (str, bytes)):
+        data = value.encode() if isinstance(value, str) else value
+        return repr(value) if len(data) <= 128 else 'sha1:' + _digest(data)
+    if isinstance(value, functools.partial):
+        return f'partial({_token(value.func)},{_token(value.args)},{_token(value.keywords)})'
+    if callable(value) and hasattr(value, '__qualname__'):
+        # every lambda, and every closure made by one function, has the same name
+        if '<lambda>' in value.__qualname__ or '<locals>' in value.__qualname__:
+            raise Uncacheable(value.__qualname__)
+        return f'{getattr(value, "__module__", "")}.{value.__qualname__}'
+    if isinstance(value, np.ndarray):
+        return f'ndarray:{value.dtype}:{value.shape}:' + _digest(np.ascontiguousarray(value).tobytes())
+    if isinstance(value, (list, tuple)):
+        inner = ','.join(_token(item) for item in value)
+        return 'sha1:' + _digest(inner.encode()) if len(inner) > 256 else f'[{inner}]'
+    if isinstance(value, dict):
+        return _token(sorted((str(key), _token(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return _token(sorted(_token(item) for item in value))
+    if isinstance(value, os.PathLike):
+        return _token(os.fspath(value))
+    if value is None or isinstance(value, (bool, int, float, complex)):
+        return repr(value)
+    # anything else may repr as its address, which no later call would match
+    raise Uncacheable(type(value).__name__)
+
+def _code_digest(func) -> str:
+    # edits to a cached function make its old results unreachable
+    try:
+        source = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        # no source to read, a frozen app say, the bytecode will do
+        code = func.__code__
+        source = code.co_code + repr(code.co_consts).encode()
+    return _digest(source)[:16]
+
+
+def _size(path: Path) -> int:
+    # 0 for an entry another process has already removed
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+class ResultCache:
+    '''
+    >>> cache = ResultCache('data/cache')
+    >>> @cache.cached('seqFile')
+    ... def expensive(n, seqFile): ...
+    '''
+    def __init__(self, directory, memory_bytes: int = 64 << 20, disk_bytes: int = 1 << 30):
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        # anything bigger than this is not worth keeping
+        self.max_item_bytes = disk_bytes // 4
+        self.enabled = True
+        self.memory = OrderedDict()
+        self.memory_size = 0
+        self._stamps = {}
+        self._disk_size = None
+
+    def file_tag(self, path) -> str:
+        '''
+        <path hash>_<stamp hash> of a file, from its absolute path, size and
+        mtime. the first time a path is seen, and whenever its stamp
+        changes, entries built from any other version of it are dropped
+        '''
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = _digest(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())[:16]
+        tag = f'{_digest(path.encode())[:16]}_{stamp}'
+        if self._stamps.get(path) != tag:
+            self.invalidate(tag)
+            self._stamps[path] = tag
+        return tag
+
+    def make_key(self, name: str, args, kwargs, files=()) -> str:
+        tags = [self.file_tag(path) for path in files]
+        body = _token((VERSION, name, args, kwargs, tags))
+        prefix = tags[0] if tags else 'nofile'
+        return f'{prefix}_{_digest(body.encode())}'
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.pkl'
+
+    def get(self, key: str, default=MISSING):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return pickle.loads(self.memory[key])
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except OSError:
+            return default
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # trimmed by another process since, what was read is still good
+            pass
+        self._remember(key, data)
+        return pickle.loads(data)
+
+    def set(self, key: str, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_item_bytes:
+            return
+        self._remember(key, data)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        handle, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as out:
+            out.write(data)
+        previous = _size(path)
+        os.replace(tmp, path)
+        self._disk_size = self.disk_size() - previous + len(data)
+        if self._disk_size > self.disk_bytes:
+            self._trim_disk()
+
+    def _remember(self, key: str, data: bytes):
+        if key in self.memory:
+            self.memory_size -= len(self.memory.pop(key))
+        if len(data) > self.memory_bytes:
+            return
+        self.memory[key] = data
+        self.memory_size += len(data)
+        while self.memory_size > self.memory_bytes:
+            _, old = self.memory.popitem(last=False)
+            self.memory_size -= len(old)
+
+    def disk_size(self) -> int:
+        if self._disk_size is None:
+            self._disk_size = sum(_size(path) for path in self.directory.glob('*.pkl'))
+        return self._disk_size
+
+    def _trim_disk(self):
+        entries = sorted((_mtime(path), path) for path in self.directory.glob('*.pkl'))
+        for _, path in entries:
+            if self._disk_size <= self.disk_bytes:
+                break
+            self._disk_size -= _size(path)
+            path.unlink(missing_ok=True)
+
+    def invalidate(self, file_tag: str):
+        '''
+        drop every entry built from the file of file_tag (path and stamp)
+        other than the version file_tag stands for
+        '''
+        path_tag = file_tag.split('_')[0] + '_'
+        stale = lambda key: key.startswith(path_tag) and not key.startswith(file_tag + '_')
+        for key in [key for key in self.memory if stale(key)]:
+            self.memory_size -= len(self.memory.pop(key))
+        for path in self.directory.glob(path_tag + '*.pkl'):
+            if stale(path.stem):
+                path.unlink(missing_ok=True)
+        self._disk_size = None
+
+    def clear(self):
+        self.memory.clear()
+        self.memory_size = 0
+        for path in self.directory.glob('*.pkl'):
+            path.unlink(missing_ok=True)
+        self._disk_size = None
+
+    def cached(self, *files: str, keep: Callable = None) -> Callable:
+        '''
+        decorator, files names the parameters that hold input file paths
+        calls with file objects rather than paths go straight through.
+        results for which keep(result) is false are returned but not stored
+        '''
+        def decorate(func):
+            signature = inspect.signature(func)
+            name = f'{func.__module__}.{func.__qualname__}:{_code_digest(func)}'
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                for param in UNKEYED:
+                    if param in bound.arguments:
+                        bound.arguments[param] = None
+                paths = [bound.arguments[param] for param in files]
+                if not all(isinstance(path, (str, os.PathLike)) and os.path.isfile(path)
+                           for path in paths):
+                    return func(*args, **kwargs)
+                try:
+                    key = self.make_key(name, bound.args, bound.kwargs, paths)
+                except Uncacheable:
+                    return func(*args, **kwargs)
+                value = self.get(key)
+                if value is MISSING:
+                    value = func(*args, **kwargs)
+                    if keep is None or keep(value):
+                        self.set(key, value)
+                return value
+            wrapper.uncached = func
+            wrapper.cache_name = name
+            return wrapper
+        return decorate
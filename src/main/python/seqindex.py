@@ -0,0 +1,201 @@
+'''
+indexed random access to sequence files
+
+the first time a FASTA file is opened a samtools faidx style .fai index is
+written beside it (name, length, offset, line bases, line width per
+record). after that any record, or any sub-range of one, is read with a
+single seek without parsing the rest of the file. GenBank files get a
+similar .gbi index of record byte ranges so one record can be parsed on
+its own. an index older than its file is rebuilt.
+'''
+from io import StringIO
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+FORMATS = {
+    '.fasta': 'fasta', '.fa': 'fasta', '.fna': 'fasta', '.faa': 'fasta',
+    '.ffn': 'fasta', '.fas': 'fasta',
+    '.gb': 'genbank', '.gbk': 'genbank', '.gbff': 'genbank', '.genbank': 'genbank',
+    '.abi': 'abi', '.ab1': 'abi',
+}
+INDEX_SUFFIX = {'fasta': '.fai', 'genbank': '.gbi'}
+# fasta suffixes that only ever hold protein sequences
+PEPTIDE_SUFFIXES = ('.faa',)
+
+
+def detect_format(path) -> str:
+    # from the last suffix, so foo.v2.fasta is fasta
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f'unknown sequence file type {suffix!r} for {path}')
+    return FORMATS[suffix]
+
+def is_peptide(path) -> bool:
+    return Path(path).suffix.lower() in PEPTIDE_SUFFIXES
+
+def _fresh(index_path: Path, path: Path) -> bool:
+    return index_path.exists() and index_path.stat().st_mtime >= path.stat().st_mtime
+
+def build_fasta_index(path) -> List[Tuple]:
+    entries = []
+    name = None
+    with open(path, 'rb') as handle:
+        offset = 0
+        for line in handle:
+            if line.startswith(b'>'):
+                if name is not None:
+                    entries.append((name, length, seq_offset, line_bases, line_width))
+                name = line[1:].split(None, 1)[0].decode() if line[1:].strip() else ''
+                seq_offset = offset + len(line)
+                length, line_bases, line_width, short, blank = 0, 0, 0, False, False
+            elif name is not None and not line.strip():
+                # fine before the next header, but sequence after it would shift every offset
+                blank = True
+            elif name is not None:
+                bases = len(line.rstrip(b'\r\n'))
+                if blank:
+                    raise ValueError(f'{path}: record {name} has a blank line inside its sequence, cannot index')
+                if short or (line_bases and bases > line_bases):
+                    raise ValueError(f'{path}: record {name} has uneven line lengths, cannot index')
+                if not line_bases:
+                    line_bases, line_width = bases, len(line)
+                elif bases < line_bases:
+                    short = True
+                length += bases
+            offset += len(line)
+        if name is not None:
+            entries.append((name, length, seq_offset, line_bases, line_width))
+    return entries
+
+def build_genbank_index(path) -> List[Tuple]:
+    # (record id, byte offset of LOCUS, byte length of record)
+    entries = []
+    with open(path, 'rb') as handle:
+        offset, start, name = 0, None, None
+        for line in handle:
+            if line.startswith(b'LOCUS'):
+                start = offset
+                fields = line.split()
+                name = fields[1].decode() if len(fields) > 1 else ''
+            elif line.startswith(b'VERSION') and start is not None:
+                fields = line.split()
+                if len(fields) > 1:
+                    name = fields[1].decode()
+            elif line.startswith(b'//') and start is not None:
+                entries.append((name, start, offset + len(line) - start))
+                start = None
+            offset += len(line)
+    return entries
+
+
+class SequenceIndex:
+    '''
+    >>> index = SequenceIndex('refs.fasta')
+    >>> index.ids()
+    >>> index.fetch('chr2', 1000, 2000)
+    '''
+    def __init__(self, path, fmt: str = None):
+        self.path = Path(path)
+        self.format = fmt or detect_format(path)
+        if self.format not in INDEX_SUFFIX:
+            raise ValueError(f'{self.format} files are not indexable')
+        self.index_path = Path(str(self.path) + INDEX_SUFFIX[self.format])
+        self.entries = self._load()
+
+    def _load(self) -> Dict[str, Tuple]:
+        if _fresh(self.index_path, self.path):
+            rows = [line.rstrip('\n').split('\t') for line in open(self.index_path)]
+            rows = [(row[0], *map(int, row[1:])) for row in rows if row and row[0]]
+        else:
+            build = build_fasta_index if self.format == 'fasta' else build_genbank_index
+            rows = build(self.path)
+            seen = set()
+            for row in rows:
+                if row[0] in seen:
+                    raise ValueError(f'{self.path}: record id {row[0]} occurs more than once, cannot index')
+                seen.add(row[0])
+            self._save(rows)
+        return {row[0]: row[1:] for row in rows}
+
+    def _save(self, rows):
+        try:
+            with open(self.index_path, 'w') as handle:
+                for row in rows:
+                    handle.write('\t'.join(map(str, row)) + '\n')
+        except OSError:
+            # read only data directory, keep the index in memory only
+            pass
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, record_id):
+        return record_id in self.entries
+
+    def ids(self) -> List[str]:
+        return list(self.entries)
+
+    def _entry(self, record_id):
+        if record_id is None:
+            if not self.entries:
+                raise ValueError(f'{self.path} has no records')
+            record_id = next(iter(self.entries))
+        if record_id not in self.entries:
+            raise KeyError(f'{record_id} not in {self.path}')
+        return self.entries[record_id]
+
+    def record(self, record_id: str = None):
+        # parse one record on its own into a SeqRecord
+        if self.format == 'fasta':
+            name = record_id if record_id is not None else next(iter(self.entries), None)
+            return SeqRecord(Seq(self.fetch(name)), id=name, description='')
+        offset, size = self._entry(record_id)
+        with open(self.path, 'rb') as handle:
+            handle.seek(offset)
+            text = handle.read(size).decode()
+        return SeqIO.read(StringIO(text), 'genbank')
+
+    def fetch(self, record_id: str = None, start: int = None, end: int = None) -> str:
+        '''
+        sequence of one record, or its [start, end) slice, 0 based
+        FASTA reads only the bytes covering the slice
+        '''
+        if self.format == 'genbank':
+            return str(self.record(record_id).seq[start:end])
+        length, offset, line_bases, line_width = self._entry(record_id)
+        start, end, _ = slice(start, end).indices(length)
+        if end <= start:
+            return ''
+        first = offset + (start // line_bases) * line_width + start % line_bases
+        last = offset + ((end - 1) // line_bases) * line_width + (end - 1) % line_bases
+        with open(self.path, 'rb') as handle:
+            handle.seek(first)
+            raw = handle.read(last - first + 1)
+        return raw.replace(b'\n', b'').replace(b'\r', b'').decode()
+
+    def length(self, record_id: str = None) -> int:
+        if self.format == 'genbank':
+            return len(self.record(record_id).seq)
+        return self._entry(record_id)[0]
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        # stream (id, sequence) one record at a time
+        for record_id in self.entries:
+            yield record_id, self.fetch(record_id)
+
+
+_open = {}
+
+def open_index(path, fmt: str = None) -> SequenceIndex:
+    # reuse an open index for as long as the file is unchanged
+    path = Path(path)
+    key = (str(path.resolve()), fmt)
+    stamp = path.stat().st_mtime_ns
+    cached = _open.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = _open[key] = (stamp, SequenceIndex(path, fmt))
+    return cached[1]
@@ -0,0 +1,207 @@
+'''
+line index over a memory mapped sequence file, for the GUI viewer
+
+the file is mapped, not read, and the byte offset of every line is found
+with vectorised scans of CHUNK bytes at a time, so any line can be fetched
+in constant time, a viewer only ever decodes the lines on screen and the
+scans never hold more than a chunk's worth of temporaries. alongside the
+offsets, every sequence line gets the 1-based coordinate of its first
+residue (FASTA lines after a header, GenBank lines between ORIGIN and
+//), and GenBank feature keys and FASTA headers are listed so a viewer
+can jump straight to the sequence they point at. only line starts and
+coordinates are kept, int32 where they fit, so 8 bytes a line for any
+file under 2 GB. line ends and records come from the starts on demand.
+'''
+import mmap
+import re
+from typing import List, NamedTuple
+
+import numpy as np
+
+import seqindex
+
+# bytes scanned at a time when indexing
+CHUNK = 64 << 20
+NEWLINE = ord('\n')
+SPACE = ord(' ')
+LOCATION_START = re.compile(r'(\d+)')
+
+
+class Feature(NamedTuple):
+    line: int
+    key: str
+    location: str
+    record: int
+
+
+def _offset_dtype(largest: int):
+    return np.int32 if largest < 2**31 else np.int64
+
+
+class LineIndex:
+    '''
+    >>> lines = LineIndex('genome.gb')
+    >>> len(lines), lines.line(0), lines.coordinate(120)
+    >>> lines.features[0], lines.sequence_line(lines.features[0])
+    '''
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or seqindex.detect_format(path)
+        self._file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            self.data = b''
+        raw = np.frombuffer(self.data, dtype=np.uint8)
+        ends = np.concatenate([np.flatnonzero(raw[lo:lo + CHUNK] == NEWLINE) + lo
+                               for lo in range(0, len(raw), CHUNK)] or [np.empty(0, dtype=np.int64)])
+        if len(raw) and (not len(ends) or ends[-1] != len(raw) - 1):
+            ends = np.append(ends, len(raw))
+        dtype = _offset_dtype(len(raw))
+        self.starts = np.concatenate(([0], ends[:-1] + 1)).astype(dtype) if len(ends) else ends.astype(dtype)
+        del ends
+        self._raw = raw
+        # first line of every record, a line's record is found by bisection
+        self.record_lines = np.empty(0, dtype=np.int64)
+        self.coordinates = np.zeros(len(self.starts), dtype=np.int32)
+        self.features: List[Feature] = []
+        if self.fmt == 'fasta':
+            self._index_fasta()
+        elif self.fmt == 'genbank':
+            self._index_genbank()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def close(self):
+        self._raw = None
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+    @property
+    def ends(self) -> np.ndarray:
+        # offset of every line's newline, or of the end of the file for the last
+        ends = np.empty(len(self.starts), dtype=self.starts.dtype)
+        ends[:-1] = self.starts[1:] - 1
+        if len(ends):
+            ends[-1] = self._end(len(ends) - 1)
+        return ends
+
+    def _end(self, i: int) -> int:
+        if i + 1 < len(self.starts):
+            return int(self.starts[i + 1]) - 1
+        size = len(self.data)
+        return size - 1 if self.data[size - 1:size] == b'\n' else size
+
+    def record(self, i: int) -> int:
+        # 0 based record of line i, -1 before the first one
+        return int(np.searchsorted(self.record_lines, i, side='right')) - 1
+
+    def line(self, i: int) -> str:
+        end = self._end(i)
+        if end > self.starts[i] and self.data[end - 1:end] == b'\r':
+            end -= 1
+        return self.data[self.starts[i]:end].decode('ascii', 'replace')
+
+    def coordinate(self, i: int) -> int:
+        # 1-based position of the first residue on line i, 0 if it holds none
+        return int(self.coordinates[i])
+
+    def _first_bytes(self, ends: np.ndarray) -> np.ndarray:
+        first = np.full(len(self.starts), NEWLINE, dtype=np.uint8)
+        nonempty = self.starts < ends
+        first[nonempty] = self._raw[self.starts[nonempty]]
+        return first
+
+    def _letters_before(self, offsets: np.ndarray) -> np.ndarray:
+        # letters in the file before each of the ascending byte offsets, a chunk at a time
+        before = np.zeros(len(offsets), dtype=np.int64)
+        total = 0
+        for lo in range(0, len(self._raw), CHUNK):
+            upper = self._raw[lo:lo + CHUNK] | 0x20
+            is_letter = (upper >= ord('a')) & (upper <= ord('z'))
+            first, last = np.searchsorted(offsets, [lo, lo + len(upper)])
+            local = offsets[first:last] - lo
+            cuts = np.union1d([0], local)
+            running = total + np.concatenate(([0], np.cumsum(np.add.reduceat(is_letter, cuts, dtype=np.int64))))
+            before[first:last] = running[np.searchsorted(cuts, local)]
+            total = running[-1]
+        before[offsets >= len(self._raw)] = total
+        return before
+
+    def _residues(self, lines: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        # letters on each of the given lines, digits and spaces are not residues
+        letters = np.zeros(len(self.starts), dtype=np.int64)
+        if not len(lines) or not len(self._raw):
+            return letters
+        # starts and ends interleave, so together they are still ascending
+        before = self._letters_before(np.column_stack((self.starts, ends)).ravel().astype(np.int64))
+        counts = before[1::2] - before[0::2]
+        letters[lines] = counts[lines]
+        return letters
+
+    def _number(self, is_sequence: np.ndarray, record_starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        # running residue count, restarting at every record. returns the record of every line
+        letters = self._residues(np.flatnonzero(is_sequence), ends)
+        before = np.cumsum(letters) - letters
+        records = np.cumsum(record_starts) - 1
+        self.record_lines = np.flatnonzero(record_starts)
+        base = before[self.record_lines][np.clip(records, 0, None)] if len(self.record_lines) else 0
+        base = np.where(records >= 0, base, 0)
+        coordinates = np.where(is_sequence & (letters > 0), before - base + 1, 0)
+        self.coordinates = coordinates.astype(_offset_dtype(coordinates.max() if len(coordinates) else 0))
+        return records
+
+    def _index_fasta(self):
+        ends = self.ends
+        headers = self._first_bytes(ends) == ord('>')
+        records = self._number(~headers, headers, ends)
+        self.features = [Feature(int(i), 'record', self.line(i)[1:].strip(), int(records[i]))
+                         for i in np.flatnonzero(headers)]
+
+    def _index_genbank(self):
+        # section keywords and // start in column one, so only lines whose
+        # first byte is a capital or a slash are decoded
+        ends = self.ends
+        first = self._first_bytes(ends)
+        marked = np.flatnonzero(((first >= ord('A')) & (first <= ord('Z'))) | (first == ord('/')))
+        in_sequence = np.zeros(len(self.starts), dtype=bool)
+        in_features = np.zeros(len(self.starts), dtype=bool)
+        record_starts = np.zeros(len(self.starts), dtype=bool)
+        section, previous = None, 0
+        for i in [*marked.tolist(), len(self.starts)]:
+            if section == 'ORIGIN':
+                in_sequence[previous + 1:i] = True
+            elif section == 'FEATURES':
+                in_features[previous + 1:i] = True
+            if i == len(self.starts):
+                break
+            words = self.line(i).split(None, 1)
+            section, previous = (words[0] if words else None), i
+            if section == 'LOCUS':
+                record_starts[i] = True
+        records = self._number(in_sequence, record_starts, ends)
+        # feature keys sit in column 6, qualifiers and locations further in
+        candidates = np.flatnonzero(in_features & (first == SPACE) & (ends - self.starts > 5))
+        for i in candidates:
+            text = self.line(i)
+            if text[:5] == '     ' and text[5] != ' ':
+                key, _, location = text[5:].partition(' ')
+                self.features.append(Feature(int(i), key, location.strip(), int(records[i])))
+
+    def sequence_line(self, feature: Feature) -> int:
+        '''
+        the line holding the first residue of a feature's location, or the
+        feature's own line when it has no sequence to point at
+        '''
+        match = LOCATION_START.search(feature.location) if feature.key != 'record' else None
+        position = int(match.group(1)) if match else 1
+        first = self.record_lines[feature.record] if 0 <= feature.record < len(self.record_lines) else 0
+        last = self.record_lines[feature.record + 1] if feature.record + 1 < len(self.record_lines) else len(self)
+        lines = first + np.flatnonzero(self.coordinates[first:last] > 0)
+        if not len(lines):
+            return feature.line
+        at = np.searchsorted(self.coordinates[lines], position, side='right') - 1
+        return int(lines[max(at, 0)])
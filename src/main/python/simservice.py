@@ -0,0 +1,164 @@
+'''
+reusable textdistance similarity service
+
+a fixed size process pool is started once and kept for the life of the
+service. each sequence is copied into shared memory once per call and the
+workers read it from there, so nothing but a block name and a length is
+pickled per task. textdistance metrics hash, slice and compare characters,
+and some (editex, mra, strcmp95) need str methods, so a worker decodes
+the pair it is scoring into two str copies, 1 byte per base each. it keeps
+only that pair, so the next metric on the same pair is not decoded again
+and a worker never holds more than one pair's worth. metrics are queued most expensive first so the quadratic
+ones are not left running on their own at the end, and each metric is
+limited to `timeout` seconds.
+'''
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+import signal
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import textdistance as TD
+
+# rough relative cost on long sequences, used only to order the queue
+METRIC_COST = {
+    'damerau_levenshtein': 100, 'needleman_wunsch': 90, 'smith_waterman': 90,
+    'gotoh': 90, 'editex': 80, 'lcsseq': 80, 'lcsstr': 70, 'levenshtein': 60,
+    'matrix': 60, 'monge_elkan': 60, 'ratcliff_obershelp': 50, 'strcmp95': 40,
+    'jaro_winkler': 40, 'jaro': 40, 'mlipns': 30, 'mra': 30, 'lzma_ncd': 20,
+    'entropy_ncd': 10, 'zlib_ncd': 10, 'sqrt_ncd': 10, 'rle_ncd': 10,
+}
+
+_decoded = {}
+
+
+class MetricTimeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise MetricTimeout()
+
+def _attach(name: str, size: int) -> str:
+    # decode a shared block once per worker
+    if name not in _decoded:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            _decoded[name] = bytes(block.buf[:size]).decode('ascii')
+        finally:
+            block.close()
+    return _decoded[name]
+
+def _attach_pair(block1: Tuple, block2: Tuple) -> Tuple[str, str]:
+    # drop every other sequence first, so only this pair is ever held
+    for name in [name for name in _decoded if name not in (block1[0], block2[0])]:
+        del _decoded[name]
+    return _attach(*block1), _attach(*block2)
+
+def _run_metric(funcname: str, block1: Tuple, block2: Tuple, timeout: float):
+    seq1, seq2 = _attach_pair(block1, block2)
+    timed = timeout and hasattr(signal, 'setitimer')
+    if timed:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return funcname, TD.__dict__[funcname](seq1, seq2)
+    except MetricTimeout:
+        return funcname, None
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+def by_cost(metrics: Iterable[str]) -> List[str]:
+    return sorted(metrics, key=lambda name: METRIC_COST.get(name, 1), reverse=True)
+
+
+class SimilarityService:
+    '''
+    >>> with SimilarityService(viz.textdistfuncs, processes=4, timeout=30) as service:
+    ...     scores = service.compare(seq1, seq2)
+    ...     many = service.compare_many([(seq1, seq2), (seq1, seq3)])
+    '''
+    def __init__(self, metrics: Sequence[str], processes: int = None,
+                 timeout: float = 60):
+        self.metrics = by_cost(metrics)
+        self.processes = processes
+        self.timeout = timeout
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self.pool is None:
+            self.pool = mp.Pool(self.processes)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def compare(self, seq1, seq2) -> Dict:
+        # one merged {metric: score} dict, None for metrics that timed out
+        return self.compare_many([(seq1, seq2)])[0]
+
+    def compare_many(self, pairs: Iterable[Tuple]) -> List[Dict]:
+        pairs = [(str(seq1), str(seq2)) for seq1, seq2 in pairs]
+        blocks = {}
+        try:
+            for pair in pairs:
+                for seq in pair:
+                    if seq not in blocks:
+                        blocks[seq] = self._share(seq)
+            pool = self.start()
+            pending = [
+                [(funcname, pool.apply_async(_run_metric, (
+                    funcname,
+                    (blocks[seq1].name, len(seq1)),
+                    (blocks[seq2].name, len(seq2)),
+                    self.timeout)))
+                 for funcname in self.metrics]
+                for seq1, seq2 in pairs]
+            return self._collect(pending)
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+
+    def _share(self, seq: str):
+        data = seq.encode('ascii')
+        block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        block.buf[:len(data)] = data
+        return block
+
+    def _collect(self, pending) -> List[Dict]:
+        # workers enforce the timeout themselves where SIGALRM exists. the
+        # deadline here is the fallback: whatever has not finished by the
+        # time every round of tasks could have timed out is given up on,
+        # and the pool is replaced so stuck workers do not linger
+        deadline = None
+        if self.timeout:
+            tasks = sum(len(tasks) for tasks in pending)
+            rounds = -(-tasks // (self.processes or os.cpu_count() or 1))
+            deadline = time.monotonic() + self.timeout * (rounds + 1)
+        results, stuck = [], False
+        for tasks in pending:
+            scores = {}
+            for funcname, task in tasks:
+                wait = None if deadline is None else max(0, deadline - time.monotonic())
+                try:
+                    name, score = task.get(wait)
+                    scores[name] = score
+                except mp.TimeoutError:
+                    scores[funcname] = None
+                    stuck = True
+            results.append(scores)
+        if stuck:
+            self.close()
+        return results
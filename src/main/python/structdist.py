@@ -0,0 +1,60 @@
+'''
+atom and residue distance matrices for PDB structures
+
+coordinates are pulled out of the structure once into a float32 (N, 3)
+array, then the matrix is filled tile by tile so that only one tile of
+temporaries is alive at a time. passing `out` as a path writes the result
+straight into a memory mapped .npy file instead of holding it in RAM.
+'''
+from typing import Union
+
+import numpy as np
+
+LEVELS = ('atom', 'ca', 'centroid')
+TILE = 1024
+
+
+def load_structure(pdbfile, quiet=False):
+    from Bio import PDB
+    return PDB.PDBParser(QUIET=quiet).get_structure('pdbfile', pdbfile)
+
+def coordinates(structure, level: str = 'atom') -> np.ndarray:
+    '''
+    float32 (N, 3) coordinates of every atom, every residue's CA atom
+    (residues without one are skipped) or every residue's centroid
+    '''
+    if level == 'atom':
+        coords = [atm.coord for atm in structure.get_atoms()]
+    elif level == 'ca':
+        coords = [res['CA'].coord for res in structure.get_residues() if 'CA' in res]
+    elif level == 'centroid':
+        coords = [np.mean([atm.coord for atm in res], axis=0) for res in structure.get_residues()]
+    else:
+        raise ValueError(f'level was {level}, need one of {LEVELS}')
+    return np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+
+def distance_matrix(coords: np.ndarray, out: Union[str, np.ndarray] = None,
+                    tile: int = TILE) -> np.ndarray:
+    '''
+    euclidean distance between every pair of rows in coords, in float32
+    out may be None, an existing (N, N) array, or a path for a new .npy
+    memory map. the matrix is symmetric, so only tiles on or above the
+    diagonal are computed and their transpose is copied below it
+    '''
+    coords = np.asarray(coords, dtype=np.float32)
+    n = len(coords)
+    if out is None:
+        out = np.empty((n, n), dtype=np.float32)
+    elif not isinstance(out, np.ndarray):
+        out = np.lib.format.open_memmap(str(out), mode='w+', dtype=np.float32, shape=(n, n))
+    for row in range(0, n, tile):
+        rows = coords[row:row + tile]
+        for col in range(row, n, tile):
+            cols = coords[col:col + tile]
+            block = np.sqrt(((rows[:, None, :] - cols[None, :, :]) ** 2).sum(axis=-1))
+            out[row:row + len(rows), col:col + len(cols)] = block
+            if col != row:
+                out[col:col + len(cols), row:row + len(rows)] = block.T
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
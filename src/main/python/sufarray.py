@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+'''
+persistent suffix array with LCP for exact substring queries
+
+all records of a file are joined, each followed by its own separator, and
+one suffix array over them is built by prefix doubling: every round sorts
+the suffixes by their first 2h symbols using the ranks by the first h,
+all in numpy. building peaks at 35 to 55 bytes per base (int64 ranks,
+sort keys, order and the sort's workspace) whatever the number of
+doubling rounds, so a 100 Mb chromosome needs up to about 5.5 GB, and the
+rank * (n + 1) sort key limits the text to 3 Gb. the LCP of neighbouring
+suffixes comes from Kasai's linear scan, a python loop of about 1 s per
+Mb, so it is only computed when repeats or a longest common substring
+first need it. text, suffix array and LCP, up to 9 bytes per base, are
+saved as .npy files in <file>.sufarray/ beside the data and memory mapped
+when opened again, rebuilt once the file changes.
+
+count and locate are two binary searches over the suffix array, so they
+cost O(m log n) for a pattern of length m. repeated k-mers are the runs
+of LCP >= k, and the longest common substring of two records is the best
+LCP between neighbouring suffixes from different records. queries are
+case insensitive.
+
+    python sufarray.py genome.fasta --count GAATTC --locate TATAAT --repeats 25 --lcs chr1 chr2
+'''
+from array import array
+import argparse
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+import encoding
+import seqindex
+
+INDEX_SUFFIX = '.sufarray'
+SEPARATOR = 0
+
+
+class Record(NamedTuple):
+    id: str
+    start: int
+    length: int
+
+
+def _codes(text: np.ndarray, records: int) -> np.ndarray:
+    # separators become 0, 1, 2, ... in record order, so no prefix runs across one
+    codes = text.astype(np.int32) + records
+    separators = np.flatnonzero(text == SEPARATOR)
+    codes[separators] = np.arange(len(separators))
+    return codes
+
+def suffix_array(codes: np.ndarray) -> np.ndarray:
+    '''
+    suffix array of codes, which must end in a symbol found nowhere else.
+    each round ranks the suffixes by their first 2h symbols from the ranks
+    by the first h, in place, so memory stays the same however many rounds
+    a repetitive genome needs
+    '''
+    n = len(codes)
+    rank = np.unique(codes, return_inverse=True)[1].astype(np.int64).ravel()
+    h = 1
+    while rank.max() < n - 1:
+        # suffixes shorter than h sort first, the unique end symbol settles the rest
+        key = rank * (n + 1)
+        key[:n - h] += rank[h:] + 1
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        rank[order[0]] = 0
+        rank[order[1:]] = np.cumsum(key[1:] != key[:-1])
+        del key, order
+        h *= 2
+    sa = np.empty(n, dtype=np.int64)
+    sa[rank] = np.arange(n)
+    return sa
+
+def lcp_array(codes: np.ndarray, sa: np.ndarray) -> np.ndarray:
+    '''
+    lcp[i], the longest common prefix of suffixes sa[i] and sa[i + 1], by
+    Kasai et al. 2001: going along the text, the lcp of the next suffix
+    with its neighbour is at most one less than this one's, so the symbol
+    comparisons add up to O(n). a python loop, about 1 s per million symbols
+    '''
+    n = len(sa)
+    rank = np.empty(n, dtype=np.int64)
+    rank[sa] = np.arange(n)
+    # array lookups are much quicker than numpy scalar indexing
+    wide = n >= 2**31
+    dtype, typecode = (np.int64, 'q') if wide else (np.int32, 'i')
+    text = array('i', codes.astype(np.int32).tobytes())
+    order = array(typecode, sa.astype(dtype).tobytes())
+    ranks = array(typecode, rank.astype(dtype).tobytes())
+    del rank
+    lcp = array(typecode, bytes(order.itemsize * max(n - 1, 0)))
+    h = 0
+    for i in range(n):
+        r = ranks[i]
+        if r == n - 1:
+            h = 0
+            continue
+        j = order[r + 1]
+        # the unique end symbol stops this before either runs off the end
+        while text[i + h] == text[j + h]:
+            h += 1
+        lcp[r] = h
+        if h:
+            h -= 1
+    return np.frombuffer(lcp, dtype=dtype)
+
+
+class SuffixIndex:
+    '''
+    >>> index = SuffixIndex.build([('chr1', seq1), ('chr2', seq2)])
+    >>> index.count('GAATTC'), index.locate('GAATTC', 'chr1')
+    >>> index.repeats(25)[:10]
+    >>> index.longest_common_substring('chr1', 'chr2')
+    '''
+    def __init__(self, text: np.ndarray, sa: np.ndarray, records: List[Record],
+                 lcp: np.ndarray = None, directory: Path = None):
+        # text is the upper cased records as bytes, each followed by a 0 byte
+        self.text = text
+        self.sa = sa
+        self._lcp = lcp
+        # where a saved index lives, the lcp joins it once computed
+        self.directory = directory
+        self.records = records
+        self.starts = np.array([record.start for record in records], dtype=np.int64)
+        self._ids = {record.id: i for i, record in enumerate(records)}
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, str]]) -> 'SuffixIndex':
+        # from (id, sequence) pairs
+        pieces, table, start = [], [], 0
+        for record_id, sequence in records:
+            raw = encoding.as_bytes(sequence).upper()
+            pieces.extend((raw, bytes([SEPARATOR])))
+            table.append(Record(record_id, start, len(raw)))
+            start += len(raw) + 1
+        text = np.frombuffer(b''.join(pieces), dtype=np.uint8)
+        sa = suffix_array(_codes(text, len(table)))
+        dtype = np.int32 if len(text) < 2**31 else np.int64
+        return cls(text, sa.astype(dtype), table)
+
+    @property
+    def lcp(self) -> np.ndarray:
+        # exact queries only need sa, so this is left until something asks
+        if self._lcp is None:
+            lcp = lcp_array(_codes(np.asarray(self.text), len(self.records)), np.asarray(self.sa))
+            self._lcp = lcp.astype(self.sa.dtype)
+            if self.directory is not None:
+                try:
+                    _save_array(self.directory, 'lcp', self._lcp)
+                except OSError:
+                    pass
+        return self._lcp
+
+    def __len__(self):
+        return len(self.records)
+
+    def ids(self) -> List[str]:
+        return [record.id for record in self.records]
+
+    def _record(self, record_id) -> int:
+        if record_id is None:
+            return 0
+        if record_id not in self._ids:
+            raise KeyError(f'{record_id} is not in the index')
+        return self._ids[record_id]
+
+    def _bounds(self, pattern) -> Tuple[int, int]:
+        # the suffix array rows whose suffixes start with pattern
+        pattern = encoding.as_bytes(pattern).upper()
+        m = len(pattern)
+        text, sa = self.text, self.sa
+        prefix = lambda row: text[sa[row]:sa[row] + m].tobytes()
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if prefix(mid) < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        first, hi = lo, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if prefix(mid) <= pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        return first, lo
+
+    def count(self, pattern) -> int:
+        # occurrences in all records
+        if not len(pattern):
+            return 0
+        first, last = self._bounds(pattern)
+        return last - first
+
+    def locate(self, pattern, record_id: str = None) -> np.ndarray:
+        '''
+        ascending 0 based start positions of pattern in one record, the
+        first by default. see occurrences for every record at once
+        '''
+        i = self._record(record_id)
+        positions = self._positions(pattern)
+        record = self.records[i]
+        inside = positions[(positions >= record.start) & (positions < record.start + record.length)]
+        return inside - record.start
+
+    def occurrences(self, pattern) -> List[Tuple[str, int]]:
+        # (record id, position) of every occurrence, in file order
+        positions = self._positions(pattern)
+        owners = np.searchsorted(self.starts, positions, side='right') - 1
+        return [(self.records[owner].id, int(position - self.starts[owner]))
+                for owner, position in zip(owners.tolist(), positions.tolist())]
+
+    def _positions(self, pattern) -> np.ndarray:
+        if not len(pattern):
+            return np.empty(0, dtype=np.int64)
+        first, last = self._bounds(pattern)
+        return np.sort(self.sa[first:last].astype(np.int64))
+
+    def repeats(self, k: int, min_count: int = 2) -> List[Tuple[str, int]]:
+        '''
+        every k-mer occurring at least min_count times across all records,
+        as (kmer, count) pairs, most frequent first. k-mers sharing a
+        prefix of length k sit next to each other in the suffix array, so
+        each is a run of lcp >= k
+        '''
+        long = np.concatenate(([False], np.asarray(self.lcp) >= k, [False]))
+        edges = np.flatnonzero(long[1:] != long[:-1])
+        first, last = edges[0::2], edges[1::2]
+        counts = last - first + 1
+        keep = counts >= min_count
+        first, counts = first[keep], counts[keep]
+        order = np.argsort(-counts, kind='stable')
+        return [(self.text[self.sa[row]:self.sa[row] + k].tobytes().decode('ascii'), int(count))
+                for row, count in zip(first[order].tolist(), counts[order].tolist())]
+
+    def longest_common_substring(self, record_a: str, record_b: str) -> Tuple[str, int, int]:
+        '''
+        (substring, position in record_a, position in record_b). between
+        two suffixes of the records that are neighbours once every other
+        suffix is dropped, the lcp is the smallest lcp of the rows between
+        '''
+        a, b = self._record(record_a), self._record(record_b)
+        owners = np.searchsorted(self.starts, np.asarray(self.sa), side='right') - 1
+        rows = np.flatnonzero((owners == a) | (owners == b))
+        if len(rows) < 2:
+            return '', -1, -1
+        # a 0 on the end, as the last row can be the last suffix
+        between = np.minimum.reduceat(np.append(self.lcp, 0), rows)[:-1]
+        between[owners[rows[:-1]] == owners[rows[1:]]] = 0
+        best = int(np.argmax(between))
+        length = int(between[best])
+        if not length:
+            return '', -1, -1
+        first, second = int(self.sa[rows[best]]), int(self.sa[rows[best + 1]])
+        if owners[rows[best]] != a:
+            first, second = second, first
+        substring = self.text[first:first + length].tobytes().decode('ascii')
+        return substring, first - self.records[a].start, second - self.records[b].start
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(exist_ok=True)
+        (directory / 'lcp.npy').unlink(missing_ok=True)
+        for name in ('text', 'sa'):
+            np.save(directory / f'{name}.npy', getattr(self, name))
+        if self._lcp is not None:
+            np.save(directory / 'lcp.npy', self._lcp)
+        self.directory = directory
+        # written last, so a half written index is never taken for a fresh one
+        with open(directory / 'records.tsv', 'w') as handle:
+            for record in self.records:
+                handle.write(f'{record.id}\t{record.start}\t{record.length}\n')
+
+    @classmethod
+    def load(cls, directory) -> 'SuffixIndex':
+        directory = Path(directory)
+        text, sa = (np.load(directory / f'{name}.npy', mmap_mode='r') for name in ('text', 'sa'))
+        # only there once something has needed it
+        lcp_path = directory / 'lcp.npy'
+        lcp = np.load(lcp_path, mmap_mode='r') if lcp_path.exists() else None
+        records = []
+        for line in open(directory / 'records.tsv'):
+            record_id, start, length = line.rstrip('\n').split('\t')
+            records.append(Record(record_id, int(start), int(length)))
+        return cls(text, sa, records, lcp, directory)
+
+
+def _save_array(directory: Path, name: str, values: np.ndarray):
+    # through a temporary file, so a reader never maps half of one
+    tmp = directory / f'{name}.tmp.npy'
+    np.save(tmp, values)
+    tmp.replace(directory / f'{name}.npy')
+
+def index_path(path) -> Path:
+    return Path(str(path) + INDEX_SUFFIX)
+
+def _fresh(directory: Path, path: Path) -> bool:
+    stamp = directory / 'records.tsv'
+    return stamp.exists() and stamp.stat().st_mtime >= path.stat().st_mtime
+
+_open = {}
+
+def open_index(path) -> SuffixIndex:
+    '''
+    the suffix index of a fasta or genbank file, memory mapped from beside
+    it when up to date, built and saved there otherwise
+    '''
+    path = Path(path)
+    key = str(path.resolve())
+    stamp = path.stat().st_mtime_ns
+    cached = _open.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    directory = index_path(path)
+    if _fresh(directory, path):
+        index = SuffixIndex.load(directory)
+    else:
+        index = SuffixIndex.build(seqindex.open_index(path))
+        try:
+            index.save(directory)
+        except OSError:
+            # read only data directory, keep the index in memory only
+            pass
+    _open[key] = (stamp, index)
+    return index
+
+def longest_common_substring(seq1, seq2) -> Tuple[str, int, int]:
+    # of two sequences that are not in an index, (substring, position in seq1, position in seq2)
+    return SuffixIndex.build([('1', seq1), ('2', seq2)]).longest_common_substring('1', '2')
+
+def main(args):
+    index = open_index(args.input)
+    for pattern in args.count or ():
+        print(f'{pattern}\t{index.count(pattern)}')
+    for pattern in args.locate or ():
+        for record_id, position in index.occurrences(pattern):
+            print(f'{pattern}\t{record_id}\t{position}')
+    if args.repeats:
+        for kmer, count in index.repeats(args.repeats)[:args.top]:
+            print(f'{kmer}\t{count}')
+    if args.lcs:
+        substring, first, second = index.longest_common_substring(*args.lcs)
+        print(f'{len(substring)}\t{first}\t{second}\t{substring}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exact substring queries on a suffix array index')
+    parser.add_argument('input', help='fasta or genbank file, indexed on first use')
+    parser.add_argument('--count', nargs='+', help='patterns to count')
+    parser.add_argument('--locate', nargs='+', help='patterns to find, printed as record and position')
+    parser.add_argument('--repeats', type=int, default=None, metavar='K',
+        help='list k-mers occurring more than once')
+    parser.add_argument('--top', type=int, default=50, help='most repeated k-mers shown')
+    parser.add_argument('--lcs', nargs=2, metavar=('RECORD1', 'RECORD2'),
+        help='longest common substring of two records')
+    main(parser.parse_args())
@@ -0,0 +1,162 @@
+'''
+corpus level k-mer TF-IDF index
+
+records are turned into k-mer count rows of one sparse CSR matrix whose
+columns are packed k-mer codes (see kmers.py), so the vocabulary never has
+to be fitted. document frequencies are kept as records are added, sparse
+like the counts (sorted codes and their frequencies), so k only bounds the
+code space, not memory. the TF-IDF weights follow sklearn's
+TfidfVectorizer defaults (raw counts, smooth idf, l2 normalised rows), so
+cosine similarity against one record or between all of them is a single
+sparse matrix product.
+'''
+import json
+from pathlib import Path
+from typing import Iterable, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import encoding
+import kmers
+
+
+def alphabet_for(*sequences) -> str:
+    '''
+    the alphabet to count k-mers of sequences over, case insensitive: DNA
+    when they are all ACGT, peptide when that covers them, otherwise every
+    symbol present, so any text still gets character k-mers
+    '''
+    raw = b''.join(encoding.as_bytes(sequence).upper() for sequence in sequences)
+    present = set(raw.decode('ascii'))
+    for fixed in (kmers.DNA_ALPHABET, kmers.PEPTIDE_ALPHABET):
+        if present <= set(fixed):
+            return fixed
+    return ''.join(sorted(present))
+
+
+class KmerTfidfIndex:
+    '''
+    >>> index = KmerTfidfIndex(k=6)
+    >>> index.add([('rec1', seq1), ('rec2', seq2)])
+    >>> index.query(seq3, top=5)
+    >>> index.similarity_matrix()
+    '''
+    def __init__(self, k: int = 6, alphabet: str = kmers.DNA_ALPHABET):
+        self.k = k
+        self.alphabet = alphabet
+        bits = kmers.Encoded(np.empty(0, dtype=np.uint8), alphabet).bits
+        if bits * k > 31:
+            raise ValueError(f'k={k} is too large for a {len(alphabet)} letter alphabet')
+        # codes are packed bits per symbol, so not every column is a k-mer
+        self.width = 1 << (bits * k)
+        self.ids = []
+        # document frequency of every k-mer seen, codes ascending
+        self.df_codes = np.empty(0, dtype=np.int64)
+        self.df_counts = np.empty(0, dtype=np.int64)
+        self._blocks = []
+        self._counts = sparse.csr_matrix((0, self.width), dtype=np.float64)
+        self._weights = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row(self, sequence) -> sparse.csr_matrix:
+        codes, counts = np.unique(kmers.fixed_codes(sequence, self.k, self.alphabet),
+                                  return_counts=True)
+        return sparse.csr_matrix(
+            (counts.astype(np.float64), codes.astype(np.int64), [0, len(codes)]),
+            shape=(1, self.width))
+
+    def add(self, records: Iterable[Tuple[str, str]]):
+        # add (id, sequence) records, the index does not need refitting
+        added = []
+        for record_id, sequence in records:
+            row = self._row(sequence)
+            self.ids.append(record_id)
+            self._blocks.append(row)
+            added.append(row.indices)
+        self._count_documents(np.concatenate(added) if added else np.empty(0, dtype=np.int64))
+        self._weights = None
+        return self
+
+    def _count_documents(self, codes: np.ndarray, counts: np.ndarray = None):
+        # merge codes (with counts, one each by default) into the document frequencies
+        if counts is None:
+            counts = np.ones(len(codes), dtype=np.int64)
+        merged, inverse = np.unique(np.concatenate((self.df_codes, codes.astype(np.int64))),
+                                    return_inverse=True)
+        self.df_counts = np.bincount(inverse.ravel(), weights=np.concatenate((self.df_counts, counts)),
+                                     minlength=len(merged)).astype(np.int64)
+        self.df_codes = merged
+
+    @property
+    def counts(self) -> sparse.csr_matrix:
+        if self._blocks:
+            self._counts = sparse.vstack([self._counts, *self._blocks], format='csr')
+            self._blocks = []
+        return self._counts
+
+    def document_frequency(self, codes: np.ndarray) -> np.ndarray:
+        # records holding each k-mer code, 0 for codes never seen
+        if not len(self.df_codes):
+            return np.zeros(len(codes), dtype=np.int64)
+        at = np.searchsorted(self.df_codes, codes).clip(max=len(self.df_codes) - 1)
+        return np.where(self.df_codes[at] == codes, self.df_counts[at], 0)
+
+    def idf(self, codes: np.ndarray) -> np.ndarray:
+        return np.log((1 + len(self.ids)) / (1 + self.document_frequency(codes))) + 1
+
+    def _tfidf(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        weighted = counts.copy()
+        weighted.data = weighted.data * self.idf(weighted.indices)
+        # row by row on the stored values, scipy's row sums and diagonal
+        # products allocate something as wide as the code space
+        rows = np.repeat(np.arange(weighted.shape[0]), np.diff(weighted.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=weighted.data ** 2, minlength=weighted.shape[0]))
+        norms[norms == 0] = 1
+        weighted.data /= norms[rows]
+        return weighted
+
+    @property
+    def weights(self) -> sparse.csr_matrix:
+        if self._weights is None:
+            self._weights = self._tfidf(self.counts)
+        return self._weights
+
+    def query(self, sequence, top: int = None):
+        '''
+        cosine similarity of sequence to every record, in record order, or
+        the `top` best as (id, similarity) pairs
+        '''
+        scores = (self.weights @ self._tfidf(self._row(sequence)).T).toarray().ravel()
+        if top is None:
+            return scores
+        best = np.argsort(-scores, kind='stable')[:top]
+        return [(self.ids[i], float(scores[i])) for i in best]
+
+    def similarity(self, id1: str, id2: str) -> float:
+        rows = self.weights[[self.ids.index(id1), self.ids.index(id2)]]
+        return float((rows[0] @ rows[1].T).toarray()[0, 0])
+
+    def similarity_matrix(self) -> np.ndarray:
+        # all against all cosine similarity, one sparse product
+        return (self.weights @ self.weights.T).toarray()
+
+    def save(self, path):
+        # path.npz holds the counts, path.json the ids and settings
+        path = Path(path)
+        sparse.save_npz(path.with_suffix('.npz'), self.counts)
+        with open(path.with_suffix('.json'), 'w') as handle:
+            json.dump({'k': self.k, 'alphabet': self.alphabet, 'ids': self.ids}, handle)
+
+    @classmethod
+    def load(cls, path) -> 'KmerTfidfIndex':
+        path = Path(path)
+        with open(path.with_suffix('.json')) as handle:
+            meta = json.load(handle)
+        index = cls(meta['k'], meta['alphabet'])
+        index.ids = meta['ids']
+        index._counts = sparse.load_npz(path.with_suffix('.npz')).tocsr()
+        index._count_documents(*np.unique(index._counts.indices, return_counts=True))
+        return index
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+'''
+six frame translation through a codon lookup table, and an ORF finder
+
+codon codes (see encoding.py) index a 65 entry table of amino acid letters
+for an NCBI genetic code, the last entry being X for codons with anything
+but A, C, G or T in them. the codons at every offset of both strands are
+translated with one take, and frame f is then every third letter from f,
+so all six frames cost two numpy passes. ORFs are found per frame from
+the positions of stop and start codons with searchsorted, no python loop
+over codons, and files are streamed one record at a time.
+
+    python translation.py genome.fasta --min-length 100 > orfs.tsv
+'''
+import argparse
+import sys
+from typing import Iterator, List, NamedTuple, Sequence
+
+import numpy as np
+
+import encoding
+import geneticcode
+import seqindex
+
+FRAMES = ('+1', '+2', '+3', '-1', '-2', '-3')
+STOP = ord(geneticcode.STOP)
+
+
+def lookup_table(table=1) -> np.ndarray:
+    # amino acid byte for each of the 64 codon codes, then X for INVALID_CODON
+    return geneticcode.get(table).forward
+
+def translate_codes(codons: np.ndarray, table=1) -> np.ndarray:
+    return lookup_table(table)[codons]
+
+def six_frames(sequence, table=1) -> List[str]:
+    '''
+    translation of every frame, in FRAMES order. reverse frames read the
+    reverse complement from its own start, like pepsearch's frames
+    '''
+    codes = encoding.encode_dna(sequence)
+    frames = []
+    for strand_codes in (codes, encoding.reverse_complement(codes)):
+        aminos = translate_codes(encoding.codon_codes(strand_codes), table)
+        frames.extend(aminos[frame::3].tobytes().decode('ascii') for frame in range(3))
+    return frames
+
+def translate(sequence, table=1, frame=0) -> str:
+    # one forward frame, codons with ambiguous bases become X
+    codons = encoding.codon_codes(encoding.encode_dna(sequence))
+    return translate_codes(codons[frame::3], table).tobytes().decode('ascii')
+
+
+class ORF(NamedTuple):
+    start: int
+    end: int
+    strand: int
+    frame: int
+    length: int
+
+
+def _frame_orfs(aminos: np.ndarray, is_start: np.ndarray, min_length: int,
+                require_start: bool):
+    # (first codon, stop codon) index pairs within one frame's translation
+    stops = np.flatnonzero(aminos == STOP)
+    if not len(stops):
+        return np.empty(0, dtype=np.int64), stops
+    # an ORF may begin just after the previous stop, or at the frame start
+    after_previous = np.concatenate(([0], stops[:-1] + 1))
+    if require_start:
+        starts = np.flatnonzero(is_start)
+        first = np.searchsorted(starts, after_previous)
+        found = first < len(starts)
+        begin = np.full(len(stops), -1, dtype=np.int64)
+        begin[found] = starts[first[found]]
+        valid = found & (begin < stops)
+    else:
+        begin, valid = after_previous, np.ones(len(stops), dtype=bool)
+    valid &= (stops - begin) >= min_length
+    return begin[valid], stops[valid]
+
+def find_orfs(sequence, table=1, min_length: int = 100, start_codons: Sequence[str] = ('ATG',),
+              require_start: bool = True) -> List[ORF]:
+    '''
+    open reading frames on both strands, from a start codon (or from just
+    after the previous stop when require_start is False) to a stop codon,
+    with at least min_length amino acids before the stop. coordinates are
+    0 based, end exclusive, on the forward strand, stop codon included.
+    ORFs that run off the end of the sequence are not reported
+    '''
+    codes = encoding.encode_dna(sequence)
+    n = len(codes)
+    start_set = np.zeros(encoding.INVALID_CODON + 1, dtype=bool)
+    for codon in start_codons:
+        start_set[encoding.codon_index(codon)] = True
+    orfs = []
+    for strand, strand_codes in ((1, codes), (-1, encoding.reverse_complement(codes))):
+        codons = encoding.codon_codes(strand_codes)
+        aminos = translate_codes(codons, table)
+        for frame in range(3):
+            begin, stop = _frame_orfs(aminos[frame::3], start_set[codons[frame::3]],
+                                      min_length, require_start)
+            first, last = frame + 3 * begin, frame + 3 * stop + 3
+            if strand == -1:
+                first, last = n - last, n - first
+            orfs.extend(ORF(int(a), int(b), strand, frame, int(length))
+                        for a, b, length in zip(first, last, stop - begin))
+    return sorted(orfs)
+
+def orfs_of_file(path, table=1, min_length: int = 100, start_codons: Sequence[str] = ('ATG',),
+                 require_start: bool = True) -> Iterator:
+    # (record id, ORF) pairs, one record in memory at a time
+    for record_id, sequence in seqindex.open_index(path):
+        for orf in find_orfs(sequence, table, min_length, start_codons, require_start):
+            yield record_id, orf
+
+def main(args):
+    sys.stdout.write('record\tstart\tend\tstrand\tframe\tlength\n')
+    count = 0
+    for path in args.inputs:
+        for record_id, orf in orfs_of_file(path, args.table, args.min_length,
+                                           args.start_codons.split(','), not args.stop_to_stop):
+            sys.stdout.write('\t'.join(map(str, (record_id, *orf))) + '\n')
+            count += 1
+    print(f'{count} ORFs found', file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Six frame ORF finder')
+    parser.add_argument('inputs', nargs='+', help='fasta or genbank files')
+    parser.add_argument('--table', default=1, type=geneticcode.get,
+        help='NCBI genetic code id or name, e.g. 11 or Bacterial')
+    parser.add_argument('--min-length', default=100, type=int,
+        help='fewest amino acids before the stop codon')
+    parser.add_argument('--start-codons', default='ATG',
+        help='comma separated start codons')
+    parser.add_argument('--stop-to-stop', action='store_true',
+        help='report stop to stop ORFs without needing a start codon')
+    main(parser.parse_args())
@@ -1,31 +1,138 @@
 #!/usr/bin/env python3
 import argparse
-from Bio import PDB, SeqIO, SeqRecord, Seq
-from Bio.Data import CodonTable
-from collections import Counter, defaultdict
-from dna_features_viewer import BiopythonTranslator, CircularGraphicRecord, GraphicFeature, GraphicRecord
-from itertools import chain, product
-from matplotlib import pyplot as plt
-import multiprocessing as mp
+import atexit
+from Bio import SeqIO, SeqRecord, Seq
+import importlib
+import io
 import numpy as np
 import os
 from pathlib import Path
-import seaborn as sns
-from sklearn.feature_extraction.text import TfidfVectorizer
 import sys
 import textdistance as TD
-from typing import Iterable, List
-
-plt.style.use('ggplot')
-sns.set()
-
+from typing import List
+
+import abitrace
+import batch
+import encoding
+import geneticcode
+import kmers
+import levenshtein
+import pairwise
+import pepsearch
+import profiling
+import resultcache
+import seqindex
+import simservice
+import structdist
+import translation
+import windowscan
+
+# plotting, ML and structure libraries take seconds to import, so they are
+# only loaded by the functions that need them (see pyplot() and
+# __getattr__). PLOTDIR and DATADIR are created on first write
 PLOTDIR = 'plots'
-if not os.path.exists(PLOTDIR):
-    os.mkdir(os.path.join(os.curdir, PLOTDIR))
-
 DATADIR = 'data'
-if not os.path.exists(DATADIR):
-    os.mkdir(os.path.join(os.curdir, DATADIR))
+_LAZY_MODULES = {
+    'plt': 'matplotlib.pyplot',
+    'sns': 'seaborn',
+    'PDB': 'Bio.PDB',
+    'tfidfindex': 'tfidfindex',
+    'minhash': 'minhash',
+    'sufarray': 'sufarray',
+    'dna_features_viewer': 'dna_features_viewer',
+}
+_plt = None
+
+def pyplot():
+    # matplotlib.pyplot, imported and styled the first time anything plots
+    global _plt
+    if _plt is None:
+        from matplotlib import pyplot as plt
+        import seaborn as sns
+        plt.style.use('ggplot')
+        sns.set()
+        _plt = plt
+    return _plt
+
+def __getattr__(name):
+    # keeps viz.plt, viz.PDB etc working without importing them up front
+    if name == 'plt':
+        return pyplot()
+    if name in _LAZY_MODULES:
+        return importlib.import_module(_LAZY_MODULES[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def plot_path(fname):
+    # path for a new plot file, creating PLOTDIR if this is the first one
+    os.makedirs(PLOTDIR, exist_ok=True)
+    return os.path.join(PLOTDIR, fname)
+
+@profiling.timed('io')
+def save_plot(plot, fname):
+    # write a CLI plot to PLOTDIR, savefig draws the figure too
+    fpath = plot_path(fname)
+    plot.savefig(fpath, transparent=True, bbox_inches='tight')
+    return fpath
+
+# previews are rendered at PREVIEW_DPI, or lower when that would pass
+# PREVIEW_PIXELS, full resolution renders and exports at FULL_DPI
+PREVIEW_DPI = 100
+PREVIEW_PIXELS = 2_000_000
+FULL_DPI = 300
+
+def as_figure(result):
+    '''
+    the Figure behind whatever a plotting function returned (pyplot itself,
+    an Axes or a Figure), detached from pyplot so the next plot starts on a
+    fresh figure and this one can still be rendered later
+    '''
+    plt = pyplot()
+    if result is plt:
+        fig = plt.gcf()
+    elif hasattr(result, 'savefig'):
+        fig = result
+    elif hasattr(result, 'figure'):
+        fig = result.figure
+    else:
+        raise TypeError(f'{type(result).__name__} is not a matplotlib plot')
+    plt.close(fig)
+    return fig
+
+def preview_dpi(fig, dpi=PREVIEW_DPI, max_pixels=PREVIEW_PIXELS):
+    width, height = fig.get_size_inches()
+    return min(dpi, (max_pixels / (width * height)) ** 0.5)
+
+@profiling.timed('render')
+def render_png(fig, dpi=None, max_pixels=PREVIEW_PIXELS):
+    '''
+    png bytes of a figure, rendered in memory, ready for
+    QPixmap.loadFromData. without a dpi a downsampled preview is rendered
+    '''
+    if dpi is None:
+        dpi = preview_dpi(fig, max_pixels=max_pixels)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, transparent=True, bbox_inches='tight')
+    return buffer.getvalue()
+
+@profiling.timed('io')
+def export_figure(fig, fpath, dpi=FULL_DPI):
+    # the only place a gui plot touches the disk, the format follows the suffix
+    fig.savefig(fpath, dpi=dpi, transparent=True, bbox_inches='tight')
+    return fpath
+
+# computed results, keyed on input file path, size and mtime
+CACHEDIR = os.path.join(DATADIR, 'cache')
+cache = resultcache.ResultCache(CACHEDIR)
+
+# heatMatrix is parallel and condensed, so thousands of windows are fine
+HEATMAP_NGRAM_LIMIT = 2000
+HEATMAP_ANNOTATE_LIMIT = 30
+# points per channel an abi trace is cut down to, and the most base calls labelled
+ABI_WIDTH = 2000
+ABI_LABEL_LIMIT = 150
+# seconds any one textdistance metric may run in multiprocTextfuncs
+SIMILARITY_TIMEOUT = 120
+_similarity_service = None
 
 textdistfuncs = [
     'cosine',
@@ -64,141 +171,103 @@ textdistfuncs = [
 
 def lev_distance(str1, str2):
     # calculates levenshtein similarity between 2 strings
-    xlen, ylen = len(str1) + 1, len(str2) + 1
-    distmatrix = np.zeros((xlen, ylen))
-    for x in range(xlen): distmatrix[x,0] = x
-    for y in range(ylen): distmatrix[0,y] = y
-    for x in range(1, xlen):
-        for y in range(1, ylen):
-            if str1[x-1] == str2[y-1]:
-                distmatrix[x,y] = min(
-                    distmatrix[x-1,y] + 1,
-                    distmatrix[x-1,y-1],
-                    distmatrix[x,y-1] + 1)
-            else:
-                distmatrix[x,y] = min(
-                    distmatrix[x-1,y] + 1,
-                    distmatrix[x-1,y-1] + 1,
-                    distmatrix[x,y-1] + 1)
-    return distmatrix[xlen-1, ylen-1]
+    return float(levenshtein.distance(str1, str2))
+
+def lev_distances(query, targets):
+    # levenshtein distance from one query to each of targets, in one call
+    return levenshtein.distances(query, targets)
 
 def lev_ratio(str1, str2):
     # calculates levenshtein distance as a ratio of the maximum edit distance
     upper_bound = max(len(str1), len(str2))
     return 1 - lev_distance(str1, str2) / upper_bound
 
-def tfidf_cosine_distance(str1, str2):
+def tfidf_cosine_distance(str1, str2, k=3):
     # returns a float, a higher number is closer/better result
-    vectors = TfidfVectorizer(min_df=1)
-    tfidf = vectors.fit_transform([str1, str2])
-    return (tfidf*tfidf.T).A[0,1]
-
-def create_distance_matrix(pdbfile, quiet=False):
-    derp = PDB.PDBParser(QUIET=quiet).get_structure('pdbfile', pdbfile)
-    allatoms = [[atm for atm in res.get_atom()] for res in derp.get_residues()]
-    atoms = list(chain(*allatoms))
-    return [[rowat - colat for rowat in atoms] for colat in atoms]
-
-def get_translation_table():
-    '''
-    take user input to select codon table
-    table choices and species choices lists are created from
-    >>> dir(CodonTable)
-    >>> dir(CodonTable.table_choices[choice])
-    select ambiguous|unambiguous
-    select DNA|RNA
-    return codon table from list
-    '''
-    table_choices = [
-        'ambiguous_dna_by_name', 'ambiguous_generic_by_name', 'ambiguous_rna_by_name',
-        'generic_by_name', 'standard_dna_table', 'standard_rna_table',
-        'unambiguous_dna_by_name', 'unambiguous_rna_by_name'
-    ]
-    species_choices = [
-        'Alternative Flatworm Mitochondrial', 'Alternative Yeast Nuclear', 'Archaeal', 'Ascidian Mitochondrial',
-        'Bacterial', 'Blepharisma Macronuclear', 'Candidate Division SR1', 'Chlorophycean Mitochondrial', 'Ciliate Nuclear',
-        'Coelenterate Mitochondrial', 'Dasycladacean Nuclear', 'Echinoderm Mitochondrial', 'Euplotid Nuclear',
-        'Flatworm Mitochondrial', 'Gracilibacteria', 'Hexamita Nuclear', 'Invertebrate Mitochondrial',
-        'Mold Mitochondrial', 'Mycoplasma', 'Pachysolen tannophilus Nuclear Code', 'Plant Plastid',
-        'Protozoan Mitochondrial', 'Pterobranchia Mitochondrial', 'SGC0', 'SGC1', 'SGC2', 'SGC3',
-        'SGC4', 'SGC5', 'SGC8', 'SGC9', 'Scenedesmus obliquus Mitochondrial', 'Spiroplasma', 'Standard',
-        'Thraustochytrium Mitochondrial', 'Trematode Mitochondrial', 'Vertebrate Mitochondrial', 'Yeast Mitochondrial',
-    ]
-    codontable = 0
-    print('please select rna or dna, ambiguous or unambiguous.')
-    for index, table in enumerate(table_choices):
-        print('{}) {}'.format(index, table))
-    codontable = input('please enter table number: ')
-    codontable = int(codontable)
-    tablechoice = table_choices[codontable]
-    if tablechoice == 'standard_dna_table' or tablechoice == 'standard_rna_table':
-        return CodonTable.__dict__[tablechoice].forward_table
-
-    speciestable = 0
-    print('please select rna or dna, ambiguous or unambiguous.')
-    for index, table in enumerate(species_choices):
-        print('{}) {}'.format(index, table))
-    speciestable = input('please enter table number: ')
-    speciestable = int(speciestable)
-    specieschoice = species_choices[speciestable]
-    if tablechoice == 'ambiguous_dna_by_name' or tablechoice == 'ambiguous_generic_by_name' or tablechoice == 'ambiguous_rna_by_name':
-        return CodonTable.__dict__[tablechoice][specieschoice].forward_table.forward_table
-
-    return CodonTable.__dict__[tablechoice][specieschoice].forward_table
-
-
-def naive_backtranslate(seq_object: str) -> List:
+    # k-mer tokens, see tfidfindex.py. for many sequences build one index
+    # the alphabet follows the input, so peptides and plain text work too
+    import tfidfindex
+    index = tfidfindex.KmerTfidfIndex(k, tfidfindex.alphabet_for(str1, str2))
+    index.add([(0, str1), (1, str2)])
+    return index.similarity(0, 1)
+
+@profiling.timed('compute')
+@cache.cached('fs_file')
+def tfidf_index(fs_file, k=6):
+    '''
+    k-mer TF-IDF index over every record in fs_file, fitted once
+    use .query() for one-vs-all and .similarity_matrix() for all-vs-all
+    '''
+    import tfidfindex
+    index = tfidfindex.KmerTfidfIndex(k)
+    index.add(seqindex.open_index(fs_file))
+    return index
+
+@profiling.entry_point
+def create_distance_matrix(pdbfile, quiet=False, level='atom', out=None):
+    '''
+    distance matrix of all atoms, or of residues by their CA atom or
+    centroid when level is 'ca' or 'centroid'. give `out` a .npy path
+    to write the matrix to a memory mapped file rather than into RAM
+    '''
+    if out is None:
+        return structure_distances(pdbfile, quiet, level)
+    with profiling.stage('parse', 'load_structure'):
+        coords = structdist.coordinates(structdist.load_structure(pdbfile, quiet=quiet), level)
+    with profiling.stage('compute', 'distance_matrix'):
+        return structdist.distance_matrix(coords, out=out)
+
+@cache.cached('pdbfile')
+def structure_distances(pdbfile, quiet=False, level='atom'):
+    with profiling.stage('parse', 'load_structure'):
+        coords = structdist.coordinates(structdist.load_structure(pdbfile, quiet=quiet), level)
+    with profiling.stage('compute', 'distance_matrix'):
+        return structdist.distance_matrix(coords)
+
+def get_translation_table(table=1):
+    '''
+    codon -> amino acid dict (stops left out) of a genetic code, picked by
+    NCBI id or name, see geneticcode.choices(). the tables are built once
+    per process, so this never blocks on input and works in workers
+    >>> get_translation_table('Vertebrate Mitochondrial')['TGA']
+    'W'
+    '''
+    return geneticcode.get(table).forward_table
+
+
+def naive_backtranslate(seq_object: str, table=1) -> List:
     '''
     parse given seq_object argument into peptide string
     back translate each amino acid to its potential codons
-      i.e. reverse the codon table, keeping codons in a list
-      if there is more than one for any given amino acid
+      i.e. the reverse codon table of the genetic code, keeping codons in
+      a list, '*' gives the stop codons
     eg:
-    >>> table = table_choices[codontable]
-    >>> species = species_choices[speciestable]
-    >>> cerp = CodonTable.__dict__[table][species].forward_table
-    >>> newcerp = dict()
-    >>> for cod, ami in cerp.items():
-    >>>     if ami not in newcerp.keys():
-    >>>         newcerp[ami] = [cod]
-    >>>     else:
-    >>>         newcerp[ami].append(cod)
-    >>> print(newcerp)
-    >>> new_seq_object = [newcerp[ami] for ami in seq_object]
-    >>> new_seq_lengths = [len(codons) for codons in new_seq_object]
-    >>> total_permutations = reduce(lambda x,y:x*y, new_seq_lengths)
-    >>> print(total_permutations)
-    >>> print('there are: ', len(str(total_permutations)), ' digits in the number of total permutations')
-    '''
-    target_codon_table = get_translation_table()
-    back_table = dict()
-    for codon, amino in target_codon_table.items():
-        if amino not in back_table.keys():
-            back_table[amino] = [codon]
-        else:
-            back_table[amino].append(codon)
-    new_seq_object = [back_table[amino] for amino in seq_object]
-    return new_seq_object
+    >>> naive_backtranslate('MW*')
+    [['ATG'], ['TGG'], ['TAA', 'TAG', 'TGA']]
+    >>> total_permutations = reduce(lambda x,y:x*y, map(len, naive_backtranslate(seq_object)))
+    '''
+    back_table = geneticcode.get(table).reverse
+    return [list(back_table[amino]) for amino in seq_object]
 
-def get_peptide_index(nuc_sequence: str, prot_sequence: str, codon_count: int) -> None:
+@profiling.timed('compute')
+def get_peptide_index(nuc_sequence: str, prot_sequence: str, codon_count: int = None, table=1) -> List:
     '''
     1. use naive_backtrace to get list of codons for each amino
-    2. calculate Cartesian product of potential input codons
-      - this creates potential nucleotide sequences to check for
-    3. get index of each potential sequence in nuc_sequence
-    '''
-    potential_codons = naive_backtranslate(prot_sequence)[:codon_count]
-    search_nucs = list(product(*potential_codons))
-    for seq in search_nucs:
-        seq_string = ''.join(seq)
-        try:
-            return nuc_sequence.index(seq_string)
-            # to print all indices, but only works if looking for a single nucleotide:
-            # [index for index, value in enumerate(nuc_sequence) if value == seq_string]
-        except ValueError:
-            continue
+    2. compile the codon lists into a position specific codon set table
+    3. scan nuc_sequence once, in all three frames on both strands
+    returns every hit as a (start, end, strand, frame) tuple, see
+    pepsearch.find_codon_pattern. codon_count limits the search to the
+    first codon_count amino acids of prot_sequence. table is the genetic
+    code's NCBI id or name
+    '''
+    prot_sequence = str(prot_sequence).strip()[:codon_count]
+    potential_codons = naive_backtranslate(prot_sequence, table)
+    return pepsearch.find_codon_pattern(nuc_sequence, potential_codons)
 
+@profiling.timed('render')
 def demo_dna_features_viewer():
+    from dna_features_viewer import GraphicFeature, GraphicRecord
+    plt = pyplot()
     features=[
         GraphicFeature(start=0, end=20, strand=+1, color="#ffd700",
                        label="Small feature"),
@@ -218,52 +287,83 @@ def ngrams(sequence, n):
     count = max(0, len(sequence) - n + 1)
     return [tuple(sequence[i:i+n]) for i in range(count)]
 
-def make_trigrams(sequence):
-    if type(sequence)==SeqRecord.SeqRecord:
-        return [''.join([t for t in tup]) for tup in ngrams(str(sequence.seq), 3)]
-    elif type(sequence)==Seq.Seq:
-        return [''.join([t for t in tup]) for tup in ngrams(str(sequence), 3)]
-    elif type(sequence)==str:
-        return [''.join([t for t in tup]) for tup in ngrams(sequence, 3)]
-    else:
+def _check_sequence(sequence):
+    if type(sequence) not in (SeqRecord.SeqRecord, Seq.Seq, str):
         raise TypeError(
           ('sequence was type: {}, need Biopython.SeqRecord, Biopython.Seq.Seq, or str type'
           .format(type(sequence))))
+    return sequence
 
+def make_trigrams(sequence):
+    return kmers.windows(_check_sequence(sequence), 3)
+
+@profiling.timed('compute')
 def make_ngrams(n, sequence):
-    if type(sequence)==SeqRecord.SeqRecord:
-        return [''.join([t for t in tup]) for tup in ngrams(str(sequence.seq), n)]
-    elif type(sequence)==Seq.Seq:
-        return [''.join([t for t in tup]) for tup in ngrams(str(sequence), n)]
-    elif type(sequence)==str:
-        return [''.join([t for t in tup]) for tup in ngrams(sequence, n)]
-    else:
-        raise TypeError(
-          ('sequence was type: {}, need Biopython.SeqRecord, Biopython.Seq.Seq, or str type'
-          .format(type(sequence))))
+    return kmers.windows(_check_sequence(sequence), n)
 
-def calcDist(distFunc, inputSeq, seqFile):
+@profiling.timed('compute')
+def ngram_counts(n, sequence, top=None):
+    '''
+    count n-grams without building them, see kmers.py
+    returns a {ngram: count} dict, or the `top` most common (ngram, count)
+    pairs in the style of Counter.most_common
+    '''
+    _check_sequence(sequence)
+    if top is None:
+        return kmers.counts(sequence, n)
+    return kmers.top_k(sequence, n, top)
+
+@profiling.entry_point
+@profiling.timed('compute')
+@cache.cached('seqFile')
+def calcDist(distFunc, inputSeq, seqFile, k=20, max_distance=None, processes=1):
+    '''
+    closest k windows of the sequence in seqFile to inputSeq, as
+    (distance, position, window) tuples, case insensitive.
+    windows further than max_distance are skipped, processes > 1 splits the
+    scan over a process pool (distFunc must then be picklable)
+    exact levenshtein matches in fasta and genbank files are looked up in
+    the file's suffix array (see sufarray.py) instead of scanning
+    '''
+    if distFunc is lev_distance:
+        distFunc = levenshtein.distance
+    query = str(inputSeq).lower()
+    if max_distance == 0 and distFunc is levenshtein.distance and query \
+            and seqindex.FORMATS.get(Path(seqFile).suffix.lower()) in seqindex.INDEX_SUFFIX:
+        import sufarray
+        positions = sufarray.open_index(seqFile).locate(query)[:k]
+        return [(0, position, query) for position in positions.tolist()]
     record = get_seq(seqFile)
-    seqgrams = ngrams(str(record).lower(), len(inputSeq))
-    seqgrams = (''.join(seq) for seq in seqgrams)
-    return {gram: distFunc(gram, inputSeq) for gram in seqgrams}
+    return windowscan.scan_parallel(str(record).lower(), query,
+        distFunc, k=k, max_distance=max_distance, processes=processes)
 
-def heatMatrix(dgrams, distFunc):
+@profiling.timed('compute')
+@cache.cached()
+def heatMatrix(dgrams, distFunc, processes=None, progress=None):
     '''
     add your ngrams, get back a heatmap
-    TODO:
-    this should probably be run in its own process
-    python native matrix may be a bit slow too
+    only the upper triangle is computed, spread over `processes` workers,
+    then mirrored into a square float matrix. the diagonal is each ngram
+    scored against itself, so similarities show 1 there rather than 0.
+    distFunc can be lev_distance, any callable, or a name from textdistfuncs
+    progress(done, total) is called as rows or blocks finish
     '''
-    matrix = np.array([[0 for j in dgrams] for i in dgrams])
-    for i in range(len(dgrams)):
-        for j in range(len(dgrams)):
-            matrix[i][j] = distFunc(dgrams[i],dgrams[j])
-    return matrix
+    if distFunc is lev_distance:
+        distFunc = 'levenshtein'
+    condensed = pairwise.condensed_matrix(dgrams, distFunc, processes=processes,
+                                          progress=progress)
+    return pairwise.squareform(condensed, len(dgrams), pairwise.self_scores(dgrams, distFunc))
 
+@profiling.timed('render')
 def heatMap(heatMatrix, xLab, yLab):
+    import seaborn as sns
+    plt = pyplot()
     fig, ax = plt.subplots()
-    ax = sns.heatmap(heatMatrix, annot=True, xticklabels=xLab, yticklabels=yLab)
+    # annotating or labelling every cell is unreadable past a few dozen rows
+    small = len(heatMatrix) <= HEATMAP_ANNOTATE_LIMIT
+    ax = sns.heatmap(heatMatrix, annot=small,
+        xticklabels=xLab if small else 'auto',
+        yticklabels=yLab if small else 'auto')
     #im = ax.imshow(heatMatrix)
     '''
     for i in range(len(xLab)):
@@ -280,109 +380,228 @@ def heatMap(heatMatrix, xLab, yLab):
     return plt
 
 
-def nucSimPlot(segN, seqFile):
+@profiling.entry_point
+def nucSimPlot(segN, seqFile, progress=None):
     '''
     create similarity heatmap for a sequence of length segN
     '''
-    limit = 10
+    limit = HEATMAP_NGRAM_LIMIT
     sequence = get_seq(seqFile)
     ngrams = make_ngrams(segN, sequence)
     if len(ngrams) > limit:
-        print(f'running locally, cutting ngrams to {limit}')
+        print(f'cutting ngrams to {limit}')
         print(f'length: {len(ngrams)}')
         ngrams = ngrams[:limit]
-        print(f'current ngrams: {ngrams}')
-    heatMat =  heatMatrix(ngrams, lev_distance)
-    print(f'HEATMATRIX:\n{heatMat}')
+    heatMat =  heatMatrix(ngrams, lev_distance, progress=progress)
     return heatMap(heatMat, ngrams, ngrams)
 
-def pepSimPlot(segN, seqFile):
+@profiling.entry_point
+def pepSimPlot(segN, seqFile, progress=None, table=1):
     '''
     create similarity heatmap for a sequence of length segN
     '''
-    limit = 10
-    sequence = get_peptide_toplot(get_seq(seqFile))
+    limit = HEATMAP_NGRAM_LIMIT
+    sequence = get_peptide_toplot(get_seq(seqFile), table, peptide=seqindex.is_peptide(seqFile))
     ngrams = make_ngrams(segN, sequence)
     if len(ngrams) > limit:
-        print(f'running locally, cutting ngrams to {limit}')
+        print(f'cutting ngrams to {limit}')
         print(f'length: {len(ngrams)}')
         ngrams = ngrams[:limit]
-        print(f'current ngrams: {ngrams}')
-    heatMat =  heatMatrix(ngrams, lev_distance)
-    print(f'HEATMATRIX:\n{heatMat}')
+    heatMat =  heatMatrix(ngrams, lev_distance, progress=progress)
     return heatMap(heatMat, ngrams, ngrams)
 
+@profiling.entry_point
+def mashDistPlot(seqFiles, k=21, size=1000, individual=False):
+    '''
+    Mash distance heatmap between genome files, or between every record
+    in them with individual=True. MinHash sketches of k-mers are kept
+    beside each file (see minhash.py), so a rerun only reads those
+    '''
+    import minhash
+    if isinstance(seqFiles, (str, os.PathLike)):
+        seqFiles = [seqFiles]
+    with profiling.stage('compute', 'sketch_files'):
+        sketches = minhash.sketch_files(seqFiles, k, size, individual=individual)
+    with profiling.stage('compute', 'mash_distance'):
+        dmat = minhash.distance_matrix(sketches)
+    names = [sketch.name for sketch in sketches]
+    return heatMap(dmat, names, names)
+
+@cache.cached('nucFile')
+def nucleotide_counts(n, nucFile, top=None):
+    return ngram_counts(n, get_seq(nucFile), top=top)
+
+@cache.cached('pepFile')
+def peptide_counts(n, pepFile, top=None, table=1):
+    peptide = get_peptide_toplot(get_seq(pepFile), table, peptide=seqindex.is_peptide(pepFile))
+    return ngram_counts(n, peptide, top=top)
+
+@profiling.entry_point
 def nucleotide_distribution(n, nucFile, **kwargs):
     '''
     return plot object of 20 most common trigrams
     call `plt.show()` or `plt.savefig()` to use it
     '''
-    sequence = get_seq(nucFile)
-    gramCount = Counter(make_ngrams(n, sequence)).most_common(20)
-    lab, val = zip(*gramCount)
-    plt.bar(lab, val)
-    plt.xticks(rotation=90)
+    gramCount = nucleotide_counts(n, nucFile, top=20)
+    with profiling.stage('render', 'bar'):
+        plt = pyplot()
+        lab, val = zip(*gramCount)
+        plt.bar(lab, val)
+        plt.xticks(rotation=90)
     return plt
 
-def get_peptide_toplot(sequence):
-    peptide_alphabet = 'ACDEFGHIKLMNPQRSTVWYBXZJUO*'
-    if (type(sequence)==Seq.Seq and sequence.alphabet.letters==peptide_alphabet):
-        return sequence
-    elif type(sequence)==SeqRecord.SeqRecord:
-        return sequence.seq.transcribe().translate()
-    elif type(sequence)==Seq.Seq:
-        return sequence.transcribe().translate()
-    elif type(sequence)==str:
-        return Seq.Seq(sequence).transcribe().translate()
-    else:
+@profiling.timed('compute')
+def get_peptide_toplot(sequence, table=1, peptide=False):
+    '''
+    translate frame +1 of a nucleotide sequence through translation.py's
+    lookup table. codons of only N are X, other codons with ambiguous bases
+    (R, Y, CTN, ...) fall back to biopython, once per distinct codon, which
+    can still resolve some of them. alignment gaps are dropped first.
+    with peptide=True the sequence already is one and is returned as it is,
+    the letters alone cannot tell (ACDKMSTV is valid IUPAC DNA)
+    '''
+    if type(sequence) not in (SeqRecord.SeqRecord, Seq.Seq, str):
         raise TypeError('sequence was type: {}, need Biopython.SeqRecord, Biopython.Seq.Seq, or str type'.format(type(sequence)))
+    if type(sequence) == SeqRecord.SeqRecord:
+        sequence = sequence.seq
+    text = str(sequence)
+    if peptide:
+        return Seq.Seq(text)
+    text = text.replace('-', '')
+    codes = encoding.encode_dna(text)
+    codons = encoding.codon_codes(codes)[::3]
+    peptide = translation.translate_codes(codons, table)
+    ambiguous = np.flatnonzero(codons == encoding.INVALID_CODON)
+    if len(ambiguous):
+        raw = np.frombuffer(text.upper().encode('ascii'), dtype=np.uint8)
+        triplets = raw[:3 * len(codons)].reshape(-1, 3)[ambiguous].astype(np.int64)
+        # translate_codes already made NNN an X, so long N runs never reach biopython
+        resolvable = (triplets != ord('N')).any(axis=1)
+        distinct, inverse = np.unique(triplets[resolvable] @ [1 << 16, 1 << 8, 1], return_inverse=True)
+        table_id = geneticcode.get(table).id
+        aminos = [str(Seq.Seq(int(code).to_bytes(3, 'big').decode('ascii')).translate(table=table_id))
+                  for code in distinct.tolist()]
+        peptide[ambiguous[resolvable]] = np.frombuffer(''.join(aminos).encode('ascii'), dtype=np.uint8)[inverse.ravel()]
+    return Seq.Seq(peptide.tobytes().decode('ascii'))
+
+@profiling.entry_point
+def peptide_distribution(n, pepFile, table=1, **kwargs):
+    pepCount = peptide_counts(n, pepFile, top=20, table=table)
+    with profiling.stage('render', 'bar'):
+        plt = pyplot()
+        lab, val = zip(*pepCount)
+        plt.bar(lab, val)
+        plt.xticks(rotation=90)
+    return plt
 
-def peptide_distribution(n, pepFile, **kwargs):
-    sequence = get_seq(pepFile)
-    pepCount = Counter(make_ngrams(n, get_peptide_toplot(sequence))).most_common(20)
-    lab, val = zip(*pepCount)
-    plt.bar(lab, val)
-    plt.xticks(rotation=90)
+@profiling.entry_point
+def plot_ABI(abifilename, start=None, end=None, width=ABI_WIDTH, method='minmax'):
+    '''
+    plot the four channels of an abi trace, cut down to about `width`
+    points each (see abitrace.py), so long runs draw as fast as short ones.
+    a region start:end narrower than that is drawn at full resolution.
+    base calls and their quality are shown when few enough are in view
+    '''
+    with profiling.stage('parse', 'abitrace.read'):
+        trace = abitrace.read(abifilename)
+    with profiling.stage('compute', 'decimate'):
+        x, ys = trace.decimate(start, end, width, method)
+    return _draw_ABI(trace, x, ys, start, end)
+
+@profiling.timed('render', 'plot_ABI')
+def _draw_ABI(trace, x, ys, start, end):
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(12, 3))
+    for base, y in zip(trace.order, ys):
+        ax.plot(x, y, color=abitrace.BASE_COLOURS.get(base), linewidth=0.6, label=base)
+    if len(x):
+        ax.set_xlim(x[0], x[-1])
+    positions, calls, quality = trace.bases_in(start, end)
+    if 0 < len(calls) <= ABI_LABEL_LIMIT:
+        top = ys.max()
+        for position, base in zip(positions, calls):
+            ax.text(position, top, base, color=abitrace.BASE_COLOURS.get(base, 'grey'),
+                    ha='center', va='bottom', fontsize=6)
+        qual = ax.twinx()
+        qual.bar(positions, quality, width=(x[-1] - x[0]) / len(calls) * 0.6,
+                 color='grey', alpha=0.2)
+        qual.set_ylabel('quality')
+        qual.grid(False)
+    ax.legend(loc='upper right', fontsize=6)
     return plt
 
-def plot_ABI(abifilename):
-    record = get_abi(abifilename)
-    record.annotations.keys()
-    record.annotations['abif_raw'].keys()
-    channels = ['DATA9', 'DATA10', 'DATA11', 'DATA12']
-    trace = defaultdict(list)
-    for c in channels:
-        trace[c] = record.annotations['abif_raw'][c]
-    plt.plot(trace['DATA9'], color='blue')
-    plt.plot(trace['DATA10'], color='red')
-    plt.plot(trace['DATA11'], color='green')
-    plt.plot(trace['DATA12'], color='yellow')
+@profiling.entry_point
+def plot_plate(abifiles, columns=12, width=200):
+    '''
+    small multiples of every trace on a plate (96 wells by default layout),
+    each decimated to `width` points so a whole plate renders in seconds
+    '''
+    with profiling.stage('parse', 'abitrace.read'):
+        traces = [abitrace.read(abifile) for abifile in abifiles]
+    return _draw_plate(traces, columns, width)
+
+@profiling.timed('render', 'plot_plate')
+def _draw_plate(traces, columns, width):
+    plt = pyplot()
+    rows = max(1, -(-len(traces) // columns))
+    fig, axes = plt.subplots(rows, columns, figsize=(columns * 1.5, rows * 1.0), squeeze=False)
+    for ax, trace in zip(axes.flat, traces):
+        x, ys = trace.decimate(width=width)
+        for base, y in zip(trace.order, ys):
+            ax.plot(x, y, color=abitrace.BASE_COLOURS.get(base), linewidth=0.3)
+        ax.set_title(trace.name, fontsize=5)
+    for ax in axes.flat:
+        ax.axis('off')
+    fig.tight_layout()
     return plt
 
+@profiling.timed('parse')
+@cache.cached('gbfile')
+def graphic_record(recClass, gbfile):
+    from dna_features_viewer import BiopythonTranslator
+    return BiopythonTranslator().translate_record(gbfile, record_class=recClass)
+
+@profiling.entry_point
 def plot_graphic_record(recClass, gbfile):
     # plot graphic record from a genbank file
-    record = BiopythonTranslator().translate_record(gbfile, record_class=recClass)
-    ax, _ = record.plot()
-    ax.figure.tight_layout()
+    pyplot()
+    record = graphic_record(recClass, gbfile)
+    with profiling.stage('render', 'graphic_record.plot'):
+        ax, _ = record.plot()
+        ax.figure.tight_layout()
     return ax.figure
 
+@profiling.timed('parse')
 def get_abi(abifile):
-    return SeqIO.read(abifile, 'abi').seq
+    # the whole record, annotations (abif_raw, qualities) included
+    return SeqIO.read(abifile, 'abi')
 
-def get_genbank(gb_file):
-    return SeqIO.read(gb_file, 'genbank').seq
+def get_genbank(gb_file, record_id=None):
+    # one record of a (possibly multi-record) genbank file, the first by default
+    return seqindex.open_index(gb_file, 'genbank').record(record_id).seq
 
-def get_fasta(fs_file):
-    return SeqIO.read(fs_file, 'fasta').seq
+def get_fasta(fs_file, record_id=None):
+    # one record of a (possibly multi-record) fasta file, the first by default
+    return Seq.Seq(seqindex.open_index(fs_file, 'fasta').fetch(record_id))
 
-def get_seq(fs_file):
-    ext = Path(fs_file).suffixes[0].strip('.')
+@profiling.timed('parse')
+def get_seq(fs_file, record_id=None, start=None, end=None):
+    '''
+    sequence of one record in fs_file, optionally only its [start, end) range
+    fasta and genbank files are indexed on first use (see seqindex.py), so
+    later calls go straight to the record without parsing the whole file
+    '''
     print(f'get_seq retrieving file:\n{fs_file}')
-    if ext == 'abi': return get_abi(fs_file)
-    elif ext == 'gbk': return get_genbank(fs_file)
-    elif ext == 'gb': return get_genbank(fs_file)
-    elif ext == 'fasta': return get_fasta(fs_file)
-    else: return SeqIO.SeqRecord()
+    try:
+        fmt = seqindex.detect_format(fs_file)
+    except ValueError:
+        return SeqIO.SeqRecord()
+    if fmt == 'abi': return get_abi(fs_file).seq[start:end]
+    elif fmt == 'genbank': return get_genbank(fs_file, record_id)[start:end]
+    return Seq.Seq(seqindex.open_index(fs_file, fmt).fetch(record_id, start, end))
+
+def get_record_ids(fs_file):
+    return seqindex.open_index(fs_file).ids()
 
 def calc_sequence_similarity(func, seq1, seq2, queue):
     result = TD.__dict__[func](seq1, seq2)
@@ -390,29 +609,39 @@ def calc_sequence_similarity(func, seq1, seq2, queue):
         queue.put({func:result})
     else: return {func:result}
 
+def similarity_service(processes=None, timeout=SIMILARITY_TIMEOUT):
+    '''
+    the shared SimilarityService behind multiprocTextfuncs, its process pool
+    is started on first use, reused by every later call and closed at exit
+    '''
+    global _similarity_service
+    if _similarity_service is None:
+        _similarity_service = simservice.SimilarityService(
+            textdistfuncs, processes=processes, timeout=timeout)
+        atexit.register(_similarity_service.close)
+    return _similarity_service
+
+@profiling.entry_point
+@profiling.timed('compute')
+# a metric that timed out once may finish next time, so those results are not kept
+@cache.cached(keep=lambda scores: None not in scores.values())
 def multiprocTextfuncs(seq1, seq2):
     '''
-    note this pegs all cores on my old i5 for about a minute
-    using genbank files < 1MB
+    run every metric in textdistfuncs over seq1 and seq2 on the persistent
+    similarity pool, returns one {metric: score} dict
+    a metric that runs past SIMILARITY_TIMEOUT seconds scores None
     >>> import viz
     >>> seq1 = viz.get_genbank('sequence.gb')
     >>> seq2 = viz.get_genbank('sequence2.gb')
-    >>> resultlist = viz.multiprocTextfuncs(seq1,seq2)
-    >>> resultdict = {k:v for x in resultlist for k,v in x.items()}
-    '''
-    jobs = []
-    results = []
-    queue = mp.Queue()
-    for funcname in textdistfuncs:
-        p = mp.Process(target=calc_sequence_similarity, args=(funcname, seq1, seq2, queue))
-        jobs.append(p)
-        p.start()
-    for job in jobs:
-        res = queue.get()
-        results.append(res)
-    for job in jobs:
-        job.join()
-    return results
+    >>> resultdict = viz.multiprocTextfuncs(seq1,seq2)
+    '''
+    return similarity_service().compare(seq1, seq2)
+
+@profiling.entry_point
+@profiling.timed('compute')
+def multiprocTextfuncsMany(pairs):
+    # as multiprocTextfuncs, for many (seq1, seq2) pairs on the same pool
+    return similarity_service().compare_many(pairs)
 
 
 def make_parser():
@@ -426,6 +655,18 @@ def make_parser():
     parser.add_argument('-abi', '--abi-trace',
         help='plot an abi trace',
         default=False, action='store_true')
+    parser.add_argument('-abir', '--abi-region',
+        help='''with -abi, plot only samples START to END, at full
+        resolution when the region is narrow enough''',
+        default=None, nargs=2, type=int, metavar=('START', 'END'))
+    parser.add_argument('-plate', '--abi-plate',
+        help='''directories, glob patterns or abi files to plot together
+        as one plate overview''',
+        default=None, nargs='+')
+    parser.add_argument('-mash', '--mash-distance',
+        help='''directories, glob patterns or fasta/genbank files to compare
+        by MinHash (Mash) distance, plotted as one heatmap''',
+        default=None, nargs='+')
     parser.add_argument('-nuc', '--nucleotide_distribution',
         help='''plot a naive distribution of codons. I.e.
                 does not heed start/stop codons, ORFs etc''',
@@ -453,52 +694,101 @@ def make_parser():
         default=None,
         nargs='?',
         type=argparse.FileType('r'))
+    parser.add_argument('-table', '--table',
+        help='''NCBI genetic code for -pep and -nbt, by id or name, e.g.
+        11 or "Vertebrate Mitochondrial"''',
+        default=geneticcode.get(1), type=geneticcode.get)
     parser.add_argument('-dmat', '--distance_matrix',
         help='''give the name of a pdbfile, get a distrance matrix of all atoms
         in the protein''',
         default=None,
         nargs='?',
         type=argparse.FileType('r'))
+    parser.add_argument('-dlevel', '--distance_level',
+        help='''distance matrix between all atoms, or between residues
+        using their CA atom or their centroid''',
+        default='atom', choices=structdist.LEVELS)
+    parser.add_argument('-dout', '--distance_out',
+        help='''write the distance matrix to this .npy file (memory mapped)
+        instead of printing it''',
+        default=None)
+    parser.add_argument('-profile', '--profile',
+        help='''time the parse, compute, render and io stages of each step
+        into PREFIX.jsonl, and run everything under cProfile into
+        PREFIX.prof (open with snakeviz, or flameprof for a flame graph)''',
+        default=None, nargs='?', const='profile', metavar='PREFIX')
+    subparsers = parser.add_subparsers(dest='command')
+    batch.add_arguments(subparsers.add_parser('batch',
+        help='''headless k-mer, peptide and similarity stats for many files
+        over a process pool, written as JSON Lines or TSV. never plots'''))
     return parser
 
 def main(args):
+    if args.command == 'batch':
+        return batch.main(args)
     if args.filename:
-        ext = {'gbk':'genbank','fasta':'fasta'}
-        filename, filetype = args.filename.name.split('.')
-        sequence = SeqIO.read(args.filename, filetype)
+        seqFile = args.filename.name
+        filename = Path(seqFile).stem
+        sequence = get_seq(seqFile)
         if args.abi_trace:
-            abiplot = plot_ABI(sequence)
-            fname = f"{filename}_abiplot.png"
-            fpath = os.path.join(PLOTDIR, fname)
-            abiplot.savefig(fpath, transparent=True, bbox_inches='tight')
+            with profiling.entry('abi_trace'):
+                save_plot(plot_ABI(seqFile, *(args.abi_region or ())), f"{filename}_abiplot.png")
             print('abiplot.png created')
         if args.nucleotide_distribution:
-            nucplot = nucleotide_distribution(filename)
-            fname = f"{filename}_nucplot.png"
-            fpath = os.path.join(PLOTDIR, fname)
-            nucplot.savefig(fpath, transparent=True, bbox_inches='tight')
+            with profiling.entry('nucleotide_distribution'):
+                save_plot(nucleotide_distribution(3, seqFile), f"{filename}_nucplot.png")
             print('nucplot.png created')
         if args.peptide_distribution:
-            pepplot = peptide_distribution(1, filename)
-            fname = f"{filename}_pepplot.png"
-            fpath = os.path.join(PLOTDIR, fname)
-            pepplot.savefig(fpath, transparent=True, bbox_inches='tight')
+            with profiling.entry('peptide_distribution'):
+                save_plot(peptide_distribution(1, seqFile, table=args.table.id), f"{filename}_pepplot.png")
             print('pepplot.png created')
         if args.naive_backtrace:
             prot_seq = args.naive_backtrace.read()
-            sys.stdout.write(str(get_peptide_index(str(sequence.seq), prot_seq, 3)))
+            with profiling.entry('naive_backtrace'):
+                hits = get_peptide_index(str(sequence), prot_seq, table=args.table.id)
+            sys.stdout.write(str(hits))
     if args.distance_matrix:
-        sys.stdout.write(str(create_distance_matrix(args.distance_matrix.name, quiet=True)))
+        dmat = create_distance_matrix(args.distance_matrix.name, quiet=True,
+            level=args.distance_level, out=args.distance_out)
+        if args.distance_out:
+            print(f'{dmat.shape} distance matrix written to {args.distance_out}')
+        else:
+            sys.stdout.write(str(dmat))
+    elif args.abi_plate:
+        abifiles = [path for path in batch.find_inputs(args.abi_plate)
+                    if seqindex.detect_format(path) == 'abi']
+        with profiling.entry('abi_plate'):
+            save_plot(plot_plate(abifiles), 'plateplot.png')
+        print(f'plateplot.png created from {len(abifiles)} traces')
+    elif args.mash_distance:
+        seqFiles = [path for path in batch.find_inputs(args.mash_distance)
+                    if seqindex.detect_format(path) in seqindex.INDEX_SUFFIX]
+        with profiling.entry('mash_distance'):
+            save_plot(mashDistPlot(seqFiles), 'mashplot.png')
+        print(f'mashplot.png created from {len(seqFiles)} files')
     elif args.demonstrate:
-        demoplot = demo_dna_features_viewer()
-        fpath = os.path.join(PLOTDIR, 'demoplot.png')
-        demoplot.savefig(fpath, transparent=True, bbox_inches='tight')
+        with profiling.entry('demonstrate'):
+            save_plot(demo_dna_features_viewer(), 'demoplot.png')
         print('demoplot.png created')
 
+def print_entry(record):
+    # one line per finished entry point, self time of each stage
+    if record['type'] != 'entry':
+        return
+    stages = ', '.join(f"{stage} {times['wall']:.3f}s" for stage, times in record['stages'].items())
+    print(f"{record['entry']}: {record['wall']:.3f}s wall, {record['cpu']:.3f}s cpu ({stages})",
+          file=sys.stderr)
+
 if __name__ == '__main__':
     parser = make_parser()
     if len(sys.argv[1:]) == 0:
         parser.print_help()
         parser.exit()
     args = parser.parse_args()
-    main(args)
+    if args.profile:
+        profiling.configure(log=f'{args.profile}.jsonl')
+        profiling.add_listener(print_entry)
+        profiling.profile(main, f'{args.profile}.prof', args)
+        print(f'profile written to {args.profile}.prof, .txt and .jsonl', file=sys.stderr)
+    else:
+        main(args)
@@ -0,0 +1,78 @@
+'''
+streaming top-k sliding window search
+
+every window of a sequence is compared with a query, but only the best k
+(smallest distance) windows are kept, with their positions, in a bounded
+heap. repeated windows hit a cache instead of the distance function, and
+once the heap is full its worst distance becomes the threshold, which the
+levenshtein engine uses to abandon a window early. long sequences can be
+split into overlapping chunks and scanned on a process pool.
+'''
+import heapq
+import multiprocessing as mp
+import os
+from typing import Callable, List, Tuple
+
+import levenshtein
+
+# windows remembered by the repeat cache, per scan
+CACHE_SIZE = 1 << 16
+
+
+def scan(sequence: str, query: str, distFunc: Callable = levenshtein.distance,
+         k: int = 10, max_distance: float = None, offset: int = 0) -> List[Tuple]:
+    '''
+    best k windows of sequence as (distance, position, window) tuples,
+    closest first, ties going to the earliest position. windows further
+    than max_distance are dropped. offset is added to every position
+    '''
+    if k < 1:
+        return []
+    span = len(query)
+    heap = []
+    cache = {}
+    bounded = distFunc is levenshtein.distance
+    if bounded:
+        peq = levenshtein.pattern_masks(query)
+    for position in range(len(sequence) - span + 1):
+        window = sequence[position:position + span]
+        bound = max_distance
+        if len(heap) == k:
+            bound = -heap[0][0] if bound is None else min(bound, -heap[0][0])
+        dist = cache.get(window)
+        if dist is None:
+            if bounded:
+                cutoff = None if bound is None else int(bound)
+                dist = levenshtein._score(peq, span, window, cutoff)
+            else:
+                dist = distFunc(window, query)
+            if len(cache) < CACHE_SIZE:
+                cache[window] = dist
+        if bound is not None and dist > bound:
+            continue
+        entry = (-dist, -(position + offset), window)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return sorted((-dist, -position, window) for dist, position, window in heap)
+
+def _scan_chunk(args):
+    return scan(*args)
+
+def scan_parallel(sequence: str, query: str, distFunc: Callable = levenshtein.distance,
+                  k: int = 10, max_distance: float = None, processes: int = None) -> List[Tuple]:
+    '''
+    scan split over processes, each chunk overlaps the next by one window
+    so no window is lost at the seams. distFunc must be picklable
+    '''
+    processes = processes or os.cpu_count() or 1
+    windows = len(sequence) - len(query) + 1
+    if processes < 2 or windows < processes * 1000:
+        return scan(sequence, query, distFunc, k, max_distance)
+    step = -(-windows // processes)
+    chunks = [(sequence[start:start + step + len(query) - 1], query, distFunc, k, max_distance, start)
+              for start in range(0, windows, step)]
+    with mp.Pool(processes) as pool:
+        results = pool.map(_scan_chunk, chunks)
+    return sorted(hit for hits in results for hit in hits)[:k]
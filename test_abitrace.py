@@ -0,0 +1,89 @@
+import struct
+
+from Bio import SeqIO
+import numpy as np
+
+import abitrace
+
+
+def write_abif(path, channels, calls, peaks, quality, sample='plate1_A01'):
+    # a minimal ABIF file: header, data blocks, then the directory
+    tags = [(('DATA', 9 + i), 4, 2, np.asarray(channel, dtype='>i2').tobytes())
+            for i, channel in enumerate(channels)]
+    tags += [
+        (('PBAS', 2), 2, 1, calls.encode()),
+        (('PLOC', 2), 4, 2, np.asarray(peaks, dtype='>i2').tobytes()),
+        (('PCON', 2), 2, 1, bytes(quality)),
+        (('FWO_', 1), 2, 1, b'GATC'),
+        (('SMPL', 1), 18, 1, bytes([len(sample)]) + sample.encode()),
+    ]
+    body, entries = b'', []
+    offset = 128
+    for (name, number), etype, esize, data in tags:
+        if len(data) <= 4:
+            field = struct.unpack('>i', data.ljust(4, b'\0'))[0]
+        else:
+            field = offset + len(body)
+            body += data
+        entries.append(abitrace.ENTRY.pack(name.encode(), number, etype, esize,
+                                           len(data) // esize, len(data), field, 0))
+    directory = offset + len(body)
+    root = abitrace.ENTRY.pack(b'tdir', 1, 1023, 28, len(entries), 28 * len(entries), directory, 0)
+    header = (b'ABIF' + struct.pack('>H', 101) + root).ljust(offset, b'\0')
+    path.write_bytes(header + body + b''.join(entries))
+
+
+def make_trace(tmp_path, samples=5000, bases=400):
+    rng = np.random.default_rng(1)
+    channels = rng.integers(0, 2000, size=(4, samples))
+    calls = ''.join(rng.choice(list('ACGT'), bases))
+    peaks = np.linspace(10, samples - 10, bases).astype(int)
+    quality = rng.integers(0, 60, size=bases).tolist()
+    path = tmp_path / 'A01.ab1'
+    write_abif(path, channels, calls, peaks, quality)
+    return path, channels, calls, peaks, quality
+
+
+def test_read_matches_biopython(tmp_path):
+    path, channels, calls, peaks, quality = make_trace(tmp_path)
+    trace = abitrace.read(path)
+    assert trace.channels.dtype == np.int16
+    assert (trace.channels == channels).all()
+    assert trace.calls == calls and trace.order == 'GATC' and trace.name == 'plate1_A01'
+    assert (trace.peaks == peaks).all() and trace.quality.tolist() == quality
+    record = SeqIO.read(path, 'abi')
+    assert str(record.seq) == trace.calls
+    assert record.letter_annotations['phred_quality'] == trace.quality.tolist()
+    assert list(record.annotations['abif_raw']['DATA9']) == trace.channels[0].tolist()
+
+def test_minmax_keeps_extremes(tmp_path):
+    trace = abitrace.read(make_trace(tmp_path)[0])
+    x, ys = trace.decimate(width=100)
+    assert ys.shape == (4, 200) and x.shape == (200,)
+    assert (ys.max(axis=1) == trace.channels.max(axis=1)).all()
+    assert (ys.min(axis=1) == trace.channels.min(axis=1)).all()
+    # a zoomed region inside the budget is the raw samples
+    x, ys = trace.decimate(1000, 1100, width=100)
+    assert (x == np.arange(1000, 1100)).all() and (ys == trace.region(1000, 1100)).all()
+
+def test_minmax_follows_the_edge():
+    # rising then falling buckets keep their extremes in sample order
+    values = np.array([[0, 5, 9, 1, 8, 3, 2, 0]])
+    x, ys = abitrace.minmax(values, 2)
+    assert x.tolist() == [0, 0, 4, 4]
+    assert ys.tolist() == [[0, 9, 8, 0]]
+
+def test_lttb():
+    y = np.sin(np.linspace(0, 20, 10000))
+    picks = abitrace.lttb(y, 500)
+    assert len(picks) == 500 and picks[0] == 0 and picks[-1] == 9999
+    assert (np.diff(picks) > 0).all()
+    assert y[picks].max() > 0.99 and y[picks].min() < -0.99
+
+def test_bases_in(tmp_path):
+    path, channels, calls, peaks, quality = make_trace(tmp_path)
+    trace = abitrace.read(path)
+    positions, called, scores = trace.bases_in(1000, 2000)
+    inside = (peaks >= 1000) & (peaks < 2000)
+    assert (positions == peaks[inside]).all()
+    assert called == ''.join(np.array(list(calls))[inside])
@@ -0,0 +1,55 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import batch
+
+FASTA = '>a\nACGTACGTTTGA\n>b\nGGGCCCAAATTT\n'
+
+
+def test_find_inputs(tmp_path):
+    (tmp_path / 'one.v2.fasta').write_text(FASTA)
+    (tmp_path / 'two.gb').write_text('')
+    (tmp_path / 'notes.txt').write_text('not a sequence')
+    found = batch.find_inputs([str(tmp_path), str(tmp_path / '*.fasta'), str(tmp_path / '..' / tmp_path.name / 'two.gb')])
+    # files named by overlapping inputs are listed once
+    assert [os.path.basename(path) for path in found] == ['one.v2.fasta', 'two.gb']
+
+def test_run_writes_one_row_per_record(tmp_path):
+    (tmp_path / 'one.fasta').write_text(FASTA)
+    out = io.StringIO()
+    written = batch.run([str(tmp_path)], out, k=2, top=3, reference=str(tmp_path / 'one.fasta'),
+                        processes=1)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert written == len(rows) == 2
+    assert rows[0]['record'] == 'a'
+    assert rows[0]['kmers'] == {'AC': 2, 'CG': 2, 'GT': 2}
+    assert rows[0]['peptide'] == {'T': 1, 'V': 1, 'Y': 1, '*': 1}
+    assert max(rows[1]['similarity'], key=rows[1]['similarity'].get) == 'b'
+
+def test_table_and_peptide_files(tmp_path):
+    (tmp_path / 'one.fasta').write_text('>a\nTGAATA\n')
+    (tmp_path / 'prot.faa').write_text('>p\nMKKW\n')
+    out = io.StringIO()
+    batch.run([str(tmp_path)], out, processes=1, table='Vertebrate Mitochondrial')
+    rows = {row['record']: row for row in map(json.loads, out.getvalue().splitlines())}
+    # TGA is W and ATA is M in the vertebrate mitochondrial code
+    assert rows['a']['peptide'] == {'M': 1, 'W': 1}
+    assert rows['p']['peptide'] == {'K': 2, 'M': 1, 'W': 1}
+    assert rows['p']['gc'] is None and 'error' not in rows['p']
+
+def test_tsv_rows_and_errors(tmp_path):
+    (tmp_path / 'bad.gb').write_text('this is not genbank')
+    out = io.StringIO()
+    batch.run([str(tmp_path)], out, fmt='tsv', processes=1)
+    header, row = out.getvalue().splitlines()
+    assert header.split('\t') == batch.TSV_COLUMNS
+    assert row.split('\t')[batch.TSV_COLUMNS.index('error')]
+
+def test_batch_never_imports_matplotlib():
+    code = 'import sys, batch; print("matplotlib" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)})
+    assert result.stdout.strip() == 'False'
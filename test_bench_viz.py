@@ -0,0 +1,32 @@
+from Bio import PDB
+
+import bench_viz
+
+
+def test_random_genome_is_seeded():
+    genome = bench_viz.random_genome(1000)
+    assert len(genome) == 1000 and set(genome) == set('ACGT')
+    assert genome == bench_viz.random_genome(1000)
+    assert genome != bench_viz.random_genome(1000, seed=1)
+    rich = bench_viz.random_genome(10000, gc=0.8)
+    assert 0.75 < (rich.count('G') + rich.count('C')) / len(rich) < 0.85
+    other = bench_viz.mutate(genome)
+    assert len(other) == 1000 and 0 < sum(a != b for a, b in zip(genome, other)) < 100
+
+def test_random_pdb_parses(tmp_path):
+    path = tmp_path / 'walk.pdb'
+    path.write_text(bench_viz.random_pdb(50))
+    structure = PDB.PDBParser(QUIET=True).get_structure('walk', str(path))
+    assert len(list(structure.get_residues())) == 50
+    assert len(list(structure.get_atoms())) == 200
+    ca = [residue['CA'] for residue in structure.get_residues()]
+    assert abs((ca[1] - ca[0]) - 3.8) < 0.01
+
+def test_run_and_compare(tmp_path):
+    results = bench_viz.run(['ngram_counts', 'create_distance_matrix'], max_size=100, repeat=1)
+    assert set(results) == {'create_distance_matrix'}
+    assert set(results['create_distance_matrix']['100']) == {'seconds', 'runs', 'peak_bytes'}
+    assert bench_viz.compare(results, {'results': results}) == []
+    faster = {'create_distance_matrix': {'100': {'seconds': 1e-4, 'peak_bytes': 1}}}
+    regressions = bench_viz.compare(results, {'results': faster})
+    assert len(regressions) == 2 and all(line.startswith('create_distance_matrix 100') for line in regressions)
@@ -0,0 +1,50 @@
+from collections import Counter
+import random
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+import numpy as np
+
+import codonusage
+
+GENBANK = 'src/main/resources/base/data/NC_005816.gb'
+
+
+def naive_frames(sequence):
+    # codons of every frame by slicing, reverse frames on the reverse complement
+    strands = (sequence, str(Seq(sequence).reverse_complement()))
+    return [Counter(strand[i:i + 3] for i in range(frame, len(strand) - 2, 3))
+            for strand in strands for frame in range(3)]
+
+def test_frame_counts_match_slicing():
+    rng = random.Random(2)
+    sequence = ''.join(rng.choice('ACGT') for _ in range(1000)) + 'NNACGT'
+    counts = codonusage.frame_counts(sequence)
+    for row, expected in zip(counts, naive_frames(sequence)):
+        assert {codon: int(row[i]) for i, codon in enumerate(codonusage.CODONS) if row[i]} == \
+            {codon: n for codon, n in expected.items() if 'N' not in codon}
+
+def test_cds_counts_and_rscu():
+    record = SeqIO.read(GENBANK, 'genbank')
+    usage = codonusage.CodonUsage(cds=True).add(record)
+    expected = Counter()
+    for feature in record.features:
+        if feature.type == 'CDS':
+            cds = str(feature.extract(record.seq))
+            expected.update(cds[i:i + 3] for i in range(0, len(cds) - 2, 3))
+    assert {codon: int(n) for codon, n in zip(codonusage.CODONS, usage.counts[0]) if n} == dict(expected)
+    assert np.isclose(usage.frequencies().sum(), 1)
+    # RSCU of each amino acid's codons averages to 1 when the amino acid is used
+    rscu = usage.rscu()[0]
+    for codes in codonusage.synonymous_codons().values():
+        if usage.counts[0, codes].sum():
+            assert np.isclose(rscu[codes].mean(), 1)
+
+def test_merge_files(tmp_path):
+    path = tmp_path / 'two.fasta'
+    path.write_text('>a\nACGTACGTAC\n>b\nGGGCCCAAT\n')
+    usage = codonusage.usage_of_files([str(path), str(path)], processes=1)
+    assert usage.records == 4
+    assert (usage.counts == 2 * (codonusage.frame_counts('ACGTACGTAC')
+                                 + codonusage.frame_counts('GGGCCCAAT'))).all()
+    assert len(usage.table()) == 6 * 64
@@ -0,0 +1,41 @@
+import pickle
+
+from Bio.Data import CodonTable
+from Bio.Seq import Seq
+import numpy as np
+import pytest
+
+import encoding
+import geneticcode
+
+
+# biopython warns about the codes whose stops double as amino acids
+@pytest.mark.filterwarnings('ignore::Bio.BiopythonWarning')
+def test_registry_matches_biopython():
+    codes = geneticcode.registry()
+    assert sorted(codes) == sorted(CodonTable.unambiguous_dna_by_id)
+    assert geneticcode.registry() is codes
+    for code in codes.values():
+        for codon in (a + b + c for a in 'ACGT' for b in 'ACGT' for c in 'ACGT'):
+            expected = str(Seq(codon).translate(table=code.id))
+            assert chr(code.forward[encoding.codon_index(codon)]) == expected
+            assert codon in code.reverse[expected]
+        assert set(code.reverse['*']) == set(code.stop_codons)
+        assert chr(code.forward[encoding.INVALID_CODON]) == 'X'
+
+def test_get_by_id_or_name():
+    assert geneticcode.get(2) is geneticcode.get('2') is geneticcode.get('vertebrate mitochondrial')
+    assert geneticcode.get('Bacterial').id == 11
+    assert geneticcode.get(geneticcode.get(4)).id == 4
+    assert (1, 'Standard') in geneticcode.choices()
+    with pytest.raises(ValueError):
+        geneticcode.get(7)
+    with pytest.raises(ValueError):
+        geneticcode.get('Martian')
+
+def test_tables_are_shared_read_only():
+    code = geneticcode.get(1)
+    with pytest.raises(ValueError):
+        code.forward[0] = 0
+    copy = pickle.loads(pickle.dumps(code))
+    assert copy.id == 1 and np.array_equal(copy.forward, code.forward)
@@ -0,0 +1,41 @@
+import random
+
+import iupac
+import temp_backtranslate
+
+COMPLEMENT = str.maketrans('ACGT', 'TGCA')
+
+
+def brute_force(genome, concrete, max_mismatches):
+    # expand every concrete sequence and compare base by base
+    hits = set()
+    for strand, options in ((1, concrete), (-1, [c.translate(COMPLEMENT)[::-1] for c in concrete])):
+        span = len(options[0])
+        for start in range(len(genome) - span + 1):
+            window = genome[start:start + span]
+            best = min(sum(a != b for a, b in zip(window, option)) for option in options)
+            if best <= max_mismatches:
+                hits.add((start, start + span, strand, best))
+    return sorted(hits)
+
+def test_degenerate_primer_matches_expansion():
+    rng = random.Random(3)
+    genome = ''.join(rng.choice('ACGT') for _ in range(600))
+    primer = 'ACNRYG'
+    concrete = temp_backtranslate.disambiguate(primer)
+    for k in (0, 1, 2):
+        assert iupac.find(genome, primer, k) == brute_force(genome, concrete, k)
+
+def test_codon_alternatives():
+    rng = random.Random(5)
+    genome = ''.join(rng.choice('ACGT') for _ in range(900))
+    protein = 'LSR'
+    pattern = iupac.codon_pattern(protein, temp_backtranslate.ambiguous_codon_table)
+    concrete = temp_backtranslate.backtranslate(protein)
+    assert iupac.find(genome, pattern, 0) == brute_force(genome, concrete, 0)
+    assert iupac.find(genome, pattern, 1) == brute_force(genome, concrete, 1)
+
+def test_reverse_strand_and_lowercase():
+    genome = 'tttt' + 'CATGCC' + 'gggg'
+    assert iupac.find(genome, 'GGCATG') == [(4, 10, -1, 0)]
+    assert iupac.find(genome, 'GGCATG', both_strands=False) == []
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import jobs
+import viz
+
+
+def test_progress_reports_until_cancelled():
+    seen = []
+    progress = jobs.Progress(lambda done, total: seen.append((done, total)))
+    progress(1, 3)
+    progress.cancel()
+    with pytest.raises(jobs.JobCancelled):
+        progress(2, 3)
+    assert seen == [(1, 3)]
+
+def test_call_with_progress():
+    progress = jobs.Progress()
+    assert jobs.call_with_progress(lambda: 1, progress) == 1
+    assert jobs.call_with_progress(lambda progress: progress is not None, progress)
+
+    def cancelled_midway(progress):
+        progress.cancel()
+        return 'discarded'
+    with pytest.raises(jobs.JobCancelled):
+        jobs.call_with_progress(cancelled_midway, jobs.Progress())
+
+def test_heatMatrix_progress_is_cancellable():
+    viz.cache.enabled = False
+    try:
+        ngrams = viz.make_ngrams(4, 'ACGTTGCAAGCTTAGC' * 4)
+        seen = []
+        viz.heatMatrix(ngrams, viz.lev_distance, processes=1,
+                       progress=jobs.Progress(lambda done, total: seen.append(done)))
+        assert seen == list(range(1, len(ngrams) + 1))
+
+        progress = jobs.Progress()
+        progress.cancel()
+        with pytest.raises(jobs.JobCancelled):
+            viz.heatMatrix(ngrams, viz.lev_distance, processes=1, progress=progress)
+    finally:
+        viz.cache.enabled = True
+
+def test_run_job_interrupts_code_without_progress():
+    progress = jobs.Progress()
+    started = threading.Event()
+    outcome = []
+
+    def busy():
+        started.set()
+        while True:
+            pass
+
+    def worker():
+        try:
+            jobs.run_job(busy, progress)
+        except jobs.JobCancelled:
+            outcome.append('cancelled')
+        # nothing is left pending for whatever the thread runs next
+        total = sum(range(100000))
+        outcome.append(total)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait(5)
+    progress.cancel()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert outcome == ['cancelled', sum(range(100000))]
+    assert jobs.run_job(lambda: 3, jobs.Progress()) == 3
@@ -0,0 +1,24 @@
+from collections import Counter
+import random
+
+import kmers
+
+
+def test_alphabets():
+    assert kmers.encode('ACGT').bits == 2
+    assert kmers.encode('MKW*').bits == 5
+    assert kmers.encode('acgtn').alphabet == 'acgnt'
+
+def test_counts_match_counter():
+    rand = random.Random(0)
+    for alphabet in ('ACGT', 'ACDEFGHIKLMNPQRSTVWY*', 'acgtN-'):
+        sequence = ''.join(rand.choice(alphabet) for _ in range(2000))
+        for k in (1, 3, 7):
+            expected = Counter(sequence[i:i + k] for i in range(len(sequence) - k + 1))
+            assert kmers.counts(sequence, k) == dict(expected)
+            top = kmers.top_k(sequence, k, 10)
+            assert [count for _, count in top] == [count for _, count in expected.most_common(10)]
+
+def test_long_kmers_fall_back():
+    assert kmers.counts('A' * 40, 33) == {'A' * 33: 8}
+    assert kmers.top_k('ACGT', 5) == []
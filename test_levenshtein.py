@@ -0,0 +1,23 @@
+import random
+
+import levenshtein
+
+
+def test_distance_known_values():
+    assert levenshtein.distance('kitten', 'sitting') == 3
+    assert levenshtein.distance('', 'ACGT') == 4
+    assert levenshtein.distance('ACGT', '') == 4
+    assert levenshtein.distance('', '') == 0
+
+def test_distance_matches_full_matrix():
+    rand = random.Random(0)
+    for _ in range(200):
+        str1 = ''.join(rand.choice('ACGT') for _ in range(rand.randint(0, 150)))
+        str2 = ''.join(rand.choice('ACGT') for _ in range(rand.randint(0, 150)))
+        full = levenshtein.matrix(str1, str2)
+        assert levenshtein.distance(str1, str2) == full[-1, -1]
+
+def test_distances_batch():
+    targets = ['ACGT', 'AGGT', 'TTTT', '']
+    batch = levenshtein.distances('ACGT', targets)
+    assert list(batch) == [levenshtein.distance('ACGT', t) for t in targets]
@@ -0,0 +1,69 @@
+from Bio.Seq import Seq
+import numpy as np
+import pytest
+
+import bench_viz
+import minhash
+
+
+def exact_jaccard(a, b, k=minhash.K):
+    x, y = (set(minhash.canonical_codes(s, k).tolist()) for s in (a, b))
+    return len(x & y) / len(x | y)
+
+def test_canonical_codes():
+    sequence = bench_viz.random_genome(500)
+    codes = minhash.canonical_codes(sequence, 5)
+    value = lambda kmer: int(''.join(str('ACGT'.index(base)) for base in kmer), 4)
+    expected = [min(value(sequence[i:i + 5]), value(str(Seq(sequence[i:i + 5]).reverse_complement())))
+                for i in range(len(sequence) - 4)]
+    assert codes.tolist() == expected
+    reverse = minhash.canonical_codes(str(Seq(sequence).reverse_complement()), 5)
+    assert sorted(reverse.tolist()) == sorted(expected)
+    # windows over the N are dropped
+    assert len(minhash.canonical_codes('ACGTNACGTA', 3)) == 5
+    with pytest.raises(ValueError):
+        minhash.canonical_codes(sequence, 33)
+
+def test_bottom():
+    hashes = np.random.default_rng(0).integers(0, 1000, 50000).astype(np.uint64)
+    assert minhash.bottom(hashes, 10).tolist() == list(range(10))
+    assert minhash.bottom(np.array([5, 5, 3], dtype=np.uint64), 10).tolist() == [3, 5]
+
+def test_chunks_sketch_the_same(monkeypatch):
+    sequence = bench_viz.random_genome(20000, seed=3)
+    whole = minhash.sketch('a', sequence, size=5000)
+    monkeypatch.setattr(minhash, 'CHUNK', 1000)
+    assert len(list(minhash._chunks(sequence, minhash.K))) > 1
+    assert minhash.sketch('a', sequence, size=5000).hashes.tolist() == whole.hashes.tolist()
+
+def test_jaccard_estimates():
+    a = bench_viz.random_genome(100000, seed=1)
+    b = bench_viz.mutate(a, 0.01)
+    c = a[:50000] + bench_viz.random_genome(50000, seed=2)
+    sketches = [minhash.sketch(name, sequence) for name, sequence in
+                (('a', a), ('b', b), ('c', c), ('rc', str(Seq(a).reverse_complement())))]
+    jaccard = minhash.jaccard_matrix(sketches)
+    assert np.allclose(jaccard, jaccard.T) and (np.diag(jaccard) == 1).all()
+    assert jaccard[0, 3] == 1
+    assert abs(jaccard[0, 1] - exact_jaccard(a, b)) < 0.05
+    assert abs(jaccard[0, 2] - exact_jaccard(a, c)) < 0.05
+    distance = minhash.distance_matrix(sketches)
+    assert distance[0, 3] == 0 and distance[0, 1] < distance[0, 2] < 1
+    assert minhash.mash_distance(0.0) == 1
+
+def test_sketch_files_are_stored(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'g{i}.fasta'
+        records = ''.join(f'>r{i}{j}\n{bench_viz.random_genome(2000, seed=10 * i + j)}\n' for j in range(2))
+        path.write_text(records)
+        paths.append(str(path))
+    sketches = minhash.sketch_files(paths, k=11, size=100, processes=1)
+    assert [s.name for s in sketches] == ['g0.fasta', 'g1.fasta', 'g2.fasta']
+    assert all(minhash.sketch_path(path).exists() for path in paths)
+    again = minhash.sketch_file(paths[0], k=11, size=100)
+    assert np.array_equal(again[0].hashes, sketches[0].hashes)
+    records = minhash.sketch_file(paths[0], k=11, size=100, individual=True)
+    assert [s.name for s in records] == ['r00', 'r01']
+    whole = minhash.sketch('both', [bench_viz.random_genome(2000, seed=0), bench_viz.random_genome(2000, seed=1)], 11, 100)
+    assert np.array_equal(whole.hashes, sketches[0].hashes)
@@ -0,0 +1,26 @@
+import numpy as np
+
+import pairwise
+
+GRAMS = ['ACGT', 'ACGA', 'TTGA', 'TTTT', 'AGGT', 'ACCT']
+
+
+def test_condensed_order():
+    condensed = pairwise.condensed_matrix(GRAMS, 'hamming', processes=1)
+    assert len(condensed) == pairwise.condensed_size(len(GRAMS))
+    for i in range(len(GRAMS)):
+        for j in range(i + 1, len(GRAMS)):
+            expected = sum(a != b for a, b in zip(GRAMS[i], GRAMS[j]))
+            assert condensed[pairwise.condensed_index(len(GRAMS), i, j)] == expected
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(pairwise, 'PARALLEL_MIN_PAIRS', 0)
+    serial = pairwise.condensed_matrix(GRAMS, 'levenshtein', processes=1)
+    parallel = pairwise.condensed_matrix(GRAMS, 'levenshtein', processes=2)
+    assert np.array_equal(serial, parallel)
+
+def test_squareform_symmetric():
+    square = pairwise.squareform(pairwise.condensed_matrix(GRAMS, processes=1))
+    assert square.shape == (6, 6)
+    assert np.array_equal(square, square.T)
+    assert not square.diagonal().any()
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import profiling
+import viz
+
+
+def collect():
+    records = []
+    profiling.add_listener(records.append)
+    return records
+
+def test_stages_nest_into_an_entry():
+    records = collect()
+    try:
+        with profiling.entry('button'):
+            with profiling.stage('compute', 'outer'):
+                with profiling.stage('parse', 'inner'):
+                    sum(range(100000))
+            # a nested entry joins the outer one
+            with profiling.entry('viz function'):
+                with profiling.stage('render'):
+                    pass
+    finally:
+        profiling.remove_listener(records.append)
+    inner, outer, render, summary = records
+    assert [r['name'] for r in (inner, outer, render)] == ['inner', 'outer', 'render']
+    assert all(r['entry'] == 'button' and r['entry_id'] == summary['entry_id'] for r in (inner, outer, render))
+    assert (inner['depth'], outer['depth']) == (2, 1)
+    assert abs(outer['self_wall'] - (outer['wall'] - inner['wall'])) < 1e-9
+    assert summary['type'] == 'entry' and set(summary['stages']) == {'parse', 'compute', 'render'}
+    assert summary['stages']['parse']['wall'] == inner['self_wall']
+    assert summary['wall'] >= outer['wall'] and summary['rss'] > 0
+    assert summary['process_peak_rss'] >= summary['rss']
+
+def test_rss_growth_is_per_stage():
+    records = []
+    profiling.add_listener(records.append)
+    try:
+        with profiling.stage('compute', 'big'):
+            big = np.ones(80 << 20, dtype=np.uint8)
+        with profiling.stage('compute', 'small'):
+            small = np.ones(1000)
+    finally:
+        profiling.remove_listener(records.append)
+    assert big.sum() and small.sum()
+    first, second = records
+    # the lifetime peak would report the same for both
+    assert first['rss_growth'] > 60 << 20
+    assert second['rss_growth'] < 10 << 20
+
+def test_peak_counts_memory_freed_inside_the_stage():
+    records = []
+    profiling.add_listener(records.append)
+    try:
+        with profiling.stage('compute', 'transient'):
+            temporary = np.ones(80 << 20, dtype=np.uint8)
+            time.sleep(5 * profiling.SAMPLE_INTERVAL)
+            del temporary
+    finally:
+        profiling.remove_listener(records.append)
+    record, = records
+    assert record['rss_growth'] < 10 << 20
+    assert record['peak_growth'] > 60 << 20
+    assert record['peak_rss'] >= record['rss']
+
+def test_unknown_stage():
+    with pytest.raises(ValueError):
+        with profiling.stage('drawing'):
+            pass
+
+def test_threads_keep_their_own_entries():
+    records = collect()
+    def work(name):
+        with profiling.entry(name):
+            with profiling.stage('compute', name):
+                pass
+    try:
+        threads = [threading.Thread(target=work, args=(f'job{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        profiling.remove_listener(records.append)
+    assert all(r['entry'] == r['name'] for r in records if r['type'] == 'stage')
+    assert len([r for r in records if r['type'] == 'entry']) == 4
+
+def test_viz_entry_points_log(tmp_path):
+    log = tmp_path / 'profile.jsonl'
+    fsfile = tmp_path / 'genome.fasta'
+    fsfile.write_text('>g\nACGTTGCAACGTAACGT\n')
+    profiling.configure(log=str(log))
+    try:
+        viz.calcDist(viz.lev_distance, 'ACGT', str(fsfile), k=3)
+    finally:
+        profiling.configure(log=None)
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert records[-1]['type'] == 'entry' and records[-1]['entry'] == 'calcDist'
+    assert 'compute' in records[-1]['stages']
+
+def test_profile_writes_stats(tmp_path):
+    path = tmp_path / 'run.prof'
+    assert profiling.profile(sorted, str(path), [3, 1, 2]) == [1, 2, 3]
+    assert path.stat().st_size > 0
+    assert 'function calls' in (tmp_path / 'run.txt').read_text()
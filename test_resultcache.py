@@ -0,0 +1,119 @@
+import resultcache
+
+
+def test_cached_function_reuses_result(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache')
+    calls = []
+
+    @cache.cached('path')
+    def count_lines(path, extra=0):
+        calls.append(path)
+        return len(open(path).readlines()) + extra
+
+    data = tmp_path / 'seq.fasta'
+    data.write_text('>a\nACGT\n')
+    assert count_lines(str(data)) == 2
+    assert count_lines(str(data)) == 2
+    assert len(calls) == 1
+    assert count_lines(str(data), extra=1) == 3
+    assert len(calls) == 2
+
+    # a fresh cache over the same directory is served from disk
+    again = resultcache.ResultCache(tmp_path / 'cache')
+    key = again.make_key(count_lines.cache_name, (str(data), 0), {}, [str(data)])
+    assert again.get(key) == 2
+
+def test_version_is_part_of_the_key(tmp_path, monkeypatch):
+    cache = resultcache.ResultCache(tmp_path / 'cache')
+    calls = []
+
+    @cache.cached()
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    monkeypatch.setattr(resultcache, 'VERSION', resultcache.VERSION + 1)
+    assert square(3) == 9
+    assert calls == [3, 3]
+
+def test_changed_file_invalidates(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache')
+
+    @cache.cached('path')
+    def read(path):
+        return open(path).read()
+
+    data = tmp_path / 'seq.fasta'
+    data.write_text('>a\nACGT\n')
+    assert read(str(data)) == '>a\nACGT\n'
+    stale = list((tmp_path / 'cache').glob('*.pkl'))
+    data.write_text('>a\nTTTTTT\n')
+    assert read(str(data)) == '>a\nTTTTTT\n'
+    assert not any(path.exists() for path in stale)
+
+def test_size_based_eviction(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache', memory_bytes=3000, disk_bytes=8000)
+    for i in range(20):
+        cache.set(f'nofile_{i}', b'x' * 1000)
+    assert cache.memory_size <= 3000
+    assert cache.disk_size() <= 8000
+    assert cache.get('nofile_19') == b'x' * 1000
+    assert cache.get('nofile_0', None) is None
+
+def test_progress_is_not_part_of_the_key(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache')
+    calls = []
+
+    @cache.cached()
+    def square(x, progress=None):
+        calls.append(x)
+        return x * x
+
+    assert square(3, progress=lambda done, total: None) == 9
+    assert square(3) == 9
+    assert calls == [3]
+
+def test_lambdas_and_closures_are_not_cached(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache')
+
+    @cache.cached()
+    def apply(func, x):
+        return func(x)
+
+    def scale(factor):
+        return lambda x: x * factor
+
+    assert apply(lambda x: 0.0, 1) == 0.0
+    assert apply(lambda x: 99.0, 1) == 99.0
+    assert apply(scale(1.0), 2) == 2.0
+    assert apply(scale(7.0), 2) == 14.0
+    # nor is anything keyed only by its address
+    assert apply(id, object()) > 0
+    assert not list((tmp_path / 'cache').glob('*.pkl'))
+    # module level functions still are
+    assert apply(abs, -3) == 3
+    assert len(list((tmp_path / 'cache').glob('*.pkl'))) == 1
+
+def test_keep_skips_partial_results(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache')
+    results = [{'slow': None}, {'slow': 1.0}, {'slow': 2.0}]
+
+    @cache.cached(keep=lambda scores: None not in scores.values())
+    def scores():
+        return results.pop(0)
+
+    assert scores() == {'slow': None}
+    assert scores() == {'slow': 1.0}
+    assert scores() == {'slow': 1.0}
+
+def test_entries_removed_by_another_process(tmp_path):
+    cache = resultcache.ResultCache(tmp_path / 'cache', disk_bytes=3000)
+    cache.set('nofile_a', b'x' * 1000)
+    other = resultcache.ResultCache(tmp_path / 'cache')
+    other.clear()
+    cache.memory.clear()
+    assert cache.get('nofile_a', None) is None
+    for i in range(5):
+        cache.set(f'nofile_{i}', b'x' * 1000)
+    assert cache.disk_size() <= 3000
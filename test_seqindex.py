@@ -0,0 +1,69 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+import seqindex
+
+GENBANK = Path(__file__).parent / 'src/main/resources/base/data/NC_005816.gb'
+FASTA = '''>chr1 first
+ACGTACGTAC
+GTACGTAC
+>chr2
+TTTTGGGGCC
+CCAAAAATTT
+TT
+>empty
+'''
+
+
+def test_detect_format():
+    assert seqindex.detect_format('foo.v2.fasta') == 'fasta'
+    assert seqindex.detect_format('plasmid.GBK') == 'genbank'
+    with pytest.raises(ValueError):
+        seqindex.detect_format('notes.txt')
+    assert seqindex.is_peptide('proteome.FAA')
+    assert not seqindex.is_peptide('genome.fasta')
+
+def test_fasta_random_access(tmp_path):
+    path = tmp_path / 'refs.v2.fasta'
+    path.write_text(FASTA)
+    index = seqindex.SequenceIndex(path)
+    assert index.ids() == ['chr1', 'chr2', 'empty']
+    assert (tmp_path / 'refs.v2.fasta.fai').exists()
+    assert index.fetch('chr1') == 'ACGTACGTACGTACGTAC'
+    assert index.fetch('chr2', 8, 23) == 'CCCCAAAAATTTTT'
+    assert index.fetch('chr2', 9, 12) == 'CCC'
+    assert index.fetch('empty') == ''
+    # a second index loads the persisted .fai
+    assert seqindex.SequenceIndex(path).entries == index.entries
+
+def test_uneven_fasta_is_rejected(tmp_path):
+    path = tmp_path / 'bad.fasta'
+    path.write_text('>a\nACG\nACGT\n')
+    with pytest.raises(ValueError):
+        seqindex.SequenceIndex(path)
+
+def test_blank_lines_and_duplicate_ids(tmp_path):
+    path = tmp_path / 'gap.fasta'
+    path.write_text('>a\nACGT\n\nACGT\n')
+    with pytest.raises(ValueError):
+        seqindex.SequenceIndex(path)
+    path = tmp_path / 'twice.fasta'
+    path.write_text('>a\nACGT\n>a\nTTTT\n')
+    with pytest.raises(ValueError):
+        seqindex.SequenceIndex(path)
+    # blank lines between records shift nothing
+    path = tmp_path / 'spaced.fasta'
+    path.write_text('>a\nACGT\nAC\n\n>b\nGGTT\n\n')
+    index = seqindex.SequenceIndex(path)
+    assert (index.fetch('a'), index.fetch('b')) == ('ACGTAC', 'GGTT')
+
+def test_genbank_record(tmp_path):
+    path = tmp_path / 'NC_005816.gb'
+    shutil.copy(GENBANK, path)
+    index = seqindex.SequenceIndex(path)
+    assert index.ids() == ['NC_005816.1']
+    record = index.record('NC_005816.1')
+    assert len(record.seq) == 9609
+    assert index.fetch('NC_005816.1', 0, 10) == str(record.seq[:10])
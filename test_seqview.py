@@ -0,0 +1,53 @@
+from Bio import SeqIO
+
+import seqview
+
+GENBANK = 'src/main/resources/base/data/NC_005816.gb'
+
+
+def test_genbank_coordinates_match_sequence():
+    lines = seqview.LineIndex(GENBANK)
+    record = SeqIO.read(GENBANK, 'genbank')
+    numbered = [i for i in range(len(lines)) if lines.coordinate(i)]
+    assert numbered
+    for i in numbered:
+        residues = ''.join(c for c in lines.line(i) if c.isalpha())
+        start = lines.coordinate(i) - 1
+        assert residues == str(record.seq[start:start + len(residues)]).lower()
+    lines.close()
+
+def test_genbank_features_jump_to_sequence():
+    lines = seqview.LineIndex(GENBANK)
+    record = SeqIO.read(GENBANK, 'genbank')
+    assert [f.key for f in lines.features] == [f.type for f in record.features]
+    cds = [f for f in lines.features if f.key == 'CDS'][1]
+    start = int(cds.location.split('..')[0])
+    line = lines.sequence_line(cds)
+    assert lines.coordinate(line) <= start < lines.coordinate(line + 1)
+    lines.close()
+
+def test_fasta_records(tmp_path):
+    path = tmp_path / 'two.fasta'
+    path.write_text('>a first\nACGT\nAC\n>b\nGGGG\r\nTT')
+    lines = seqview.LineIndex(str(path))
+    assert len(lines) == 6
+    assert [lines.coordinate(i) for i in range(6)] == [0, 1, 5, 0, 1, 5]
+    assert lines.line(4) == 'GGGG'
+    assert [(f.location, f.record) for f in lines.features] == [('a first', 0), ('b', 1)]
+    assert lines.sequence_line(lines.features[1]) == 4
+    assert [lines.record(i) for i in range(6)] == [0, 0, 0, 1, 1, 1]
+    # a small file keeps 4 byte starts and coordinates
+    assert lines.starts.itemsize == lines.coordinates.itemsize == 4
+    assert lines.ends.tolist() == [8, 13, 16, 19, 25, 28]
+    lines.close()
+
+def test_chunked_scan_matches_whole_file(monkeypatch):
+    whole = seqview.LineIndex(GENBANK)
+    # chunks that split lines anywhere, even mid line ending
+    monkeypatch.setattr(seqview, 'CHUNK', 37)
+    chunked = seqview.LineIndex(GENBANK)
+    assert chunked.ends.tolist() == whole.ends.tolist()
+    assert chunked.coordinates.tolist() == whole.coordinates.tolist()
+    assert chunked.features == whole.features
+    whole.close()
+    chunked.close()
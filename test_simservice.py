@@ -0,0 +1,35 @@
+import textdistance as TD
+
+import simservice
+
+
+def test_compare_merges_metrics():
+    metrics = ['hamming', 'levenshtein', 'jaccard']
+    with simservice.SimilarityService(metrics, processes=2, timeout=30) as service:
+        scores = service.compare('ACGTACGT', 'ACGTTCGA')
+        assert scores == {name: TD.__dict__[name]('ACGTACGT', 'ACGTTCGA') for name in metrics}
+        many = service.compare_many([('ACGT', 'ACGA'), ('ACGT', 'ACGT')])
+        assert [scores['hamming'] for scores in many] == [1, 0]
+
+def test_longest_first():
+    assert simservice.by_cost(['hamming', 'lzma_ncd', 'damerau_levenshtein']) == [
+        'damerau_levenshtein', 'lzma_ncd', 'hamming']
+
+def test_metric_timeout():
+    with simservice.SimilarityService(['levenshtein', 'hamming'], processes=1, timeout=0.05) as service:
+        scores = service.compare('A' * 3000, 'C' * 3000)
+    assert scores == {'levenshtein': None, 'hamming': 3000}
+
+def test_worker_keeps_only_the_current_pair():
+    service = simservice.SimilarityService([])
+    blocks = [service._share(seq) for seq in ('ACGT', 'GGCC', 'TTAA')]
+    try:
+        first, second, third = [(block.name, 4) for block in blocks]
+        assert simservice._attach_pair(first, second) == ('ACGT', 'GGCC')
+        assert simservice._attach_pair(first, third) == ('ACGT', 'TTAA')
+        assert set(simservice._decoded) == {first[0], third[0]}
+    finally:
+        simservice._decoded.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,73 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import bench_viz
+import sufarray
+
+
+def brute_positions(sequence, pattern):
+    return [i for i in range(len(sequence)) if sequence.startswith(pattern, i)]
+
+def test_suffix_array():
+    codes = np.frombuffer(b'banana\x00', dtype=np.uint8)
+    sa = sufarray.suffix_array(codes)
+    text = codes.tobytes()
+    assert sa.tolist() == sorted(range(len(text)), key=lambda i: text[i:])
+    lcp = sufarray.lcp_array(codes, sa)
+    assert lcp.tolist() == [0, 1, 3, 0, 0, 2]
+
+def test_count_and_locate():
+    chr1 = bench_viz.random_genome(3000)
+    chr2 = bench_viz.mutate(chr1)
+    index = sufarray.SuffixIndex.build([('chr1', chr1), ('chr2', chr2.lower())])
+    for pattern in (chr1[100:104], chr1[500:520], 'GAATTC', 'A'):
+        expected = brute_positions(chr2, pattern)
+        assert index.locate(pattern.lower(), 'chr2').tolist() == expected
+        assert index.locate(pattern).tolist() == brute_positions(chr1, pattern)
+        assert index.count(pattern) == len(expected) + len(brute_positions(chr1, pattern))
+    # nothing matches across the end of one record into the next
+    assert index.count(chr1[-3:] + chr2[:3].upper()) == 0
+    pattern = chr1[:30]
+    assert index.occurrences(pattern) == [('chr1', i) for i in brute_positions(chr1, pattern)] + \
+        [('chr2', i) for i in brute_positions(chr2, pattern)]
+    assert index.count('') == 0
+    with pytest.raises(KeyError):
+        index.locate('ACGT', 'chr3')
+
+def test_repeats():
+    records = [('a', bench_viz.random_genome(2000, seed=1)), ('b', bench_viz.random_genome(2000, seed=2))]
+    index = sufarray.SuffixIndex.build(records)
+    counts = Counter(s[i:i + 6] for _, s in records for i in range(len(s) - 5))
+    expected = {kmer: count for kmer, count in counts.items() if count >= 3}
+    repeats = index.repeats(6, min_count=3)
+    assert dict(repeats) == expected
+    assert [count for _, count in repeats] == sorted(expected.values(), reverse=True)
+
+def test_longest_common_substring():
+    shared = bench_viz.random_genome(40, seed=3)
+    first = bench_viz.random_genome(500, seed=4) + shared + 'AC'
+    second = 'TT' + shared + bench_viz.random_genome(300, seed=5)
+    substring, i, j = sufarray.longest_common_substring(first, second)
+    assert shared in substring
+    assert first[i:i + len(substring)] == substring == second[j:j + len(substring)]
+    assert sufarray.longest_common_substring('AAAA', 'CCCC') == ('', -1, -1)
+
+def test_open_index(tmp_path):
+    genome = bench_viz.random_genome(5000)
+    path = bench_viz.write_fasta(tmp_path, 'genome', genome)
+    index = sufarray.open_index(path)
+    directory = tmp_path / 'genome.fasta.sufarray'
+    assert (directory / 'records.tsv').exists()
+    assert index.ids() == ['genome']
+    # exact queries never build the lcp, the first repeats call saves it
+    assert index.locate(genome[1234:1260]).tolist() == [1234]
+    assert not (directory / 'lcp.npy').exists()
+    repeats = index.repeats(8)
+    assert (directory / 'lcp.npy').exists()
+    sufarray._open.clear()
+    loaded = sufarray.open_index(path)
+    assert isinstance(loaded.sa, np.memmap) and isinstance(loaded.lcp, np.memmap)
+    assert loaded.locate(genome[1234:1260]).tolist() == [1234]
+    assert loaded.repeats(8) == repeats
@@ -0,0 +1,39 @@
+import doctest
+from collections import Counter
+import random
+
+import pytest
+
+import temp_backtranslate
+
+
+def test_doctests():
+    assert doctest.testmod(temp_backtranslate).failed == 0
+
+def test_matches_backtranslate_order():
+    protein = 'MLRS*'
+    sequences = temp_backtranslate.BackTranslation(protein)
+    expected = temp_backtranslate.backtranslate(protein)
+    assert list(sequences) == expected
+    assert [sequences[i] for i in range(len(sequences))] == expected
+    assert all(sequences.index(sequence) == i for i, sequence in enumerate(expected))
+    assert sequences[-1] == expected[-1]
+    with pytest.raises(IndexError):
+        sequences[len(sequences)]
+
+def test_huge_protein_stays_lazy():
+    sequences = temp_backtranslate.BackTranslation('LRS' * 200)
+    assert sequences.count == 216 ** 200
+    last = sequences[sequences.count - 1]
+    assert last == 'CTGAGGAGC' * 200
+    assert sequences.index(last) == sequences.count - 1
+    assert next(iter(sequences)) == 'TTACGTTCT' * 200
+
+def test_weighted_sample():
+    sequences = temp_backtranslate.BackTranslation('LLLL' * 50)
+    usage = {'CTG': 3, 'TTA': 1}
+    drawn = sequences.sample(5, codon_usage=usage, rng=random.Random(0))
+    codons = Counter(s[i:i + 3] for s in drawn for i in range(0, len(s), 3))
+    assert set(codons) == {'CTG', 'TTA'}
+    assert codons['CTG'] > codons['TTA']
+    assert all(len(s) == 600 for s in sequences.sample(3, rng=random.Random(1)))
@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import tfidfindex
+
+
+def _records(count=12, seed=0):
+    rand = random.Random(seed)
+    return [(f'rec{i}', ''.join(rand.choice('ACGT') for _ in range(rand.randint(40, 300))))
+            for i in range(count)]
+
+def test_matches_sklearn_char_tfidf():
+    records = _records()
+    index = tfidfindex.KmerTfidfIndex(k=4)
+    index.add(records[:5])
+    index.add(records[5:])
+    vectors = TfidfVectorizer(analyzer='char', ngram_range=(4, 4))
+    tfidf = vectors.fit_transform([seq for _, seq in records])
+    assert np.allclose(index.similarity_matrix(), (tfidf * tfidf.T).toarray())
+
+def test_query_and_persistence(tmp_path):
+    records = _records()
+    index = tfidfindex.KmerTfidfIndex(k=3)
+    index.add(records)
+    assert index.query(records[7][1], top=1)[0][0] == 'rec7'
+    index.save(tmp_path / 'corpus')
+    loaded = tfidfindex.KmerTfidfIndex.load(tmp_path / 'corpus')
+    assert loaded.ids == index.ids
+    assert np.allclose(loaded.similarity_matrix(), index.similarity_matrix())
+
+def test_ambiguous_bases_are_skipped():
+    index = tfidfindex.KmerTfidfIndex(k=3)
+    index.add([('a', 'ACGNACG'), ('b', 'acgacg')])
+    assert index.counts[0].sum() == 2
+    assert index.counts[1].sum() == 4
+
+def test_peptides_and_large_k():
+    assert tfidfindex.alphabet_for('acgt', 'GGTA') == 'ACGT'
+    assert tfidfindex.alphabet_for('MKWLLEEPQ') == tfidfindex.kmers.PEPTIDE_ALPHABET
+    index = tfidfindex.KmerTfidfIndex(3, tfidfindex.alphabet_for('MKWLLEEPQ'))
+    index.add([('a', 'MKWLLEEPQ'), ('b', 'MKWLLEEPQ'), ('c', 'GGGSSS')])
+    assert np.allclose(index.similarity_matrix(), [[1, 1, 0], [1, 1, 0], [0, 0, 1]])
+    # df is sparse, k only limits the code space
+    index = tfidfindex.KmerTfidfIndex(k=15)
+    records = _records()
+    index.add(records)
+    assert index.query(records[3][1], top=1)[0][0] == 'rec3'
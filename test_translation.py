@@ -0,0 +1,59 @@
+import random
+import warnings
+
+from Bio.Seq import Seq
+import pytest
+
+import translation
+
+
+def random_dna(n, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for _ in range(n))
+
+@pytest.mark.parametrize('table', [1, 2, 11])
+def test_six_frames_match_biopython(table):
+    sequence = random_dna(601, table)
+    frames = translation.six_frames(sequence, table)
+    rc = str(Seq(sequence).reverse_complement())
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = [str(Seq(strand[frame:len(strand) - (len(strand) - frame) % 3]).translate(table=table))
+                    for strand in (sequence, rc) for frame in range(3)]
+    assert frames == expected
+    assert translation.translate(sequence, table) == expected[0]
+
+def test_ambiguous_codons_become_x():
+    assert translation.translate('ATGNNNTAA') == 'MX*'
+
+def naive_orfs(sequence, min_length):
+    orfs = []
+    n = len(sequence)
+    for strand, text in ((1, sequence), (-1, str(Seq(sequence).reverse_complement()))):
+        for frame in range(3):
+            aminos = translation.translate(text, frame=frame)
+            start = None
+            for i, amino in enumerate(aminos):
+                if start is None and text[frame + 3 * i:frame + 3 * i + 3] == 'ATG':
+                    start = i
+                if amino == '*':
+                    if start is not None and i - start >= min_length:
+                        a, b = frame + 3 * start, frame + 3 * i + 3
+                        if strand == -1:
+                            a, b = n - b, n - a
+                        orfs.append((a, b, strand, frame, i - start))
+                    start = None
+    return sorted(orfs)
+
+def test_find_orfs_matches_naive_scan():
+    sequence = random_dna(3000, 7)
+    for min_length in (0, 10, 30):
+        assert [tuple(orf) for orf in translation.find_orfs(sequence, min_length=min_length)] == \
+            naive_orfs(sequence, min_length)
+
+def test_orf_coordinates():
+    sequence = 'CC' + 'ATGAAACCCTAA' + 'GG'
+    orfs = translation.find_orfs(sequence, min_length=1)
+    assert orfs == [translation.ORF(2, 14, 1, 2, 3)]
+    rc = str(Seq(sequence).reverse_complement())
+    assert [orf[:3] for orf in translation.find_orfs(rc, min_length=1)] == [(2, 14, -1)]
@@ -1,5 +1,17 @@
+from collections import Counter
+import os
+import subprocess
+import sys
+
+from Bio import PDB
+import numpy as np
+
 import viz
 
+# cold `import viz` must stay well below the seconds matplotlib, seaborn,
+# Bio.PDB and dna_features_viewer take, so none of them may load up front
+IMPORT_BUDGET = 1.0
+
 testPDBfile = '''HEADER    EXTRACELLULAR MATRIX                    22-JAN-98   1A3I
 TITLE     X-RAY CRYSTALLOGRAPHIC DETERMINATION OF A COLLAGEN-LIKE
 TITLE    2 PEPTIDE WITH THE REPEATING SEQUENCE (PRO-PRO-GLY)
@@ -23,18 +35,69 @@ HETATM  131  O   ACY   401       2.807  23.097  10.553  1.00 21.19           O
 HETATM  132  OXT ACY   401       4.306  23.101  12.291  1.00 21.19           O
 '''
 
-def test_create_distance_matrix():
-    pass
+def test_lev_distance():
+    assert viz.lev_distance('GATTACA', 'GCATGCU') == 4.0
+    assert isinstance(viz.lev_distance('A', 'A'), float)
+    assert viz.lev_ratio('ACGT', 'ACGA') == 0.75
+
+def test_tfidf_cosine_distance():
+    assert abs(viz.tfidf_cosine_distance('ACGTACGT', 'ACGTACGT') - 1) < 1e-9
+    assert viz.tfidf_cosine_distance('AAAAAA', 'CCCCCC') == 0
+
+def test_heatMatrix():
+    grams = ['ACG', 'ACT', 'TTT']
+    matrix = viz.heatMatrix(grams, viz.lev_distance)
+    assert matrix.tolist() == [[0, 1, 3], [1, 0, 2], [3, 2, 0]]
+    assert matrix.dtype == float
+    assert viz.heatMatrix(grams, 'hamming').tolist() == matrix.tolist()
+    # a similarity scores every ngram 1 against itself
+    similarity = viz.heatMatrix(grams, viz.tfidf_cosine_distance)
+    assert np.allclose(np.diag(similarity), 1)
+
+def test_calcDist(tmp_path):
+    fsfile = tmp_path / 'genome.fasta'
+    fsfile.write_text('>g\nACGTTGCAACGTAACGT\n')
+    hits = viz.calcDist(viz.lev_distance, 'ACGT', str(fsfile), k=3)
+    assert hits == [(0, 0, 'acgt'), (0, 8, 'acgt'), (0, 13, 'acgt')]
+    assert viz.calcDist(viz.lev_distance, 'ttgc', str(fsfile), k=1, max_distance=0) == [(0, 3, 'ttgc')]
+
+def test_create_distance_matrix(tmp_path):
+    pdbfile = tmp_path / '1a3i.pdb'
+    pdbfile.write_text(testPDBfile)
+    structure = PDB.PDBParser(QUIET=True).get_structure('pdbfile', str(pdbfile))
+    atoms = list(structure.get_atoms())
+    dmat = viz.create_distance_matrix(str(pdbfile), quiet=True)
+    assert dmat.shape == (len(atoms), len(atoms))
+    assert dmat.dtype == 'float32'
+    expected = [[rowat - colat for colat in atoms] for rowat in atoms]
+    assert abs(dmat - expected).max() < 1e-5
+
+    outfile = tmp_path / 'dmat.npy'
+    viz.create_distance_matrix(str(pdbfile), quiet=True, out=str(outfile))
+    assert (np.load(outfile) == dmat).all()
+    assert viz.create_distance_matrix(str(pdbfile), quiet=True, level='ca').shape == (1, 1)
 
 def test_get_translation_table():
-    pass
+    standard = viz.get_translation_table()
+    assert len(standard) == 61 and standard['ATG'] == 'M' and 'TGA' not in standard
+    assert viz.get_translation_table('Vertebrate Mitochondrial')['TGA'] == 'W'
+    assert viz.get_translation_table('2') is viz.get_translation_table(2)
 
 
 def test_naive_backtranslate():
-    pass
-
-def test_get_peptide_index():
-    pass
+    assert viz.naive_backtranslate('MW*') == [['ATG'], ['TGG'], ['TAA', 'TAG', 'TGA']]
+    assert viz.naive_backtranslate('W*', table=2) == [['TGA', 'TGG'], ['TAA', 'TAG', 'AGA', 'AGG']]
+
+def test_get_peptide_index(monkeypatch):
+    back_table = {'M': ['ATG'], 'K': ['AAA', 'AAG'], 'W': ['TGG']}
+    monkeypatch.setattr(viz, 'naive_backtranslate',
+        lambda peptide, table=1: [back_table[amino] for amino in peptide])
+    # MKW at 2 (frame 2) and 13 (frame 1), CCA|CTT|CAT reverse complements MKW
+    nuc_sequence = 'GGATGAAGTGGCCATGAAATGGTTCCACTTCATC'
+    hits = viz.get_peptide_index(nuc_sequence, 'MKW\n')
+    assert hits == [(2, 11, 1, 2), (13, 22, 1, 1), (24, 33, -1, 1)]
+    starts = [hit[0] for hit in viz.get_peptide_index(nuc_sequence, 'MKW', codon_count=1)]
+    assert starts == [2, 12, 13, 18, 30]
 
 def test_demo_dna_features_viewer():
     pass
@@ -43,25 +106,62 @@ def test_ngrams():
     pass
 
 def test_make_trigrams():
-    pass
+    assert viz.make_trigrams('ACGTA') == ['ACG', 'CGT', 'GTA']
+    assert viz.make_ngrams(2, viz.Seq.Seq('ACG')) == ['AC', 'CG']
+    assert viz.make_ngrams(4, 'ACG') == []
+
+def test_ngram_counts():
+    sequence = 'ACGTACGTNNACG'
+    expected = Counter(viz.make_ngrams(3, sequence))
+    assert viz.ngram_counts(3, sequence) == dict(expected)
+    assert viz.ngram_counts(3, sequence, top=2) == [('ACG', 3), ('CGT', 2)]
+    assert viz.ngram_counts(1, 'MKW*MK', top=3) == [('K', 2), ('M', 2), ('W', 1)]
 
 def test_nucleotide_distribution():
     pass
 
 def test_get_peptide_toplot():
-    pass
+    assert str(viz.get_peptide_toplot('ATGGCCTAAGG')) == 'MA*'
+    # N in a codon falls back to biopython, which resolves CTN to L
+    assert str(viz.get_peptide_toplot(viz.Seq.Seq('CTNNNN'))) == 'LX'
+    assert str(viz.get_peptide_toplot('MKLV*', peptide=True)) == 'MKLV*'
+    # all IUPAC letters, still a peptide when the caller says so
+    assert str(viz.get_peptide_toplot('ACDKMSTV', peptide=True)) == 'ACDKMSTV'
+    assert str(viz.get_peptide_toplot('ATG---GCC')) == 'MA'
+    assert str(viz.get_peptide_toplot('ATGTAA', table=2)) == 'M*'
+    # N runs are X without biopython, repeated ambiguous codons translated once
+    sequence = 'ATG' + 'N' * 3000 + 'CTNGCRCTN' + 'TAR'
+    assert str(viz.get_peptide_toplot(sequence)) == 'M' + 'X' * 1000 + 'LAL*'
 
 def test_peptide_distribution():
     pass
 
-def test_plot_ABI():
-    pass
-
-def test_get_genbank_sequence():
-    pass
-
-def test_get_fasta_sequence():
-    pass
+def test_plot_ABI(tmp_path):
+    from test_abitrace import make_trace
+    path = str(make_trace(tmp_path, samples=20000)[0])
+    plt = viz.plot_ABI(path)
+    lines = plt.gca().get_lines()
+    assert len(lines) == 4 and all(len(line.get_xdata()) <= 2 * viz.ABI_WIDTH for line in lines)
+    plt.close('all')
+    plt = viz.plot_ABI(path, 1000, 1200)
+    assert [len(line.get_xdata()) for line in plt.gcf().axes[0].get_lines()] == [200] * 4
+    plt.close('all')
+    assert str(viz.get_abi(path).seq) == viz.abitrace.read(path).calls
+
+def test_get_genbank_sequence(tmp_path):
+    gbfile = tmp_path / 'plasmid.v1.gb'
+    gbfile.write_text(open('src/main/resources/base/data/NC_005816.gb').read())
+    sequence = viz.get_seq(str(gbfile))
+    assert len(sequence) == 9609
+    assert viz.get_seq(str(gbfile), start=5, end=15) == sequence[5:15]
+
+def test_get_fasta_sequence(tmp_path):
+    fsfile = tmp_path / 'multi.v2.fasta'
+    fsfile.write_text('>one\nACGT\nAC\n>two\nGGGG\nTT\n')
+    assert viz.get_record_ids(str(fsfile)) == ['one', 'two']
+    assert str(viz.get_seq(str(fsfile))) == 'ACGTAC'
+    assert str(viz.get_seq(str(fsfile), 'two', 3, 6)) == 'GTT'
+    assert str(viz.get_fasta(str(fsfile), 'two')) == 'GGGGTT'
 
 def test_iter_calc_sequence_similarity():
     pass
@@ -70,11 +170,42 @@ def test_calc_sequence_similarity():
     pass
 
 def test_multiprocess_similarity():
-    result = viz.multiprocess_similarity
-    print(result)
+    scores = viz.multiprocTextfuncs('ACGTACGT', 'ACGTTCGA')
+    assert set(scores) == set(viz.textdistfuncs)
+    assert scores['hamming'] == 2
+    assert viz.multiprocTextfuncsMany([('ACGT', 'ACGA')])[0]['hamming'] == 1
 
 def test_make_parser():
     pass
 
 def test_main():
     pass
+
+def test_import_is_lazy(tmp_path):
+    code = ('import sys, time; t = time.perf_counter(); import viz; '
+            'print(time.perf_counter() - t); '
+            'print(",".join(m for m in ("matplotlib", "seaborn", "sklearn", "scipy", '
+            '"Bio.PDB", "dna_features_viewer") if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=tmp_path, env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)})
+    seconds, loaded = result.stdout.splitlines()
+    assert loaded == ''
+    assert float(seconds) < IMPORT_BUDGET
+    assert not os.listdir(tmp_path)
+
+def test_lazy_attributes():
+    assert viz.PDB is PDB
+    assert viz.plt.__name__ == 'matplotlib.pyplot'
+
+def test_render_png_in_memory():
+    plt = viz.pyplot()
+    plt.figure(figsize=(40, 30))
+    plt.plot([0, 1], [1, 0])
+    fig = viz.as_figure(plt)
+    assert not plt.fignum_exists(fig.number)
+    preview = viz.render_png(fig)
+    assert preview[:8] == b'\x89PNG\r\n\x1a\n'
+    width, height = int.from_bytes(preview[16:20], 'big'), int.from_bytes(preview[20:24], 'big')
+    assert width * height <= viz.PREVIEW_PIXELS
+    full = viz.render_png(fig, dpi=50)
+    assert int.from_bytes(full[16:20], 'big') > width
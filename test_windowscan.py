@@ -0,0 +1,27 @@
+import random
+
+import levenshtein
+import windowscan
+
+
+def _genome(length=3000, seed=4):
+    rand = random.Random(seed)
+    return ''.join(rand.choice('acgt') for _ in range(length))
+
+def test_scan_matches_exhaustive():
+    genome = _genome()
+    query = genome[1200:1215]
+    hits = windowscan.scan(genome, query, k=6)
+    expected = sorted((levenshtein.distance(genome[i:i + 15], query), i)
+                      for i in range(len(genome) - 14))[:6]
+    assert [(dist, position) for dist, position, _ in hits] == expected
+    assert hits[0] == (0, 1200, query)
+
+def test_repeated_windows_keep_positions():
+    hits = windowscan.scan('acgacgacg', 'acg', k=5, max_distance=0)
+    assert hits == [(0, 0, 'acg'), (0, 3, 'acg'), (0, 6, 'acg')]
+
+def test_parallel_matches_serial():
+    genome = _genome(8000)
+    query = genome[100:112]
+    assert windowscan.scan_parallel(genome, query, k=4, processes=2) == windowscan.scan(genome, query, k=4)